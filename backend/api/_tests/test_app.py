@@ -0,0 +1,326 @@
+import gzip
+import json
+from unittest.mock import Mock
+
+import brotli
+import pytest
+from flask.testing import FlaskClient
+
+from api import app as app_module, payload
+from utils.cache import Snapshot
+
+PLUGIN = {"name": "plugin-1", "version": "1.0.0"}
+MANIFEST = {"name": "plugin-1", "contributions": {}}
+
+
+class TestConditionalResponses:
+    @pytest.fixture
+    def client(self) -> FlaskClient:
+        return app_module.app.test_client()
+
+    @pytest.fixture(autouse=True)
+    def mock_model(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(
+            app_module, "get_index_snapshot", Mock(return_value=Snapshot([PLUGIN]))
+        )
+        monkeypatch.setattr(app_module, "get_plugin", Mock(return_value=PLUGIN))
+        monkeypatch.setattr(app_module, "get_manifest", Mock(return_value=MANIFEST))
+        monkeypatch.setattr(
+            app_module.categories, "get_category", Mock(return_value=[{"label": "a"}])
+        )
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "/plugins/index",
+            "/plugins/index/all",
+            "/plugins/plugin-1",
+            "/manifest/plugin-1",
+            "/categories/foo",
+        ],
+    )
+    def test_etag_round_trip(self, client: FlaskClient, url: str):
+        response = client.get(url)
+
+        assert response.status_code == 200
+        assert response.headers["ETag"]
+        assert response.headers["Cache-Control"] == "public, no-cache"
+
+        cached = client.get(url, headers={"If-None-Match": response.headers["ETag"]})
+        assert cached.status_code == 304
+        assert cached.data == b""
+
+        stale = client.get(url, headers={"If-None-Match": '"stale"'})
+        assert stale.status_code == 200
+        assert stale.json == response.json
+
+    @pytest.mark.parametrize(
+        "url", ["/manifest/plugin-1/versions/1.0.0", "/categories/foo/versions/v1"]
+    )
+    def test_versioned_routes_are_immutable(self, client: FlaskClient, url: str):
+        response = client.get(url)
+
+        assert response.status_code == 200
+        cache_control = response.headers["Cache-Control"]
+        assert "immutable" in cache_control
+        assert f"max-age={app_module._IMMUTABLE_MAX_AGE}" in cache_control
+
+    def test_missing_plugin_has_no_etag(
+        self, client: FlaskClient, monkeypatch: pytest.MonkeyPatch
+    ):
+        monkeypatch.setattr(app_module, "get_plugin", Mock(return_value={}))
+
+        response = client.get("/plugins/plugin-1")
+
+        assert response.status_code == 404
+        assert "ETag" not in response.headers
+
+
+class TestEncodedResponses:
+    @pytest.fixture
+    def client(self) -> FlaskClient:
+        return app_module.app.test_client()
+
+    @pytest.fixture
+    def index(self):
+        return [{"name": f"plugin-{i}", "summary": "A plugin " * 10} for i in range(50)]
+
+    @pytest.fixture(autouse=True)
+    def mock_index(self, index, monkeypatch: pytest.MonkeyPatch) -> Mock:
+        mock = Mock(return_value=Snapshot(index))
+        monkeypatch.setattr(app_module, "get_index_snapshot", mock)
+        return mock
+
+    @pytest.mark.parametrize(
+        "accept_encoding, encoding, decompress",
+        [
+            ("gzip", "gzip", gzip.decompress),
+            ("gzip, deflate, br", "br", brotli.decompress),
+            ("br;q=0.5, gzip", "gzip", gzip.decompress),
+        ],
+    )
+    def test_compressed_index(
+        self,
+        client: FlaskClient,
+        index,
+        monkeypatch: pytest.MonkeyPatch,
+        accept_encoding: str,
+        encoding: str,
+        decompress,
+    ):
+        monkeypatch.setattr(payload, "_ENCODINGS", ["br", "gzip"])
+
+        response = client.get(
+            "/plugins/index", headers={"Accept-Encoding": accept_encoding}
+        )
+
+        assert response.headers["Content-Encoding"] == encoding
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert response.headers["ETag"].endswith(f'-{encoding}"')
+        assert json.loads(decompress(response.data)) == index
+
+        cached = client.get(
+            "/plugins/index",
+            headers={
+                "Accept-Encoding": accept_encoding,
+                "If-None-Match": response.headers["ETag"],
+            },
+        )
+        assert cached.status_code == 304
+
+    def test_uncompressed_index_is_compact(self, client: FlaskClient, index):
+        response = client.get("/plugins/index", headers={"Accept-Encoding": "identity"})
+
+        assert "Content-Encoding" not in response.headers
+        assert response.json == index
+        assert b", " not in response.data
+        assert b"\n" not in response.data
+
+    def test_payload_serialized_once_per_snapshot(
+        self, client: FlaskClient, monkeypatch: pytest.MonkeyPatch
+    ):
+        to_snapshot_payload = Mock(wraps=app_module.to_snapshot_payload)
+        monkeypatch.setattr(app_module, "to_snapshot_payload", to_snapshot_payload)
+
+        client.get("/plugins/index", headers={"Accept-Encoding": "gzip"})
+        client.get("/plugins/index", headers={"Accept-Encoding": "identity"})
+
+        to_snapshot_payload.assert_called_once()
+
+
+class TestFieldProjection:
+    @pytest.fixture
+    def client(self) -> FlaskClient:
+        return app_module.app.test_client()
+
+    def test_index_fields(self, client: FlaskClient, monkeypatch: pytest.MonkeyPatch):
+        index = [{"name": "plugin-1", "summary": "foo", "total_installs": 3}]
+        monkeypatch.setattr(
+            app_module, "get_index_snapshot", Mock(return_value=Snapshot(index))
+        )
+
+        response = client.get("/plugins/index?fields=total_installs")
+
+        assert response.json == [{"name": "plugin-1", "total_installs": 3}]
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "/plugins/index?fields=total_installs,unknown",
+            "/plugins/plugin-1?fields=summary,data.foo",
+            "/plugins/search?q=plugin&fields=" + ",".join(["summary"] * 100),
+        ],
+    )
+    def test_invalid_fields(
+        self, client: FlaskClient, monkeypatch: pytest.MonkeyPatch, url
+    ):
+        get_plugin = Mock(return_value=PLUGIN)
+        monkeypatch.setattr(app_module, "get_plugin", get_plugin)
+        monkeypatch.setattr(app_module, "search_plugins", Mock(return_value={}))
+
+        response = client.get(url)
+
+        assert response.status_code == 400
+        get_plugin.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "url, fields",
+        [
+            ("/plugins/plugin-1", None),
+            ("/plugins/plugin-1?fields=summary, license", {"summary", "license"}),
+            ("/plugins/plugin-1?fields=", set()),
+        ],
+    )
+    def test_plugin_fields(
+        self, client: FlaskClient, monkeypatch: pytest.MonkeyPatch, url, fields
+    ):
+        get_plugin = Mock(return_value=PLUGIN)
+        monkeypatch.setattr(app_module, "get_plugin", get_plugin)
+
+        assert client.get(url).json == PLUGIN
+        get_plugin.assert_called_once_with("plugin-1", None, fields)
+
+
+class TestSearchRoute:
+    @pytest.fixture
+    def client(self) -> FlaskClient:
+        return app_module.app.test_client()
+
+    def test_search(self, client: FlaskClient, monkeypatch: pytest.MonkeyPatch):
+        result = {"total": 1, "page": 2, "page_size": 5, "plugins": [PLUGIN]}
+        search_plugins = Mock(return_value=result)
+        monkeypatch.setattr(app_module, "search_plugins", search_plugins)
+
+        response = client.get("/plugins/search?q=plugin&page=2&page_size=5")
+
+        assert response.json == result
+        assert response.headers["ETag"]
+        search_plugins.assert_called_once_with("plugin", page=2, page_size=5)
+
+    def test_search_fields(self, client: FlaskClient, monkeypatch: pytest.MonkeyPatch):
+        result = {"total": 1, "page": 1, "page_size": 20, "plugins": [PLUGIN]}
+        monkeypatch.setattr(app_module, "search_plugins", Mock(return_value=result))
+
+        response = client.get("/plugins/search?q=plugin&fields=summary")
+
+        assert response.json["plugins"] == [{"name": "plugin-1"}]
+
+
+class TestFacetedIndex:
+    @pytest.fixture
+    def client(self) -> FlaskClient:
+        return app_module.app.test_client()
+
+    @pytest.fixture(autouse=True)
+    def mock_index(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        index = [
+            {"name": "plugin-1", "plugin_types": ["reader"], "summary": "foo"},
+            {"name": "plugin-2", "plugin_types": ["writer"], "summary": "bar"},
+            {"name": "plugin-3", "category": {"Workflow step": ["Image fusion"]}},
+        ]
+        monkeypatch.setattr(
+            app_module, "get_index_snapshot", Mock(return_value=Snapshot(index))
+        )
+
+    @pytest.mark.parametrize(
+        "query, expected",
+        [
+            ("facet.plugin_types=reader", ["plugin-1"]),
+            (
+                "facet.plugin_types=reader&facet.plugin_types=writer",
+                ["plugin-1", "plugin-2"],
+            ),
+            ("facet.category.Workflow step=Image fusion", ["plugin-3"]),
+        ],
+    )
+    def test_facet_filters(self, client: FlaskClient, query, expected):
+        response = client.get(f"/plugins/index?{query}")
+
+        assert [plugin["name"] for plugin in response.json["plugins"]] == expected
+        assert "plugin_types" in response.json["facets"]
+
+    def test_facet_filters_with_fields(self, client: FlaskClient):
+        response = client.get("/plugins/index?facet.plugin_types=writer&fields=")
+
+        assert response.json["plugins"] == [{"name": "plugin-2"}]
+
+    @pytest.mark.parametrize(
+        "query", ["facet.unknown=foo", "facet.plugin_types=reader&facet.summary=foo"]
+    )
+    def test_unknown_facet(self, client: FlaskClient, query):
+        response = client.get(f"/plugins/index?{query}")
+
+        assert response.status_code == 400
+
+
+class TestMetricsRoutes:
+    @pytest.fixture
+    def client(self) -> FlaskClient:
+        return app_module.app.test_client()
+
+    @pytest.fixture(autouse=True)
+    def mock_send_alert(self, monkeypatch: pytest.MonkeyPatch) -> Mock:
+        send_alert = Mock()
+        monkeypatch.setattr(app_module, "send_alert", send_alert)
+        return send_alert
+
+    @pytest.mark.parametrize(
+        "url, lookup",
+        [
+            ("/metrics/plugin-1", "get_metrics_for_plugin"),
+            ("/metrics?plugins=plugin-1", "get_metrics_for_plugins"),
+        ],
+    )
+    def test_failed_lookup_is_server_error(
+        self,
+        client: FlaskClient,
+        monkeypatch: pytest.MonkeyPatch,
+        mock_send_alert: Mock,
+        url: str,
+        lookup: str,
+    ):
+        monkeypatch.setattr(app_module, lookup, Mock(side_effect=TimeoutError()))
+
+        response = client.get(url)
+
+        assert response.status_code == 500
+        mock_send_alert.assert_called_once()
+
+    def test_bulk_metrics_caps_plugins(
+        self, client: FlaskClient, monkeypatch: pytest.MonkeyPatch
+    ):
+        get_metrics_for_plugins = Mock(return_value={})
+        monkeypatch.setattr(
+            app_module, "get_metrics_for_plugins", get_metrics_for_plugins
+        )
+        names = [f"plugin-{i}" for i in range(app_module._MAX_METRICS_PLUGINS + 1)]
+
+        response = client.get(f"/metrics?plugins={','.join(names)}")
+
+        assert response.status_code == 400
+        get_metrics_for_plugins.assert_not_called()
+
+        # duplicates count once towards the cap
+        names = names[:-1] * 2
+        assert client.get(f"/metrics?plugins={','.join(names)}").status_code == 200
+        get_metrics_for_plugins.assert_called_once_with(names[: len(names) // 2])
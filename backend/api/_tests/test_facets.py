@@ -0,0 +1,79 @@
+from unittest.mock import Mock
+
+import pytest
+
+from api import facets
+from utils.cache import Snapshot
+
+INDEX = [
+    {
+        "name": "plugin-1",
+        "plugin_types": ["reader", "widget"],
+        "npe2": True,
+        "license": "MIT",
+        "category": {"Workflow step": ["Image segmentation"]},
+    },
+    {
+        "name": "plugin-2",
+        "plugin_types": ["reader"],
+        "npe2": False,
+        "license": "BSD-3-Clause",
+        "category": {"Workflow step": ["Image registration"]},
+    },
+    {"name": "plugin-3", "plugin_types": ["writer"], "npe2": True, "license": "MIT"},
+]
+
+
+def _names(result):
+    return [plugin["name"] for plugin in result["plugins"]]
+
+
+class TestFilterIndex:
+    @pytest.mark.parametrize(
+        "filters, expected",
+        [
+            ({}, ["plugin-1", "plugin-2", "plugin-3"]),
+            ({"plugin_types": {"reader"}}, ["plugin-1", "plugin-2"]),
+            ({"plugin_types": {"widget", "writer"}}, ["plugin-1", "plugin-3"]),
+            ({"plugin_types": {"reader"}, "npe2": {"true"}}, ["plugin-1"]),
+            ({"category.Workflow step": {"Image registration"}}, ["plugin-2"]),
+            ({"license": {"GPL"}}, []),
+            ({"unknown": {"foo"}}, []),
+        ],
+    )
+    def test_filters(self, filters, expected):
+        assert _names(facets.filter_index(Snapshot(INDEX), filters)) == expected
+
+    def test_facet_counts(self):
+        result = facets.filter_index(Snapshot(INDEX), {"license": {"MIT"}})
+
+        assert result["facets"] == {
+            "license": {"MIT": 2},
+            "npe2": {"true": 2},
+            "plugin_types": {"reader": 1, "widget": 1, "writer": 1},
+            "category.Workflow step": {"Image segmentation": 1},
+        }
+
+    def test_bitmaps_built_once_per_snapshot(self, monkeypatch: pytest.MonkeyPatch):
+        build = Mock(wraps=facets._build_facet_index)
+        monkeypatch.setattr(facets, "_build_facet_index", build)
+        snapshot = Snapshot(INDEX)
+
+        facets.filter_index(snapshot, {"npe2": {"true"}})
+        facets.filter_index(snapshot, {"npe2": {"false"}})
+
+        build.assert_called_once_with(INDEX)
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("plugin_types", True),
+        ("category.Workflow step", True),
+        ("category.", False),
+        ("summary", False),
+        ("unknown", False),
+    ],
+)
+def test_is_facet(name, expected):
+    assert facets.is_facet(name) == expected
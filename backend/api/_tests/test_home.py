@@ -3,6 +3,7 @@ from typing import List, Dict
 from unittest.mock import Mock
 import pytest
 from api import home
+from utils.cache import Snapshot
 from nhcommons.models.plugin_utils import PluginVisibility
 
 
@@ -20,8 +21,8 @@ class TestHomepage:
     @pytest.fixture
     def mock_get_index(self, monkeypatch, index_data):
         get_index = Mock()
-        monkeypatch.setattr(home, "get_index", get_index)
-        get_index.return_value = index_data.copy()
+        monkeypatch.setattr(home, "get_index_snapshot", get_index)
+        get_index.return_value = Snapshot(index_data.copy())
         return get_index
 
     @pytest.fixture
@@ -129,3 +130,34 @@ class TestHomepage:
         mock_get_index.assert_called_once_with(
             include_total_installs=True, visibility_filter={PluginVisibility.PUBLIC}
         )
+
+    def test_sections_exclude_plugins_already_returned(self, mock_get_index):
+        actual = home.get_plugin_sections(
+            {"newest", "recently_updated", "top_installed"}, limit=2
+        )
+
+        assert [get_name(p) for p in actual["newest"]["plugins"]] == [
+            "plugin-1",
+            "plugin-4",
+        ]
+        assert [get_name(p) for p in actual["recently_updated"]["plugins"]] == [
+            "plugin-2",
+            "plugin-3",
+        ]
+        assert actual["top_installed"] == {"plugins": []}
+
+    def test_home_index_built_once_per_snapshot(self, mock_get_index, monkeypatch):
+        build_home_index = Mock(wraps=home._build_home_index)
+        monkeypatch.setattr(home, "_build_home_index", build_home_index)
+
+        first = home.get_plugin_sections({"top_installed"}, limit=10)
+        second = home.get_plugin_sections({"top_installed"}, limit=10)
+
+        assert first == second
+        assert [get_name(p) for p in first["top_installed"]["plugins"]] == [
+            "plugin-4",
+            "plugin-2",
+            "plugin-1",
+            "plugin-3",
+        ]
+        build_home_index.assert_called_once()
@@ -1,3 +1,4 @@
+import threading
 from typing import Dict
 from unittest.mock import Mock
 
@@ -8,6 +9,7 @@ from api._tests.test_fixtures import (
     generate_commits_timeline,
     generate_installs_timeline,
 )
+from utils.cache import Snapshot
 
 PLUGIN_NAME = "StrIng-1"
 PLUGIN_NAME_CLEAN = "string-1"
@@ -139,3 +141,121 @@ class TestMetricModel:
         self._get_total_commits.assert_called_once_with(PLUGIN_NAME_CLEAN, repo)
         self._get_total_installs.assert_called_once_with(PLUGIN_NAME_CLEAN)
         self._get_recent_installs.assert_called_once_with(PLUGIN_NAME_CLEAN, 30)
+
+    def test_get_metrics_for_plugin_fetches_concurrently(self):
+        self._plugin = MOCK_PLUGIN_OBJ
+        barrier = threading.Barrier(3, timeout=5)
+
+        def _wait_for_all(value):
+            def _call(*args):
+                barrier.wait()
+                return value
+
+            return _call
+
+        self._get_total_installs.side_effect = _wait_for_all(TOTAL_INSTALLS)
+        self._get_total_commits.side_effect = _wait_for_all(TOTAL_COMMITS)
+        self._get_latest_commit.side_effect = _wait_for_all(LATEST_COMMIT)
+
+        actual = metrics.get_metrics_for_plugin(PLUGIN_NAME, "3")
+
+        assert actual == generate_expected_metrics(3)
+
+    def test_get_metrics_for_plugin_raises_for_hung_lookup(self, monkeypatch):
+        monkeypatch.setattr(metrics, "_LOOKUP_TIMEOUT", 0.1)
+        self._plugin = MOCK_PLUGIN_OBJ
+        release = threading.Event()
+        self._get_total_installs.side_effect = lambda *_: release.wait(5)
+
+        try:
+            with pytest.raises(metrics.TimeoutError):
+                metrics.get_metrics_for_plugin(PLUGIN_NAME, "3")
+        finally:
+            release.set()
+
+    def test_get_metrics_for_plugin_raises_for_failed_lookup(self):
+        self._plugin = MOCK_PLUGIN_OBJ
+        self._get_total_installs.side_effect = ValueError("throttled")
+
+        with pytest.raises(ValueError):
+            metrics.get_metrics_for_plugin(PLUGIN_NAME, "3")
+
+
+class TestBulkMetrics:
+    @pytest.fixture(autouse=True)
+    def mock_index(self, monkeypatch) -> None:
+        index = [
+            {
+                "name": "Plugin-1",
+                "visibility": "public",
+                "code_repository": f"https://github.com/{REPO}",
+            },
+            {"name": "plugin-2", "visibility": "hidden"},
+            {
+                "name": "plugin-3",
+                "visibility": "blocked",
+                "code_repository": "https://github.com/foo/bar",
+            },
+        ]
+        monkeypatch.setattr(
+            metrics, "get_index_snapshot", Mock(return_value=Snapshot(index))
+        )
+
+    @pytest.fixture(autouse=True)
+    def mock_batch_gets(self, monkeypatch) -> None:
+        self._batch_get_total_installs = Mock(
+            return_value={"plugin-1": 10, "plugin-2": 0, "plugin-3": 4}
+        )
+        monkeypatch.setattr(
+            metrics.install_activity,
+            "batch_get_total_installs",
+            self._batch_get_total_installs,
+        )
+        self._batch_get_stats = Mock(
+            side_effect=lambda repo_by_plugin: {
+                name.lower(): {
+                    "total_commits": TOTAL_COMMITS if repo else 0,
+                    "latest_commit_timestamp": LATEST_COMMIT if repo else None,
+                }
+                for name, repo in repo_by_plugin.items()
+            }
+        )
+        monkeypatch.setattr(
+            metrics.github_activity, "batch_get_stats", self._batch_get_stats
+        )
+
+    def test_get_metrics_for_plugins(self):
+        names = ["plugin-1", "plugin-2", "plugin-3"]
+
+        actual = metrics.get_metrics_for_plugins(names)
+
+        no_commits = {"total_commits": 0, "latest_commit_timestamp": None}
+        assert actual == {
+            "plugin-1": {
+                "usage": {"stats": {"total_installs": 10}},
+                "maintenance": {
+                    "stats": {
+                        "total_commits": TOTAL_COMMITS,
+                        "latest_commit_timestamp": LATEST_COMMIT,
+                    }
+                },
+            },
+            "plugin-2": {
+                "usage": {"stats": {"total_installs": 0}},
+                "maintenance": {"stats": no_commits},
+            },
+            "plugin-3": {
+                "usage": {"stats": {"total_installs": 4}},
+                "maintenance": {"stats": no_commits},
+            },
+        }
+        self._batch_get_total_installs.assert_called_once_with(names)
+        self._batch_get_stats.assert_called_once_with(
+            {"plugin-1": REPO, "plugin-2": None, "plugin-3": None}
+        )
+
+    def test_get_metrics_for_plugins_raises_for_failed_lookup(self):
+        self._batch_get_stats.side_effect = ValueError("throttled")
+
+        with pytest.raises(ValueError):
+            metrics.get_metrics_for_plugins(["plugin-1"])
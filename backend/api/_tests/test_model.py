@@ -9,6 +9,10 @@ from nhcommons.models.plugin_utils import PluginVisibility
 
 
 class TestModel:
+    @pytest.fixture(autouse=True)
+    def index_caches(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(model, "_index_caches", {})
+
     @pytest.fixture
     def plugin_get_index_result(self) -> List[Dict[str, Any]]:
         return [
@@ -17,33 +21,52 @@ class TestModel:
             {"name": "plugin-3", "version": "0.5"},
         ]
 
+    @pytest.fixture
+    def get_total_installs_result(self) -> Dict[str, int]:
+        return {"plugin1": 30, "plugin-3": 10}
+
     @pytest.fixture
     def mock_get_index(
         self,
         plugin_get_index_result: List[Dict[str, Any]],
+        get_total_installs_result: Dict[str, int],
         monkeypatch: pytest.MonkeyPatch,
     ) -> Mock:
-        mock = Mock(spec=plugin.get_index, return_value=plugin_get_index_result)
+        def _get_index(_, include_total_installs):
+            if not include_total_installs:
+                return [dict(item) for item in plugin_get_index_result]
+            # plugins without install activity have no total_installs materialized
+            return [
+                {
+                    **item,
+                    "total_installs": get_total_installs_result.get(
+                        item["name"].lower()
+                    ),
+                }
+                for item in plugin_get_index_result
+            ]
+
+        mock = Mock(spec=plugin.get_index, side_effect=_get_index)
         monkeypatch.setattr(model.plugin_model, "get_index", mock)
         return mock
 
-    @pytest.fixture
-    def get_total_installs_result(self) -> Dict[str, int]:
-        return {"plugin1": 30, "plugin-3": 10}
-
     @pytest.fixture
     def mock_total_installs(
         self,
         get_total_installs_result: Dict[str, int],
         monkeypatch: pytest.MonkeyPatch,
     ) -> Mock:
+        def _batch_get_total_installs(names):
+            return {
+                name.lower(): get_total_installs_result.get(name.lower(), 0)
+                for name in names
+            }
+
         mock = Mock(
-            spec=install_activity.get_total_installs_by_plugins,
-            return_value=get_total_installs_result,
-        )
-        monkeypatch.setattr(
-            model.install_activity, "get_total_installs_by_plugins", mock
+            spec=install_activity.batch_get_total_installs,
+            side_effect=_batch_get_total_installs,
         )
+        monkeypatch.setattr(install_activity, "batch_get_total_installs", mock)
         return mock
 
     @pytest.fixture
@@ -86,11 +109,99 @@ class TestModel:
         mock_total_installs: Mock,
         request: pytest.FixtureRequest,
     ):
-        actual = model.get_index(visibility, include_total_installs)
+        actual = model.get_index_snapshot(visibility, include_total_installs).data
 
         assert request.getfixturevalue(expected) == actual
-        mock_get_index.assert_called_with(visibility)
-        if include_total_installs:
-            mock_total_installs.assert_called_with()
+        mock_get_index.assert_called_with(visibility, include_total_installs)
+        mock_total_installs.assert_not_called()
+
+    def test_get_index_is_served_from_snapshot(
+        self,
+        mock_get_index: Mock,
+        mock_total_installs: Mock,
+        plugin_index_with_total_installs: List[Dict[str, Any]],
+    ):
+        visibility = {PluginVisibility.PUBLIC}
+        first = model.get_index_snapshot(visibility, True)
+        second = model.get_index_snapshot(visibility, True)
+
+        assert plugin_index_with_total_installs == first.data
+        assert first is second
+        mock_get_index.assert_called_once_with(visibility, True)
+        mock_total_installs.assert_not_called()
+
+    def test_get_index_snapshot_keyed_on_arguments(
+        self, mock_get_index: Mock, mock_total_installs: Mock
+    ):
+        public = model.get_index_snapshot({PluginVisibility.PUBLIC}, True)
+        everything = model.get_index_snapshot()
+
+        assert public.version != everything.version
+        assert model.get_index_snapshot({PluginVisibility.PUBLIC}, True) is public
+        assert mock_get_index.call_count == 2
+        mock_total_installs.assert_not_called()
+
+    def test_get_index_uses_materialized_total_installs(
+        self, mock_get_index: Mock, mock_total_installs: Mock
+    ):
+        mock_get_index.side_effect = None
+        mock_get_index.return_value = [
+            {"name": "Plugin1", "total_installs": 5},
+            {"name": "plugin-3", "total_installs": None},
+        ]
+
+        actual = model.get_index_snapshot({PluginVisibility.PUBLIC}, True).data
+
+        assert actual == [
+            {"name": "Plugin1", "total_installs": 5},
+            {"name": "plugin-3", "total_installs": 0},
+        ]
+        mock_total_installs.assert_not_called()
+
+    def test_invalidate_index(self, mock_get_index: Mock, mock_total_installs: Mock):
+        snapshot = model.get_index_snapshot()
+
+        model.invalidate_index()
+
+        assert model.get_index_snapshot().version != snapshot.version
+        assert mock_get_index.call_count == 2
+
+    def test_is_plugin(self, monkeypatch: pytest.MonkeyPatch):
+        mock = Mock(spec=plugin.get_plugin_names, return_value={"plugin-1"})
+        monkeypatch.setattr(model.plugin_model, "get_plugin_names", mock)
+        monkeypatch.setattr(model._plugin_names_cache, "_snapshot", None)
+
+        assert model.is_plugin("plugin-1")
+        assert not model.is_plugin("plugin-2")
+        mock.assert_called_once_with({PluginVisibility.PUBLIC, PluginVisibility.HIDDEN})
+
+    @pytest.mark.parametrize(
+        "version, fields",
+        [(None, None), ("1.0.0", None), (None, {"summary"}), ("1.0.0", {"summary"})],
+    )
+    def test_get_plugin(self, monkeypatch: pytest.MonkeyPatch, version, fields):
+        latest = Mock(spec=plugin.get_latest_plugin, return_value={"name": "latest"})
+        versioned = Mock(
+            spec=plugin.get_plugin_by_version, return_value={"name": "versioned"}
+        )
+        monkeypatch.setattr(model.plugin_model, "get_latest_plugin", latest)
+        monkeypatch.setattr(model.plugin_model, "get_plugin_by_version", versioned)
+
+        actual = model.get_plugin("plugin-1", version, fields)
+
+        visibilities = {PluginVisibility.PUBLIC, PluginVisibility.HIDDEN}
+        if version:
+            assert actual == {"name": "versioned"}
+            versioned.assert_called_once_with("plugin-1", version, visibilities, fields)
         else:
-            mock_total_installs.assert_not_called()
+            assert actual == {"name": "latest"}
+            latest.assert_called_once_with("plugin-1", visibilities, fields)
+
+    def test_select_fields(self, plugin_get_index_result: List[Dict[str, Any]]):
+        actual = model.select_fields(plugin_get_index_result, {"version", "foo"})
+        assert actual == plugin_get_index_result
+        assert model.select_fields(plugin_get_index_result, set()) == [
+            {"name": "Plugin1"},
+            {"name": "plugin-2"},
+            {"name": "plugin-3"},
+        ]
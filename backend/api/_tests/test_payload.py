@@ -0,0 +1,64 @@
+import gzip
+from collections import OrderedDict
+
+import pytest
+from werkzeug.datastructures import Accept
+
+from api import payload
+
+LARGE_DATA = {"plugins": [{"name": f"plugin-{i}"} for i in range(100)]}
+
+
+class TestPayload:
+    @pytest.fixture(autouse=True)
+    def payloads(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(payload, "_payloads", OrderedDict())
+        monkeypatch.setattr(payload, "_MAX_CACHED_PAYLOADS", 2)
+        monkeypatch.setattr(payload, "_ENCODINGS", ["br", "gzip"])
+
+    def test_to_payload_is_compact_and_sorted(self):
+        assert payload.to_payload({"b": 1, "a": [1, 2]}).body == b'{"a":[1,2],"b":1}'
+
+    def test_to_payload_reuses_payload_for_same_content(self):
+        first = payload.to_payload(LARGE_DATA)
+        compressed = first.get_body("gzip")
+
+        second = payload.to_payload(dict(LARGE_DATA))
+
+        assert second is first
+        assert second.get_body("gzip") is compressed
+        assert gzip.decompress(compressed) == first.body
+
+    def test_to_payload_evicts_least_recently_used(self):
+        first = payload.to_payload({"a": 1})
+        payload.to_payload({"b": 1})
+        payload.to_payload({"a": 1})
+        payload.to_payload({"c": 1})
+
+        assert list(payload._payloads) == [
+            first.etag,
+            payload.to_payload({"c": 1}).etag,
+        ]
+
+    @pytest.mark.parametrize(
+        "data, accept_encoding, expected",
+        [
+            (LARGE_DATA, "gzip, br", "br"),
+            (LARGE_DATA, "gzip", "gzip"),
+            (LARGE_DATA, "deflate", None),
+            (LARGE_DATA, "", None),
+            ({"a": 1}, "gzip, br", None),
+        ],
+    )
+    def test_negotiate_encoding(self, data, accept_encoding, expected):
+        accept = Accept(
+            [(value.strip(), 1) for value in accept_encoding.split(",") if value]
+        )
+
+        assert payload.to_payload(data).negotiate_encoding(accept) == expected
+
+    def test_etag_per_encoding(self):
+        result = payload.to_payload(LARGE_DATA)
+
+        assert result.get_etag(None) == result.etag
+        assert result.get_etag("br") == f"{result.etag}-br"
@@ -0,0 +1,99 @@
+from unittest.mock import Mock
+
+import pytest
+
+from api import search
+from utils.cache import Snapshot
+
+INDEX = [
+    {
+        "name": "napari-segment",
+        "display_name": "Segment Blobs",
+        "summary": "Segment cells in images",
+        "authors": [{"name": "Jane Doe"}],
+        "category": {"Workflow step": ["Image segmentation"]},
+        "total_installs": 10,
+    },
+    {
+        "name": "napari-tracker",
+        "display_name": "Cell Tracker",
+        "summary": "Track cells over time",
+        "authors": [{"name": "John Smith"}],
+        "description_text": "Uses segmentation masks as input",
+        "total_installs": 50,
+    },
+    {
+        "name": "napari-viewer-extras",
+        "display_name": "Viewer extras",
+        "summary": "Extra widgets",
+        "authors": [{"name": "Jane Roe"}],
+        "total_installs": 100,
+    },
+]
+
+
+def _names(result):
+    return [plugin["name"] for plugin in result["plugins"]]
+
+
+class TestSearch:
+    @pytest.fixture(autouse=True)
+    def mock_get_index_snapshot(self, monkeypatch: pytest.MonkeyPatch) -> Mock:
+        mock = Mock(return_value=Snapshot(INDEX))
+        monkeypatch.setattr(search, "get_index_snapshot", mock)
+        return mock
+
+    @pytest.mark.parametrize(
+        "query, expected",
+        [
+            ("tracker", ["napari-tracker"]),
+            ("JANE", ["napari-segment", "napari-viewer-extras"]),
+            ("image segmentation", ["napari-segment"]),
+            ("cells", ["napari-segment", "napari-tracker"]),
+            ("jane cells", ["napari-segment"]),
+            ("", []),
+            ("unknown", []),
+        ],
+    )
+    def test_token_matching(self, query, expected):
+        assert sorted(_names(search.search_plugins(query))) == expected
+
+    def test_prefix_matching(self):
+        assert _names(search.search_plugins("segm")) == [
+            "napari-segment",
+            "napari-tracker",
+        ]
+
+    def test_single_character_is_not_a_prefix(self):
+        assert _names(search.search_plugins("s")) == []
+
+    def test_ranks_by_field_weight(self):
+        # name and display_name matches rank above a summary match
+        assert _names(search.search_plugins("cell")) == [
+            "napari-tracker",
+            "napari-segment",
+        ]
+
+    def test_ties_ranked_by_installs(self):
+        assert _names(search.search_plugins("napari")) == [
+            "napari-viewer-extras",
+            "napari-tracker",
+            "napari-segment",
+        ]
+
+    def test_paging(self):
+        result = search.search_plugins("napari", page=2, page_size=2)
+
+        assert result["total"] == 3
+        assert result["page"] == 2
+        assert result["page_size"] == 2
+        assert _names(result) == ["napari-segment"]
+
+    def test_index_built_once_per_snapshot(self, monkeypatch: pytest.MonkeyPatch):
+        build = Mock(wraps=search._build_search_index)
+        monkeypatch.setattr(search, "_build_search_index", build)
+
+        search.search_plugins("napari")
+        search.search_plugins("cell")
+
+        build.assert_called_once_with(INDEX)
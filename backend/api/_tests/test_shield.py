@@ -1,3 +1,5 @@
+import json
+
 from api import model, shield
 
 
@@ -10,11 +12,25 @@ def validate(result, message):
 
 class TestShield:
     def test_get_shield_valid_plugin(self, monkeypatch):
-        monkeypatch.setattr(model, "get_plugin", lambda _: {"version": "0.0.1"})
-        result = shield.get_shield("package1")
+        monkeypatch.setattr(model, "is_plugin", lambda _: True)
+        result = json.loads(shield.get_shield_payload("package1").body)
         validate(result, "package1")
 
     def test_get_shield_for_non_plugin(self, monkeypatch):
-        monkeypatch.setattr(model, "get_plugin", lambda _: None)
-        result = shield.get_shield("not-a-package")
+        monkeypatch.setattr(model, "is_plugin", lambda _: False)
+        result = json.loads(shield.get_shield_payload("not-a-package").body)
         validate(result, "plugin not found")
+
+    def test_get_shield_payload(self, monkeypatch):
+        monkeypatch.setattr(model, "is_plugin", lambda name: name == "package1")
+
+        payload = shield.get_shield_payload("package1")
+
+        assert json.loads(payload.body) == {
+            **shield._SHIELD_SCHEMA,
+            "message": "package1",
+        }
+        assert shield.get_shield_payload("package1") is payload
+        not_found = shield.get_shield_payload("not-a-package")
+        assert shield.get_shield_payload("other-package") is not_found
+        validate(json.loads(not_found.body), "plugin not found")
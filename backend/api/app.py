@@ -1,27 +1,73 @@
 import logging
 import os
+from typing import Any, Dict, Optional, Set
 
 from werkzeug import exceptions
 from apig_wsgi import make_lambda_handler
 from flask import Flask, Response, jsonify, render_template, request
 
+from api.facets import filter_index, is_facet
 from api.home import get_plugin_sections
 from api.custom_wsgi import script_path_middleware
-from api.model import get_index, get_manifest, get_plugin
-from api.metrics import get_metrics_for_plugin
+from api.model import get_index_snapshot, get_manifest, get_plugin, select_fields
+from api.metrics import get_metrics_for_plugin, get_metrics_for_plugins
+from api.payload import EncodedPayload, to_payload, to_snapshot_payload
+from api.search import search_plugins
 from nhcommons.models import category as categories
-from api.shield import get_shield
+from api.shield import get_shield_payload
 from nhcommons.models.plugin_utils import PluginVisibility
 from utils.utils import send_alert
 
 app = Flask(__name__)
-app.config["JSONIFY_PRETTYPRINT_REGULAR"] = True
 app.url_map.redirect_defaults = False
 
 if os.getenv("DD_ENV") == "dev":
     app.wsgi_app = script_path_middleware(f'/{os.getenv("DD_SERVICE")}')(app.wsgi_app)
 
-handler = make_lambda_handler(app.wsgi_app)
+handler = make_lambda_handler(app.wsgi_app, binary_support=True)
+
+_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+_FACET_PARAM_PREFIX = "facet."
+# plugin data fields that can be requested with the fields query parameter
+_PLUGIN_FIELDS = frozenset(
+    {
+        "authors",
+        "category",
+        "category_hierarchy",
+        "citations",
+        "code_repository",
+        "description",
+        "description_content_type",
+        "description_text",
+        "development_status",
+        "display_name",
+        "documentation",
+        "error_message",
+        "first_released",
+        "license",
+        "name",
+        "npe2",
+        "operating_system",
+        "plugin_types",
+        "project_site",
+        "python_version",
+        "reader_file_extensions",
+        "release_date",
+        "report_issues",
+        "requirements",
+        "summary",
+        "support",
+        "total_installs",
+        "twitter",
+        "version",
+        "visibility",
+        "writer_file_extensions",
+        "writer_save_layers",
+    }
+)
+_MAX_FIELDS = len(_PLUGIN_FIELDS)
+# plugins that can be requested in a single bulk metrics request
+_MAX_METRICS_PLUGINS = 100
 
 logger = logging.getLogger()
 logging.basicConfig(
@@ -44,24 +90,56 @@ def swagger():
 
 @app.route("/plugins/index")
 def plugin_index() -> Response:
-    result = get_index(
+    fields = _get_fields()
+    snapshot = get_index_snapshot(
         visibility_filter={PluginVisibility.PUBLIC}, include_total_installs=True
     )
-    return jsonify(result)
+    facet_filters = _get_facet_filters()
+    if facet_filters:
+        result = filter_index(snapshot, facet_filters)
+        if fields is not None:
+            result["plugins"] = select_fields(result["plugins"], fields)
+        return _conditional_response(result)
+    if fields is not None:
+        return _conditional_response(select_fields(snapshot.data, fields))
+    return _conditional_response(snapshot.derive("payload", to_snapshot_payload))
 
 
 @app.route("/plugins/index/all")
 def plugin_index_all() -> Response:
-    return jsonify(get_index())
+    snapshot = get_index_snapshot()
+    return _conditional_response(snapshot.derive("payload", to_snapshot_payload))
+
+
+@app.route("/plugins/search")
+def plugin_search() -> Response:
+    """
+    Searches public plugins by text
+    :return Response: A json object with the total count of matches, and the index
+    metadata of the plugins in the requested page, ordered by relevance
+
+    :query_params q: Text to search for, all its terms have to match a plugin.
+    :query_params page: 1-indexed page of results to return, defaults to 1.
+    :query_params page_size: Number of results per page, defaults to 20.
+    """
+    fields = _get_fields()
+    result = search_plugins(
+        request.args.get("q", ""),
+        page=request.args.get("page", 1, type=int),
+        page_size=request.args.get("page_size", 20, type=int),
+    )
+    if fields is not None:
+        result["plugins"] = select_fields(result["plugins"], fields)
+    return _conditional_response(result)
 
 
 @app.route("/plugins/<plugin>", defaults={"version": None})
 @app.route("/plugins/<plugin>/versions/<version>")
 def versioned_plugin(plugin: str, version: str = None) -> Response:
-    plugin = get_plugin(plugin, version)
+    plugin = get_plugin(plugin, version, _get_fields())
     if not plugin:
         return app.make_response(("Plugin does not exist", 404))
-    return jsonify(plugin)
+    return _conditional_response(plugin)
 
 
 @app.route("/plugin/home/sections/<sections>")
@@ -80,7 +158,7 @@ def plugin_manifest(plugin: str, version: str = None) -> Response:
         return app.make_response(("Plugin does not exist", 404))
 
     if "error" not in manifest:
-        return jsonify(manifest)
+        return _conditional_response(manifest, immutable=version is not None)
 
     error = manifest["error"]
     if error == "Manifest not yet processed.":
@@ -101,7 +179,7 @@ def plugin_manifest(plugin: str, version: str = None) -> Response:
 
 @app.route("/shields/<plugin>")
 def shield(plugin: str) -> Response:
-    return jsonify(get_shield(plugin))
+    return _conditional_response(get_shield_payload(plugin))
 
 
 @app.route(
@@ -109,7 +187,7 @@ def shield(plugin: str) -> Response:
     defaults={"version": os.getenv("category_version", "EDAM-BIOIMAGING:alpha06")},
 )
 def get_categories(version: str) -> Response:
-    return jsonify(categories.get_all_categories(version))
+    return _conditional_response(categories.get_all_categories(version))
 
 
 @app.route(
@@ -118,7 +196,9 @@ def get_categories(version: str) -> Response:
 )
 @app.route("/categories/<category>/versions/<version>")
 def get_category(category: str, version: str) -> Response:
-    return jsonify(categories.get_category(category, version))
+    result = categories.get_category(category, version)
+    is_versioned = "version" not in (request.url_rule.defaults or {})
+    return _conditional_response(result, immutable=is_versioned and bool(result))
 
 
 @app.route("/metrics/<plugin>")
@@ -138,6 +218,92 @@ def get_plugin_metrics(plugin: str) -> Response:
     )
 
 
+def _get_fields() -> Optional[Set[str]]:
+    """
+    Parses the comma separated fields query parameter used for field projection.
+    :return: set of requested fields, None if all fields are requested
+    :raises BadRequest: if more than _MAX_FIELDS or unknown fields are requested
+    """
+    fields = request.args.get("fields")
+    if fields is None:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    if len(requested) > _MAX_FIELDS:
+        raise exceptions.BadRequest(f"At most {_MAX_FIELDS} fields can be requested")
+    unknown = set(requested) - _PLUGIN_FIELDS
+    if unknown:
+        raise exceptions.BadRequest(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return set(requested)
+
+
+def _get_facet_filters() -> Dict[str, Set[str]]:
+    """
+    Facet values requested with facet.<facet>=<value> query params, a facet can be
+    repeated to match any of multiple values.
+    :raises BadRequest: if unknown facets are requested
+    """
+    filters = {
+        key[len(_FACET_PARAM_PREFIX) :]: set(request.args.getlist(key))
+        for key in request.args
+        if key.startswith(_FACET_PARAM_PREFIX)
+    }
+    unknown = [facet for facet in filters if not is_facet(facet)]
+    if unknown:
+        raise exceptions.BadRequest(f"Unknown facets: {', '.join(sorted(unknown))}")
+    return filters
+
+
+def _conditional_response(payload: Any, immutable: bool = False) -> Response:
+    """
+    Builds a json response tagged with an ETag of its content, returning 304 Not
+    Modified when the ETag matches the If-None-Match header of the request. The body
+    is compressed with the best content-encoding accepted by the client.
+    :param payload: data to serialize into the response, or an already serialized
+    EncodedPayload
+    :param immutable: if the content for the url never changes, allowing clients
+    to cache it without revalidation
+    :return: response with ETag and Cache-Control headers set
+    """
+    if not isinstance(payload, EncodedPayload):
+        payload = to_payload(payload)
+    encoding = payload.negotiate_encoding(request.accept_encodings)
+
+    response = app.response_class(
+        payload.get_body(encoding), mimetype="application/json"
+    )
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add("Accept-Encoding")
+    response.set_etag(payload.get_etag(encoding))
+    response.cache_control.public = True
+    if immutable:
+        response.cache_control.max_age = _IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@app.route("/metrics")
+def get_bulk_plugin_metrics() -> Response:
+    """
+    Fetches usage and maintenance stats for multiple plugins
+    :return Response: A json object keyed on plugin name, with entries for usage and
+    maintenance stats
+
+    :query_params plugins: Comma separated names of plugins to fetch stats for, at
+    most _MAX_METRICS_PLUGINS.
+    :raises BadRequest: if more than _MAX_METRICS_PLUGINS plugins are requested
+    """
+    plugins = request.args.get("plugins", "")
+    names = list(dict.fromkeys(name for name in plugins.split(",") if name))
+    if len(names) > _MAX_METRICS_PLUGINS:
+        raise exceptions.BadRequest(
+            f"At most {_MAX_METRICS_PLUGINS} plugins can be requested"
+        )
+    return jsonify(get_metrics_for_plugins(names))
+
+
 @app.errorhandler(404)
 def handle_exception(e) -> Response:
     links = [
@@ -157,6 +323,13 @@ def handle_exception(e) -> Response:
     )
 
 
+@app.errorhandler(exceptions.BadRequest)
+def handle_bad_request(e) -> Response:
+    return app.make_response(
+        (e.description, 400, {"Content-Type": "text/plain; charset=utf-8"})
+    )
+
+
 @app.errorhandler(exceptions.Unauthorized)
 def handle_permission_exception(e) -> Response:
     logger.error(f"Unauthorized Access to endpoint {request.method} {request.endpoint}")
@@ -165,7 +338,7 @@ def handle_permission_exception(e) -> Response:
 
 @app.errorhandler(Exception)
 def handle_exception(e) -> Response:
-    logger.error(f"An unexpected error has occurred in napari hub: {e}", e)
+    logger.error(f"An unexpected error has occurred in napari hub: {e}", exc_info=e)
     send_alert(f"An unexpected error has occurred in napari hub: {e}")
     return app.make_response(("Internal Server Error", 500))
 
@@ -0,0 +1,110 @@
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+from utils.cache import Snapshot
+
+FACET_FIELDS = [
+    "development_status",
+    "license",
+    "npe2",
+    "operating_system",
+    "plugin_types",
+    "python_version",
+]
+CATEGORY_PREFIX = "category."
+
+
+def is_facet(name: str) -> bool:
+    """
+    Checks if the index can be filtered on the facet, a category facet is its
+    dimension prefixed with 'category.'
+    :param name: name of the facet
+    :return: True if the name is a known facet
+    """
+    if name.startswith(CATEGORY_PREFIX):
+        return len(name) > len(CATEGORY_PREFIX)
+    return name in FACET_FIELDS
+
+
+def filter_index(snapshot: Snapshot, filters: Dict[str, Set[str]]) -> Dict[str, Any]:
+    """
+    Filters the index snapshot on facet values, values of a facet are OR'ed and
+    facets are AND'ed together.
+    :param snapshot: snapshot of the index to filter
+    :param filters: values to match for each facet, category dimensions are
+    facets prefixed with 'category.'
+    :return: Dict with the matching plugins, and the count of matching plugins for
+    each value of every facet
+    """
+    facet_index = snapshot.derive("facets", _build_facet_index)
+    bitmaps = facet_index["bitmaps"]
+
+    matches = facet_index["all"]
+    for facet, values in filters.items():
+        facet_bitmaps = bitmaps.get(facet, {})
+        selected = 0
+        for value in values:
+            selected |= facet_bitmaps.get(value, 0)
+        matches &= selected
+
+    counts = {}
+    for facet, facet_bitmaps in bitmaps.items():
+        facet_counts = {
+            value: _count(bitmap & matches) for value, bitmap in facet_bitmaps.items()
+        }
+        counts[facet] = {value: count for value, count in facet_counts.items() if count}
+
+    index = snapshot.data
+    return {
+        "plugins": [index[i] for i in _iter_positions(matches)],
+        "facets": counts,
+    }
+
+
+def _build_facet_index(index: List[Dict]) -> Dict[str, Any]:
+    """
+    Builds a bitmap of the index positions of the plugins having each facet value.
+    """
+    bitmaps = defaultdict(lambda: defaultdict(int))
+    for position, plugin in enumerate(index):
+        bit = 1 << position
+        for facet, value in _get_facet_values(plugin):
+            bitmaps[facet][value] |= bit
+
+    return {
+        "all": (1 << len(index)) - 1,
+        "bitmaps": {facet: dict(values) for facet, values in bitmaps.items()},
+    }
+
+
+def _get_facet_values(plugin: Dict[str, Any]) -> Iterator[Tuple[str, str]]:
+    for facet in FACET_FIELDS:
+        for value in _to_list(plugin.get(facet)):
+            yield facet, _to_facet_value(value)
+
+    for dimension, labels in (plugin.get("category") or {}).items():
+        for label in _to_list(labels):
+            yield f"{CATEGORY_PREFIX}{dimension}", label
+
+
+def _to_list(value: Any) -> List:
+    if value is None or value == "":
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _to_facet_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _count(bitmap: int) -> int:
+    return bin(bitmap).count("1")
+
+
+def _iter_positions(bitmap: int) -> Iterator[int]:
+    while bitmap:
+        lowest = bitmap & -bitmap
+        yield lowest.bit_length() - 1
+        bitmap ^= lowest
@@ -1,7 +1,7 @@
 import logging
-from typing import List, Dict, Set, Callable, Union
+from typing import Any, List, Dict, Set, Callable
 
-from api.model import get_index
+from api.model import get_index_snapshot
 from random import sample
 from datetime import datetime
 
@@ -17,6 +17,11 @@ DEFAULT_FIELDS = {
     "total_installs",
 }
 PLUGIN_TYPES = ["reader", "sample_data", "widget", "writer"]
+SORT_KEYS = {
+    "newest": ("first_released", ""),
+    "recently_updated": ("release_date", ""),
+    "top_installed": ("total_installs", 0),
+}
 
 logger = logging.getLogger(__name__)
 
@@ -28,17 +33,42 @@ def get_plugin_sections(sections: Set[str], limit: int = 3) -> Dict[str, Dict]:
         logger.warning("No processing as there are no valid sections")
         return response
 
-    index = get_index(
+    snapshot = get_index_snapshot(
         visibility_filter={PluginVisibility.PUBLIC}, include_total_installs=True
     )
+    home_index = snapshot.derive("home", _build_home_index)
     for name, handler in _get_handler_by_section_name().items():
         if name in sections:
-            response[name] = handler(index, limit, plugins_encountered)
+            response[name] = handler(home_index, limit, plugins_encountered)
             logger.info(f"fetched data for {name} section")
 
     return response
 
 
+def _build_home_index(index: List[Dict]) -> Dict[str, Any]:
+    """
+    Precomputes the plugins for each section from the index, built once per index
+    snapshot. Plugins are ranked in descending order of their sort key for sorted
+    sections, and bucketed by plugin type for the plugin_types section.
+    :param index: List of index page metadata for all public plugins
+    :return: Dict of ranked plugins keyed on sorted section name, with plugins
+    keyed on plugin type for the plugin_types section
+    """
+    filtered = [(plugin, _filtered(plugin)) for plugin in index]
+    home_index = {}
+    for section, (key, default_val) in SORT_KEYS.items():
+        ranked = sorted(filtered, key=lambda pair: pair[0].get(key, default_val))
+        home_index[section] = [item for _, item in reversed(ranked)]
+
+    plugins_by_type = {plugin_type: [] for plugin_type in PLUGIN_TYPES}
+    for plugin, item in filtered:
+        for plugin_type in plugin.get("plugin_types", []):
+            if plugin_type in plugins_by_type:
+                plugins_by_type[plugin_type].append(item)
+    home_index["plugin_types"] = plugins_by_type
+    return home_index
+
+
 def _filtered(data: Dict) -> Dict:
     return {field: data.get(field) for field in DEFAULT_FIELDS}
 
@@ -53,49 +83,43 @@ def _add_to_exclusions(exclude: Set[str], plugins: List[Dict]) -> None:
         exclude.add(plugin.get("name"))
 
 
-def _get_plugins_by_type(index: List[Dict], limit: int, exclude: Set) -> Dict:
+def _get_plugins_by_type(home_index: Dict, limit: int, exclude: Set) -> Dict:
     plugin_type = _get_plugin_type()
     logger.info(f"plugin_type section of type={plugin_type}")
-    plugins_of_type = list(
-        filter(lambda item: plugin_type in item.get("plugin_types", []), index)
-    )
-    rand_sample = sample(plugins_of_type, min(limit, len(plugins_of_type)))
-    sampled_plugins = [_filtered(plugin) for plugin in rand_sample]
+    plugins_of_type = home_index["plugin_types"][plugin_type]
+    sampled_plugins = sample(plugins_of_type, min(limit, len(plugins_of_type)))
     _add_to_exclusions(exclude, sampled_plugins)
     return {"type": plugin_type, "plugins": sampled_plugins}
 
 
 def _get_plugins_by_sort(
-    index: List[Dict],
+    ranked: List[Dict],
     limit: int,
-    key: str,
-    default_val: Union[str, int],
     exclude: Set[str],
 ) -> Dict[str, List]:
-    index.sort(key=lambda item: item.get(key, default_val))
-    upper_limit = min(limit, len(index))
     plugins = []
-    while len(plugins) < upper_limit and len(index) > 0:
-        plugin = index.pop()
+    for plugin in ranked:
+        if len(plugins) >= limit:
+            break
         name = plugin.get("name")
         if name in exclude:
             continue
         exclude.add(name)
-        plugins.append(_filtered(plugin))
+        plugins.append(plugin)
 
     return {"plugins": plugins}
 
 
-def _get_newest_plugins(index: List[Dict], limit: int, exclude: Set) -> Dict:
-    return _get_plugins_by_sort(index, limit, "first_released", "", exclude)
+def _get_newest_plugins(home_index: Dict, limit: int, exclude: Set) -> Dict:
+    return _get_plugins_by_sort(home_index["newest"], limit, exclude)
 
 
-def _get_recently_updated_plugins(index: List[Dict], limit: int, exclude: Set) -> Dict:
-    return _get_plugins_by_sort(index, limit, "release_date", "", exclude)
+def _get_recently_updated_plugins(home_index: Dict, limit: int, exclude: Set) -> Dict:
+    return _get_plugins_by_sort(home_index["recently_updated"], limit, exclude)
 
 
-def _get_top_installed_plugins(index: List[Dict], limit: int, exclude: Set) -> Dict:
-    return _get_plugins_by_sort(index, limit, "total_installs", 0, exclude)
+def _get_top_installed_plugins(home_index: Dict, limit: int, exclude: Set) -> Dict:
+    return _get_plugins_by_sort(home_index["top_installed"], limit, exclude)
 
 
 def _get_handler_by_section_name() -> Dict[str, Callable]:
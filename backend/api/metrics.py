@@ -1,8 +1,21 @@
-from typing import Dict, Any, Optional
+import logging
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Dict, Any, Optional, Callable, List
 
-from api.model import get_plugin
+from api.model import get_plugin, get_index_snapshot
 from nhcommons.models import github_activity, install_activity
 
+logger = logging.getLogger(__name__)
+# Bounded pool shared across requests
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("METRICS_MAX_WORKERS", "8")),
+    thread_name_prefix="metrics",
+)
+# seconds a request waits for all of its lookups before failing
+_LOOKUP_TIMEOUT = float(os.getenv("METRICS_LOOKUP_TIMEOUT_SECONDS", "10"))
+
 
 def get_metrics_for_plugin(name: str, limit: str) -> Dict[str, Any]:
     """
@@ -12,56 +25,143 @@ def get_metrics_for_plugin(name: str, limit: str) -> Dict[str, Any]:
     :params str limit_str: Number of timeline records to be fetched. Defaults to 0
     for invalid number.
     """
-    repo = _get_repo_from_plugin(name)
+    deadline = time.monotonic() + _LOOKUP_TIMEOUT
+    repo_lookup = _submit(_get_repo_from_plugin, name)
     name = name.lower()
     month_delta = 0
 
     if limit.isdigit():
         month_delta = max(int(limit), 0)
 
+    usage = _get_usage_data(name, month_delta)
+    repo = _resolve(repo_lookup, deadline)
+    maintenance = _get_maintenance_data(name, repo, month_delta)
+    return {
+        "usage": _resolve(usage, deadline),
+        "maintenance": _resolve(maintenance, deadline),
+    }
+
+
+def get_metrics_for_plugins(names: List[str]) -> Dict[str, Any]:
+    """
+    Fetches usage and maintenance stats for multiple plugins from dynamo, using a
+    BatchGetItem per table instead of per plugin lookups.
+    :return Dict[str, Any]: A dict with entries for usage and maintenance stats keyed
+    on plugin name
+    :params List[str] names: Names of plugins for which stats needs to be fetched.
+    """
+    repo_by_name = get_index_snapshot().derive("repo_by_name", _to_repo_by_name)
+    repo_by_plugin = {name: repo_by_name.get(name.lower()) for name in names}
+
+    deadline = time.monotonic() + _LOOKUP_TIMEOUT
+    total_installs = _submit(install_activity.batch_get_total_installs, names)
+    github_stats = _submit(github_activity.batch_get_stats, repo_by_plugin)
+    total_installs = _resolve(total_installs, deadline)
+    github_stats = _resolve(github_stats, deadline)
+
+    return {
+        name: {
+            "usage": {"stats": {"total_installs": total_installs[name.lower()]}},
+            "maintenance": {"stats": github_stats[name.lower()]},
+        }
+        for name in names
+    }
+
+
+def _to_repo_by_name(index: List[Dict[str, Any]]) -> Dict[str, str]:
+    visibilities = {"public", "hidden"}
     return {
-        "usage": _get_usage_data(name, month_delta),
-        "maintenance": _get_maintenance_data(name, repo, month_delta),
+        item["name"].lower(): _to_repo(item.get("code_repository"))
+        for item in index
+        if item.get("visibility") in visibilities and item.get("code_repository")
     }
 
 
+def _to_repo(repo_url: str) -> str:
+    return repo_url.replace("https://github.com/", "")
+
+
 def _get_repo_from_plugin(name: str) -> Optional[str]:
     plugin_metadata = get_plugin(name)
     if plugin_metadata:
         repo_url = plugin_metadata.get("code_repository")
         if repo_url:
-            return repo_url.replace("https://github.com/", "")
+            return _to_repo(repo_url)
     return None
 
 
 def _get_usage_data(name: str, limit: int) -> Dict[str, Any]:
     """
-    Fetches plugin usage_data from dynamo.
-    :returns Dict[str, Any]: A dict with entries for timeline and stats.
+    Submits the lookups for plugin usage_data from dynamo.
+    :returns Dict[str, Any]: A dict with futures for timeline and stats.
     :params str name: Name of the plugin in lowercase.
     :params int limit: The number of records to be fetched for timeline.
     """
     return {
-        "timeline": install_activity.get_timeline(name, limit) if limit else [],
+        "timeline": _submit(install_activity.get_timeline, name, limit)
+        if limit
+        else [],
         "stats": {
-            "total_installs": install_activity.get_total_installs(name),
-            "installs_in_last_30_days": install_activity.get_recent_installs(name, 30),
+            "total_installs": _submit(install_activity.get_total_installs, name),
+            "installs_in_last_30_days": _submit(
+                install_activity.get_recent_installs, name, 30
+            ),
         },
     }
 
 
 def _get_maintenance_data(name: str, repo: Optional[str], limit: int) -> Dict[str, Any]:
     """
-    Fetches plugin maintenance_data from dynamo.
-    :returns Dict[str, Any]: A dict with entries for timeline and stats.
+    Submits the lookups for plugin maintenance_data from dynamo.
+    :returns Dict[str, Any]: A dict with futures for timeline and stats.
     :params str name: Name of the plugin in lowercase.
     :params repo: Name of the repo associated to the plugin.
     :params int limit: The number of records to be fetched for timeline.
     """
     return {
-        "timeline": github_activity.get_timeline(name, repo, limit) if limit else [],
+        "timeline": _submit(github_activity.get_timeline, name, repo, limit)
+        if limit
+        else [],
         "stats": {
-            "total_commits": github_activity.get_total_commits(name, repo),
-            "latest_commit_timestamp": github_activity.get_latest_commit(name, repo),
+            "total_commits": _submit(github_activity.get_total_commits, name, repo),
+            "latest_commit_timestamp": _submit(
+                github_activity.get_latest_commit, name, repo
+            ),
         },
     }
+
+
+def _submit(func: Callable, *args) -> Future:
+    """
+    Submits the dynamo lookup to the shared executor, logging its duration.
+    """
+    func_name = getattr(func, "__name__", repr(func))
+
+    def _timed_call():
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            logger.info(f"{func_name} args={args} duration={duration}ms")
+
+    return _executor.submit(_timed_call)
+
+
+def _resolve(data: Any, deadline: float) -> Any:
+    """
+    Replaces the lookups nested in the dict with their results, waiting for them
+    until the deadline. A lookup that fails or is still running at the deadline
+    raises, so a missing value is never returned as a real one.
+    :raises TimeoutError: if a lookup has not completed by the deadline
+    """
+    if isinstance(data, Future):
+        try:
+            return data.result(timeout=max(deadline - time.monotonic(), 0))
+        except TimeoutError:
+            data.cancel()
+            logger.error("Metrics lookup did not complete before the deadline")
+            raise
+    if isinstance(data, dict):
+        return {key: _resolve(value, deadline) for key, value in data.items()}
+    return data
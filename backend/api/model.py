@@ -1,10 +1,24 @@
-from typing import Dict, List, Any, Set, Optional
+import os
+import threading
+from typing import Dict, List, Any, Set, Optional, Tuple, FrozenSet
+
 from nhcommons.models import (
-    install_activity,
     plugin_metadata as plugin_metadata_model,
     plugin as plugin_model,
 )
 from nhcommons.models.plugin_utils import PluginVisibility
+from utils.cache import Snapshot, SnapshotCache
+
+_INDEX_CACHE_TTL = float(os.getenv("INDEX_CACHE_TTL_SECONDS", "300"))
+_index_caches: Dict[Tuple[FrozenSet[PluginVisibility], bool], SnapshotCache] = {}
+_index_caches_lock = threading.Lock()
+_plugin_names_cache = SnapshotCache(
+    name="plugin-names",
+    loader=lambda: plugin_model.get_plugin_names(
+        {PluginVisibility.PUBLIC, PluginVisibility.HIDDEN}
+    ),
+    ttl=float(os.getenv("PLUGIN_NAMES_CACHE_TTL_SECONDS", "300")),
+)
 
 
 def _get_manifest_metadata(name: str, version: str) -> Optional[dict]:
@@ -42,28 +56,91 @@ def get_manifest(name: str, version: str = None) -> dict:
     return manifest_metadata
 
 
-def get_index(
+def get_index_snapshot(
     visibility_filter: Optional[Set[PluginVisibility]] = None,
     include_total_installs: bool = False,
-) -> List[Dict[str, Any]]:
+) -> Snapshot[List[Dict[str, Any]]]:
     """
-    Get the index page related metadata for all plugins.
+    Get the cached snapshot of the index page related metadata for all plugins. The
+    snapshot is refreshed in the background once it is older than the cache ttl.
     :params visibility_filter: visibilities to filter results by, if None all plugins
     are returned
     :params include_total_installs: include total_installs in result
-    :return: List for index page metadata
+    :return: Snapshot of the index page metadata, its data should not be mutated
+    """
+    key = (frozenset(visibility_filter or ()), include_total_installs)
+    cache = _index_caches.get(key)
+    if cache is None:
+        visibilities = set(key[0]) or None
+        with _index_caches_lock:
+            cache = _index_caches.setdefault(
+                key,
+                SnapshotCache(
+                    name=f"plugin-index-{'-'.join(sorted(v.name for v in key[0]))}",
+                    loader=lambda: _load_index(visibilities, include_total_installs),
+                    ttl=_INDEX_CACHE_TTL,
+                ),
+            )
+    return cache.get()
+
+
+def invalidate_index() -> None:
+    """
+    Invalidate all cached index snapshots, the next read fetches fresh data.
     """
-    plugins = plugin_model.get_index(visibility_filter)
+    for cache in list(_index_caches.values()):
+        cache.invalidate()
+
+
+def _load_index(
+    visibility_filter: Optional[Set[PluginVisibility]],
+    include_total_installs: bool,
+) -> List[Dict[str, Any]]:
+    plugins = plugin_model.get_index(visibility_filter, include_total_installs)
     if include_total_installs:
-        total_installs = install_activity.get_total_installs_by_plugins()
+        # total_installs is materialized on the plugin by the activity workflow, which
+        # fills it in for plugins without install activity on its reconcile runs
         for item in plugins:
-            item["total_installs"] = total_installs.get(item["name"].lower(), 0)
+            if item.get("total_installs") is None:
+                item["total_installs"] = 0
     return plugins
 
 
-def get_plugin(name: str, version: str = None) -> Dict[str, Any]:
+def is_plugin(name: str) -> bool:
+    """
+    Checks if a public or hidden plugin exists with the name, using an in-memory
+    set of plugin names refreshed in the background.
+    :param name: name of the plugin
+    :return: True if the plugin exists
+    """
+    return name in _plugin_names_cache.get().data
+
+
+def get_plugin(
+    name: str, version: str = None, fields: Optional[Set[str]] = None
+) -> Dict[str, Any]:
+    """
+    Get plugin data for a particular plugin, get the latest if version is None.
+    :param name: name of the plugin to get
+    :param version: version of the plugin
+    :param fields: fields of the plugin data to fetch, all fields if None
+    :return: plugin data dictionary, empty if the plugin is not found
+    """
     visibilities = {PluginVisibility.PUBLIC, PluginVisibility.HIDDEN}
     if version:
-        return plugin_model.get_plugin_by_version(name, version, visibilities)
+        return plugin_model.get_plugin_by_version(name, version, visibilities, fields)
     else:
-        return plugin_model.get_latest_plugin(name, visibilities)
+        return plugin_model.get_latest_plugin(name, visibilities, fields)
+
+
+def select_fields(
+    index: List[Dict[str, Any]], fields: Set[str]
+) -> List[Dict[str, Any]]:
+    """
+    Trims the entries of the index to the fields, name is always included.
+    :param index: index page metadata for plugins
+    :param fields: fields to keep in each entry
+    :return: List of trimmed index page metadata
+    """
+    keep = {"name", *fields}
+    return [{key: item[key] for key in keep if key in item} for item in index]
@@ -0,0 +1,107 @@
+import gzip
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import brotli
+from flask import json
+from werkzeug.datastructures import Accept
+
+logger = logging.getLogger(__name__)
+
+_ENCODERS: Dict[str, Callable[[bytes], bytes]] = {
+    "br": lambda body: brotli.compress(body, mode=brotli.MODE_TEXT, quality=9),
+    "gzip": lambda body: gzip.compress(body, compresslevel=6, mtime=0),
+}
+# apig_wsgi only base64 encodes json bodies with a gzip content-encoding for api
+# gateway, so brotli is only offered by default when not running in lambda
+_DEFAULT_ENCODINGS = "gzip" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "br,gzip"
+_ENCODINGS = [
+    encoding
+    for encoding in os.getenv("RESPONSE_ENCODINGS", _DEFAULT_ENCODINGS).split(",")
+    if encoding in _ENCODERS
+]
+_MIN_COMPRESS_SIZE = 1024
+_MAX_CACHED_PAYLOADS = int(os.getenv("MAX_CACHED_PAYLOADS", "256"))
+
+_payloads: "OrderedDict[str, EncodedPayload]" = OrderedDict()
+_payloads_lock = threading.Lock()
+
+
+class EncodedPayload:
+    """
+    Json payload serialized once in compact form, with its compressed variants
+    built on first use for each content-encoding and kept for reuse.
+    """
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()
+        self._variants: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def get_body(self, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.body
+        if encoding not in self._variants:
+            with self._lock:
+                if encoding not in self._variants:
+                    self._variants[encoding] = self._encode(encoding)
+        return self._variants[encoding]
+
+    def get_etag(self, encoding: Optional[str]) -> str:
+        return f"{self.etag}-{encoding}" if encoding else self.etag
+
+    def negotiate_encoding(self, accept_encodings: Accept) -> Optional[str]:
+        """
+        Pick the content-encoding to use for the payload based on the client's
+        Accept-Encoding header, None indicates the body should not be compressed.
+        """
+        if len(self.body) < _MIN_COMPRESS_SIZE:
+            return None
+        return accept_encodings.best_match(_ENCODINGS)
+
+    def _encode(self, encoding: str) -> bytes:
+        start = time.perf_counter()
+        result = _ENCODERS[encoding](self.body)
+        duration = (time.perf_counter() - start) * 1000
+        logger.info(
+            f"encoding={encoding} etag={self.etag} size={len(self.body)} "
+            f"compressed_size={len(result)} duration={duration}ms"
+        )
+        return result
+
+
+def to_payload(data: Any) -> EncodedPayload:
+    """
+    Serializes data to a compact json payload, reusing the cached payload with its
+    compressed variants if one exists for the same content.
+    :param data: json serializable data
+    :return: payload for the data
+    """
+    payload = EncodedPayload(_serialize(data))
+    with _payloads_lock:
+        cached = _payloads.get(payload.etag)
+        if cached:
+            _payloads.move_to_end(payload.etag)
+            return cached
+        _payloads[payload.etag] = payload
+        if len(_payloads) > _MAX_CACHED_PAYLOADS:
+            _payloads.popitem(last=False)
+    return payload
+
+
+def to_snapshot_payload(data: Any) -> EncodedPayload:
+    """
+    Serializes snapshot data to a payload without going through the shared cache,
+    as the payload is memoized on the snapshot and discarded with it.
+    """
+    return EncodedPayload(_serialize(data))
+
+
+def _serialize(data: Any) -> bytes:
+    return json.dumps(data, separators=(",", ":"), sort_keys=True).encode("utf-8")
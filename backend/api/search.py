@@ -0,0 +1,147 @@
+import math
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterator, List
+
+from api.model import get_index_snapshot
+from nhcommons.models.plugin_utils import PluginVisibility
+
+FIELD_WEIGHTS = {
+    "name": 10.0,
+    "display_name": 8.0,
+    "authors": 4.0,
+    "category": 3.0,
+    "summary": 2.0,
+    "description_text": 1.0,
+}
+PREFIX_MATCH_FACTOR = 0.5
+MIN_PREFIX_LENGTH = 2
+MAX_PAGE_SIZE = 100
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def search_plugins(query: str, page: int = 1, page_size: int = 20) -> Dict[str, Any]:
+    """
+    Searches public plugins on their name, display_name, authors, category labels,
+    summary and description. Every query token has to match a token of the plugin,
+    either fully or as a prefix, and results are ranked by the weighted matches.
+    :param query: text to search for
+    :param page: 1-indexed page of results to return
+    :param page_size: number of results per page, capped at MAX_PAGE_SIZE
+    :return: Dict with the total count of matches, and the index page metadata of
+    the plugins in the page
+    """
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), MAX_PAGE_SIZE)
+    snapshot = get_index_snapshot(
+        visibility_filter={PluginVisibility.PUBLIC}, include_total_installs=True
+    )
+    search_index = snapshot.derive("search", _build_search_index)
+
+    matches = _rank(search_index, _tokenize(query))
+    offset = (page - 1) * page_size
+    documents = search_index["documents"]
+    return {
+        "total": len(matches),
+        "page": page,
+        "page_size": page_size,
+        "plugins": [documents[doc_id] for doc_id in matches[offset:][:page_size]],
+    }
+
+
+def _build_search_index(index: List[Dict]) -> Dict[str, Any]:
+    """
+    Builds an inverted index from tokens to the weighted score of each plugin
+    containing it, along with the sorted vocabulary for prefix lookups.
+    """
+    postings = defaultdict(dict)
+    for doc_id, plugin in enumerate(index):
+        scores = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for token, count in Counter(_tokenize_field(plugin, field)).items():
+                scores[token] += weight * (1 + math.log(count))
+        for token, score in scores.items():
+            postings[token][doc_id] = score
+
+    return {
+        "documents": index,
+        "postings": dict(postings),
+        "vocabulary": sorted(postings),
+    }
+
+
+def _rank(search_index: Dict[str, Any], tokens: List[str]) -> List[int]:
+    if not tokens:
+        return []
+    scores = None
+    for token in set(tokens):
+        token_scores = _match_token(search_index, token)
+        if scores is None:
+            scores = token_scores
+        else:
+            scores = {
+                doc_id: score + token_scores[doc_id]
+                for doc_id, score in scores.items()
+                if doc_id in token_scores
+            }
+        if not scores:
+            return []
+
+    documents = search_index["documents"]
+    return sorted(
+        scores,
+        key=lambda doc_id: (
+            -scores[doc_id],
+            -(documents[doc_id].get("total_installs") or 0),
+            documents[doc_id].get("name", ""),
+        ),
+    )
+
+
+def _match_token(search_index: Dict[str, Any], token: str) -> Dict[int, float]:
+    postings = search_index["postings"]
+    scores = dict(postings.get(token, {}))
+    if len(token) < MIN_PREFIX_LENGTH:
+        return scores
+
+    for match in _prefix_matches(search_index["vocabulary"], token):
+        for doc_id, score in postings[match].items():
+            prefix_score = score * PREFIX_MATCH_FACTOR
+            if prefix_score > scores.get(doc_id, 0):
+                scores[doc_id] = prefix_score
+    return scores
+
+
+def _prefix_matches(vocabulary: List[str], prefix: str) -> Iterator[str]:
+    for i in range(bisect_left(vocabulary, prefix), len(vocabulary)):
+        token = vocabulary[i]
+        if not token.startswith(prefix):
+            break
+        if token != prefix:
+            yield token
+
+
+def _tokenize_field(plugin: Dict[str, Any], field: str) -> Iterator[str]:
+    for text in _get_texts(plugin.get(field)):
+        yield from _tokenize(text)
+
+
+def _get_texts(value: Any) -> Iterator[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        # authors are mappings with a name, categories map dimensions to labels
+        if "name" in value:
+            yield from _get_texts(value["name"])
+        else:
+            for labels in value.values():
+                yield from _get_texts(labels)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _get_texts(item)
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower()) if text else []
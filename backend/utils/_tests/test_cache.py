@@ -0,0 +1,121 @@
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+from utils import cache
+from utils.cache import Snapshot, SnapshotCache
+
+
+class TestSnapshot:
+    def test_versions_are_unique(self):
+        assert Snapshot([]).version != Snapshot([]).version
+
+    def test_derive_builds_once(self):
+        snapshot = Snapshot([3, 1, 2])
+        builder = Mock(side_effect=sorted)
+
+        assert snapshot.derive("sorted", builder) == [1, 2, 3]
+        assert snapshot.derive("sorted", builder) == [1, 2, 3]
+        builder.assert_called_once_with([3, 1, 2])
+
+
+class TestSnapshotCache:
+    @pytest.fixture
+    def clock(self, monkeypatch: pytest.MonkeyPatch) -> Mock:
+        clock = Mock(return_value=100.0)
+        monkeypatch.setattr(cache.time, "monotonic", clock)
+        return clock
+
+    @pytest.fixture
+    def loader(self) -> Mock:
+        return Mock(side_effect=[["first"], ["second"], ["third"]])
+
+    def test_get_loads_once_within_ttl(self, clock: Mock, loader: Mock):
+        snapshot_cache = SnapshotCache("test", loader, ttl=60)
+
+        first = snapshot_cache.get()
+        clock.return_value = 159.0
+        second = snapshot_cache.get()
+
+        assert first is second
+        assert first.data == ["first"]
+        assert snapshot_cache.version == first.version
+        loader.assert_called_once_with()
+
+    def test_get_serves_stale_while_refreshing(self, clock: Mock):
+        release = threading.Event()
+
+        def _loader():
+            if loader.call_count > 1:
+                release.wait(5)
+            return [loader.call_count]
+
+        loader = Mock(side_effect=_loader)
+        snapshot_cache = SnapshotCache("test", loader, ttl=60)
+        first = snapshot_cache.get()
+        clock.return_value = 160.0
+
+        assert snapshot_cache.get() is first
+        assert snapshot_cache.get() is first
+        release.set()
+        for thread in threading.enumerate():
+            if thread.name == "test-refresh":
+                thread.join(5)
+
+        assert snapshot_cache.get().data == [2]
+        assert loader.call_count == 2
+
+    def test_failed_refresh_keeps_stale_snapshot(self, clock: Mock):
+        loader = Mock(side_effect=[["first"], ValueError("boom"), ["third"]])
+        snapshot_cache = SnapshotCache("test", loader, ttl=60)
+        first = snapshot_cache.get()
+        clock.return_value = 160.0
+
+        snapshot_cache._refresh()
+
+        assert snapshot_cache.get() is first
+
+    def test_invalidate(self, clock: Mock, loader: Mock):
+        snapshot_cache = SnapshotCache("test", loader, ttl=60)
+        first = snapshot_cache.get()
+
+        snapshot_cache.invalidate(version="unknown")
+        assert snapshot_cache.get() is first
+
+        snapshot_cache.invalidate(version=first.version)
+        assert snapshot_cache.get().data == ["second"]
+
+        snapshot_cache.invalidate()
+        assert snapshot_cache.get().data == ["third"]
+
+    def test_invalidate_drops_in_flight_refresh(self, clock: Mock):
+        started = threading.Event()
+        release = threading.Event()
+
+        def _loader():
+            if loader.call_count == 2:
+                started.set()
+                release.wait(5)
+            return [loader.call_count]
+
+        loader = Mock(side_effect=_loader)
+        snapshot_cache = SnapshotCache("test", loader, ttl=60)
+        snapshot_cache.get()
+        clock.return_value = 160.0
+        refresh = threading.Thread(target=snapshot_cache._refresh)
+        refresh.start()
+        started.wait(5)
+
+        snapshot_cache.invalidate()
+        release.set()
+        refresh.join(5)
+
+        assert snapshot_cache.version is None
+        assert snapshot_cache.get().data == [3]
+
+    def test_zero_ttl_disables_caching(self, clock: Mock, loader: Mock):
+        snapshot_cache = SnapshotCache("test", loader, ttl=0)
+
+        assert snapshot_cache.get().data == ["first"]
+        assert snapshot_cache.get().data == ["second"]
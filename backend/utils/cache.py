@@ -0,0 +1,134 @@
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+T = TypeVar("T")
+_versions = itertools.count(1)
+
+
+class Snapshot(Generic[T]):
+    """
+    Immutable view of data loaded at a point in time, identified by a version token.
+    Structures derived from the data can be memoized on the snapshot, so that they
+    are built once per version and discarded with it.
+    """
+
+    def __init__(self, data: T):
+        self.data = data
+        self.version = f"{next(_versions)}-{time.time_ns():x}"
+        self.created_at = time.monotonic()
+        self._derived: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def derive(self, key: str, builder: Callable[[T], Any]) -> Any:
+        """
+        Get the structure derived from the snapshot data for the key, building it
+        with the builder on first access.
+        :param key: name identifying the derived structure
+        :param builder: function building the structure from the snapshot data
+        :return: the derived structure for this snapshot
+        """
+        if key in self._derived:
+            return self._derived[key]
+        with self._lock:
+            if key not in self._derived:
+                start = time.perf_counter()
+                self._derived[key] = builder(self.data)
+                duration = (time.perf_counter() - start) * 1000
+                logger.info(
+                    f"derived key={key} version={self.version} duration={duration}ms"
+                )
+            return self._derived[key]
+
+
+class SnapshotCache(Generic[T]):
+    """
+    Process-wide cache holding the latest snapshot returned by a loader.
+
+    The first read loads the snapshot synchronously. Once the snapshot is older than
+    the ttl, readers keep getting the stale snapshot while a single background
+    refresh replaces it (stale-while-revalidate). A ttl of 0 disables caching.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], T], ttl: float):
+        self._name = name
+        self._loader = loader
+        self._ttl = ttl
+        self._snapshot: Optional[Snapshot[T]] = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        # bumped by invalidate, so refreshes started before it are dropped
+        self._generation = 0
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._snapshot.version if self._snapshot else None
+
+    def get(self) -> Snapshot[T]:
+        snapshot = self._snapshot
+        if snapshot is None or self._ttl <= 0:
+            return self._load_sync()
+        if time.monotonic() - snapshot.created_at >= self._ttl:
+            self._refresh_in_background()
+        return snapshot
+
+    def invalidate(self, version: Optional[str] = None) -> None:
+        """
+        Drop the cached snapshot, so that the next read loads fresh data.
+        :param version: if set, only invalidate when the cached snapshot still has
+        this version token
+        """
+        with self._lock:
+            if version is None or self.version == version:
+                logger.info(f"invalidating cache={self._name} version={self.version}")
+                self._snapshot = None
+                self._generation += 1
+
+    def _load_sync(self) -> Snapshot[T]:
+        with self._lock:
+            if self._snapshot is not None and self._ttl > 0:
+                return self._snapshot
+            snapshot = self._load()
+            self._snapshot = snapshot
+            return snapshot
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        thread = threading.Thread(
+            target=self._refresh, name=f"{self._name}-refresh", daemon=True
+        )
+        thread.start()
+
+    def _refresh(self) -> None:
+        with self._lock:
+            generation = self._generation
+        try:
+            snapshot = self._load()
+            with self._lock:
+                if self._generation != generation:
+                    logger.info(
+                        f"dropping refresh of invalidated cache={self._name} "
+                        f"version={snapshot.version}"
+                    )
+                    return
+                self._snapshot = snapshot
+        except Exception:
+            logger.exception(f"Failed refreshing cache={self._name}")
+        finally:
+            self._refreshing = False
+
+    def _load(self) -> Snapshot[T]:
+        start = time.perf_counter()
+        snapshot = Snapshot(self._loader())
+        duration = (time.perf_counter() - start) * 1000
+        logger.info(
+            f"loaded cache={self._name} version={snapshot.version} "
+            f"duration={duration}ms"
+        )
+        return snapshot
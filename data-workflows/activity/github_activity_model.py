@@ -2,10 +2,12 @@ import logging
 import time
 from datetime import date, datetime, time as dt_time
 from enum import Enum, auto
-from typing import Callable, Optional
+from functools import partial
+from typing import Callable, Iterable, Iterator, Optional
 
 from dateutil.relativedelta import relativedelta
 
+from activity.utils import write_streamed
 from nhcommons.models.github_activity import batch_write
 from utils.utils import datetime_to_utc_timestamp_in_millis, to_datetime
 
@@ -67,53 +69,82 @@ class GitHubActivityType(Enum):
     def to_expiry(self, timestamp: Optional[date]) -> Optional[int]:
         return self.expiry_formatter(timestamp)
 
-    def _create_subquery(self, plugins_by_earliest_ts: dict[str, datetime]) -> str:
-        plugins = [f"'{plugin}'" for plugin in plugins_by_earliest_ts.keys()]
-        plugins_subquery = f"repo IN ({','.join(plugins)})"
-
+    def _create_timestamp_filter(self, end_millis: Optional[int] = None) -> str:
+        if self is GitHubActivityType.TOTAL and end_millis is not None:
+            end_timestamp = datetime.utcfromtimestamp(end_millis / 1000.0)
+            return (
+                "AND TO_TIMESTAMP(ingestion_time) <= "
+                f"{TIMESTAMP_FORMAT.format(end_timestamp)}"
+            )
         if self is not GitHubActivityType.MONTH:
-            return plugins_subquery
+            return ""
 
         earliest_date = (date.today() - relativedelta(months=14)).replace(day=1)
         timestamp = datetime.combine(earliest_date, dt_time.min)
-        return (
-            f"{plugins_subquery} AND "
-            f"TO_TIMESTAMP(commit_author_date) >= {TIMESTAMP_FORMAT.format(timestamp)}"
-        )
+        return f"AND TO_TIMESTAMP(commit_author_date) >= {TIMESTAMP_FORMAT.format(timestamp)}"
 
-    def get_query(self, plugins_by_earliest_ts: dict[str, datetime]) -> str:
+    def get_query(
+        self, keys_table: str, keys_alias: str, end_millis: Optional[int] = None
+    ) -> str:
+        """
+        Query for the commit activity of the repos staged in the keys table
+        :param str keys_table: table with the repos in its plugin_name column
+        :param str keys_alias: alias to use for the keys table
+        :param int end_millis: if set, TOTAL only counts the commits ingested up to
+        this timestamp
+        """
         return f"""
                 SELECT
                     repo AS name,
                     {self.query_projection}
                 FROM
                     imaging.github.commits
+                    JOIN {keys_table} AS {keys_alias}
+                        ON repo = {keys_alias}.plugin_name
                 WHERE 
                     repo_type = 'plugin'
-                    AND ({self._create_subquery(plugins_by_earliest_ts)})
+                    {self._create_timestamp_filter(end_millis)}
                 GROUP BY {self.query_sorting}
                 ORDER BY {self.query_sorting}
                 """
 
 
 def transform_and_write_to_dynamo(
-    data: dict[str, list],
+    data: Iterable[tuple[str, list]],
     activity_type: GitHubActivityType,
     plugin_name_by_repo: dict[str, str],
+    counted_until: Optional[int] = None,
 ) -> None:
-    """Transforms data to the json of _GitHubActivity model and then batch writes the
-    formatted data to github-activity dynamo table
-    :param dict[str, list] data: plugin commit activities data keyed on plugin name
+    """Transforms data to the json of _GitHubActivity model and writes the formatted
+    data to github-activity dynamo table while data is still being consumed
+    :param Iterable[tuple[str, list]] data: repo and its commit activities
     :param GitHubActivityType activity_type:
     :param dict[str, str] plugin_name_by_repo: dict mapping repo to plugin name
+    :param int counted_until: ingestion timestamp the TOTAL counts include commits
+    up to, allowing later windows to be added to them
     """
     granularity = activity_type.name
     logger.info(f"Starting for github-activity type={granularity}")
 
-    batch = []
     start = time.perf_counter()
+    items = _to_items(data, activity_type, plugin_name_by_repo, counted_until)
+    count = write_streamed(items, partial(batch_write, skip_unchanged=True))
+    duration = (time.perf_counter() - start) * 1000
+    logger.info(
+        f"Completed processing for github-activity type={granularity} "
+        f"count={count} timeTaken={duration}ms"
+    )
+
 
-    for repo, github_activities in data.items():
+def _to_items(
+    data: Iterable[tuple[str, list]],
+    activity_type: GitHubActivityType,
+    plugin_name_by_repo: dict[str, str],
+    counted_until: Optional[int],
+) -> Iterator[dict]:
+    granularity = activity_type.name
+    is_total = activity_type is GitHubActivityType.TOTAL
+    for repo, github_activities in data:
         plugin_name = plugin_name_by_repo.get(repo)
         if plugin_name is None:
             logger.warning(f"Unable to find plugin name for repo={repo}")
@@ -131,11 +162,6 @@ def transform_and_write_to_dynamo(
                 "repo": repo,
                 "expiry": activity_type.to_expiry(timestamp),
             }
-            batch.append(item)
-
-    batch_write(batch)
-    duration = (time.perf_counter() - start) * 1000
-    logger.info(
-        f"Completed processing for github-activity type={granularity} "
-        f"count={len(batch)} timeTaken={duration}ms"
-    )
+            if is_total and counted_until:
+                item["counted_until"] = counted_until
+            yield item
@@ -2,25 +2,35 @@ import logging
 import time
 from datetime import datetime
 from enum import Enum, auto
-from typing import List, Union
+from functools import partial
+from typing import Iterable, Iterator, List, Optional, Union
 
+from activity.utils import write_streamed
 from nhcommons.models.install_activity import batch_write
 from utils.utils import datetime_to_utc_timestamp_in_millis
 
+try:
+    import pyarrow
+    import pyarrow.compute as pc
+except ImportError:
+    pyarrow = None
+    pc = None
+
 logger = logging.getLogger(__name__)
 
 
 class InstallActivityType(Enum):
-    def __new__(cls, timestamp_formatter, type_timestamp_format):
+    def __new__(cls, timestamp_formatter, type_timestamp_format, strftime_format):
         install_activity_type = object.__new__(cls)
         install_activity_type._value_ = auto()
         install_activity_type.timestamp_formatter = timestamp_formatter
         install_activity_type.type_timestamp_format = type_timestamp_format
+        install_activity_type.strftime_format = strftime_format
         return install_activity_type
 
-    DAY = (datetime_to_utc_timestamp_in_millis, "DAY:{0:%Y%m%d}")
-    MONTH = (datetime_to_utc_timestamp_in_millis, "MONTH:{0:%Y%m}")
-    TOTAL = (lambda timestamp: None, "TOTAL:")
+    DAY = (datetime_to_utc_timestamp_in_millis, "DAY:{0:%Y%m%d}", "DAY:%Y%m%d")
+    MONTH = (datetime_to_utc_timestamp_in_millis, "MONTH:{0:%Y%m}", "MONTH:%Y%m")
+    TOTAL = (lambda timestamp: None, "TOTAL:", "TOTAL:")
 
     def format_to_timestamp(self, timestamp: datetime) -> Union[int, None]:
         return self.timestamp_formatter(timestamp)
@@ -35,15 +45,38 @@ class InstallActivityType(Enum):
 
 
 def transform_and_write_to_dynamo(
-    data: dict[str, List], activity_type: InstallActivityType
+    data: Iterable[tuple[str, List]],
+    activity_type: InstallActivityType,
+    counted_until: Optional[int] = None,
 ) -> None:
+    """
+    Transforms data to the json of _InstallActivity model, and writes the items to
+    the install-activity dynamo table while data is still being consumed.
+    :param Iterable[tuple[str, List]] data: plugin name and its install activities
+    :param InstallActivityType activity_type:
+    :param int counted_until: ingestion timestamp the TOTAL counts include installs
+    up to, allowing later windows to be added to them
+    """
     granularity = activity_type.name
     logger.info(f"Starting for install-activity type={granularity}")
-    is_total = "true" if activity_type is InstallActivityType.TOTAL else None
-    batch = []
 
     start = time.perf_counter()
-    for plugin_name, install_activities in data.items():
+    items = _to_items(data, activity_type, counted_until)
+    count = write_streamed(items, partial(batch_write, skip_unchanged=True))
+    duration = (time.perf_counter() - start) * 1000
+    logger.info(
+        f"Completed processing for install-activity type={granularity} "
+        f"count={count} timeTaken={duration}ms"
+    )
+
+
+def _to_items(
+    data: Iterable[tuple[str, List]],
+    activity_type: InstallActivityType,
+    counted_until: Optional[int],
+) -> Iterator[dict]:
+    is_total = activity_type is InstallActivityType.TOTAL
+    for plugin_name, install_activities in data:
         for activity in install_activities:
             timestamp = activity["timestamp"]
             type_timestamp = activity_type.format_to_type_timestamp(timestamp)
@@ -53,13 +86,62 @@ def transform_and_write_to_dynamo(
                 "granularity": activity_type.name,
                 "timestamp": activity_type.format_to_timestamp(timestamp),
                 "install_count": activity["count"],
-                "is_total": is_total,
+                "is_total": "true" if is_total else None,
             }
-            batch.append(item)
+            if is_total and counted_until:
+                item["counted_until"] = counted_until
+            yield item
 
-    batch_write(batch)
+
+def transform_batches_and_write_to_dynamo(
+    batches: Iterable["pyarrow.RecordBatch"], activity_type: InstallActivityType
+) -> None:
+    """
+    Transforms arrow record batches with NAME, TS and COUNT columns to the json of
+    _InstallActivity model, formatting whole columns at once, and writes the items
+    to the install-activity dynamo table while the batches are still being fetched.
+    :param Iterable[pyarrow.RecordBatch] batches: install counts by name and timestamp
+    :param InstallActivityType activity_type: DAY or MONTH
+    """
+    if activity_type is InstallActivityType.TOTAL:
+        raise ValueError("Columnar transform does not support TOTAL install activity")
+
+    granularity = activity_type.name
+    logger.info(f"Starting columnar write for install-activity type={granularity}")
+    start = time.perf_counter()
+    items = (
+        item
+        for batch in batches
+        for item in _to_install_activity_items(batch, activity_type)
+    )
+    count = write_streamed(items, partial(batch_write, skip_unchanged=True))
     duration = (time.perf_counter() - start) * 1000
     logger.info(
         f"Completed processing for install-activity type={granularity} "
-        f"count={len(batch)} timeTaken={duration}ms"
+        f"count={count} timeTaken={duration}ms"
     )
+
+
+def _to_install_activity_items(
+    batch: "pyarrow.RecordBatch", activity_type: InstallActivityType
+) -> List[dict]:
+    # naive timestamps are utc, matching datetime_to_utc_timestamp_in_millis
+    timestamps = pc.cast(batch.column("TS"), pyarrow.timestamp("ms"))
+    columns = zip(
+        pc.utf8_lower(batch.column("NAME")).to_pylist(),
+        pc.strftime(timestamps, format=activity_type.strftime_format).to_pylist(),
+        pc.cast(timestamps, pyarrow.int64()).to_pylist(),
+        batch.column("COUNT").to_pylist(),
+    )
+    granularity = activity_type.name
+    return [
+        {
+            "plugin_name": plugin_name,
+            "type_timestamp": type_timestamp,
+            "granularity": granularity,
+            "timestamp": timestamp,
+            "install_count": install_count,
+            "is_total": None,
+        }
+        for plugin_name, type_timestamp, timestamp, install_count in columns
+    ]
@@ -1,5 +1,12 @@
+import json
 import logging
+import os
+import threading
+import time
+from concurrent import futures
 from datetime import datetime
+from functools import partial
+from typing import Callable, Iterable, Optional
 
 from activity.install_activity_model import InstallActivityType
 import activity.install_activity_model as install_model
@@ -8,66 +15,562 @@ import activity.github_activity_model as github_model
 import activity.snowflake_adapter as snowflake
 from utils.utils import ParameterStoreAdapter
 import nhcommons
-from nhcommons.models.plugin import get_plugin_name_by_repo
+from nhcommons.models import github_activity, install_activity
+from nhcommons.models.plugin import (
+    get_latest_plugins,
+    get_latest_plugins_without_total_installs,
+    get_plugin_name_by_repo,
+    update_total_installs,
+)
 
 LOGGER = logging.getLogger(__name__)
+_MILLIS_PER_DAY = 24 * 60 * 60 * 1000
+_INSTALL_STAGES = [f"install-{iat.name}" for iat in InstallActivityType]
+_INSTALL_STAGES.append("install-ROLLUP")
+_GITHUB_STAGES = [f"github-{gat.name}" for gat in GitHubActivityType]
+_GITHUB_STAGES.append("github-ROLLUP")
 
 
 def _fetch_install_data_and_write_to_dynamo(
-    data: dict[str, datetime], install_activity_type: InstallActivityType
+    data: dict[str, datetime],
+    install_activity_type: InstallActivityType,
+    end_time: Optional[int] = None,
 ) -> None:
-    plugin_install_data = snowflake.get_plugins_install_count_since_timestamp(
-        data, install_activity_type
+    if snowflake.is_arrow_fetch_enabled():
+        batches = snowflake.get_plugins_install_count_batches(
+            data, install_activity_type, end_millis=end_time
+        )
+        install_model.transform_batches_and_write_to_dynamo(
+            batches, install_activity_type
+        )
+        return
+
+    plugin_install_data = snowflake.iter_plugins_install_count_since_timestamp(
+        data, install_activity_type, end_millis=end_time
     )
     install_model.transform_and_write_to_dynamo(
         plugin_install_data, install_activity_type
     )
 
 
+def _count_total_installs_and_write_to_dynamo(
+    data: dict[str, datetime], counted_until: int, latest_plugins: dict[str, str]
+) -> None:
+    total_activity_type = InstallActivityType.TOTAL
+    plugin_install_data = snowflake.get_plugins_install_count_since_timestamp(
+        data, total_activity_type, end_millis=counted_until
+    )
+    install_model.transform_and_write_to_dynamo(
+        plugin_install_data.items(), total_activity_type, counted_until=counted_until
+    )
+    update_total_installs(
+        {
+            name: sum(activity["count"] for activity in activities)
+            for name, activities in plugin_install_data.items()
+        },
+        latest_plugins,
+    )
+
+
+def _add_total_installs_in_window(
+    data: dict[str, datetime],
+    start_time: int,
+    end_time: int,
+    latest_plugins: dict[str, str],
+) -> None:
+    """
+    Adds the installs ingested in the window to the TOTAL: records, recounting the
+    plugins whose records were not counted until the start of the window.
+    """
+    install_counts = snowflake.get_plugins_install_count_in_window(start_time, end_time)
+    totals, recount = install_activity.add_total_installs(
+        install_counts, start_time, end_time
+    )
+    update_total_installs(totals, latest_plugins)
+    recount_plugins = {name: data[name] for name in recount if name in data}
+    if recount_plugins:
+        LOGGER.info(f"Recounting total installs count={len(recount_plugins)}")
+        _count_total_installs_and_write_to_dynamo(
+            recount_plugins, end_time, latest_plugins
+        )
+
+
 def _fetch_github_data_and_write_to_dynamo(
     data: dict[str, datetime],
     github_activity_type: GitHubActivityType,
     plugin_name_by_repo: dict[str, str],
+    counted_until: Optional[int] = None,
 ) -> None:
-    plugin_commit_data = snowflake.get_plugins_commit_count_since_timestamp(
-        data, github_activity_type
+    plugin_commit_data = snowflake.iter_plugins_commit_count_since_timestamp(
+        data, github_activity_type, end_millis=counted_until
     )
     github_model.transform_and_write_to_dynamo(
-        plugin_commit_data, github_activity_type, plugin_name_by_repo
+        plugin_commit_data,
+        github_activity_type,
+        plugin_name_by_repo,
+        counted_until=counted_until,
     )
 
 
-def _update_install_activity(start_time: int, end_time: int) -> None:
-    updated_plugins = snowflake.get_plugins_with_installs_in_window(
-        start_time, end_time
+def _add_total_commits_in_window(
+    data: dict[str, datetime],
+    plugin_name_by_repo: dict[str, str],
+    start_time: int,
+    end_time: int,
+) -> None:
+    """
+    Adds the commits ingested in the window to the TOTAL:{repo} records, recounting
+    the repos whose records were not counted until the start of the window.
+    """
+    commit_counts = snowflake.get_plugins_commit_count_in_window(start_time, end_time)
+    recount = github_activity.add_total_commits(
+        commit_counts, plugin_name_by_repo, start_time, end_time
     )
-    count = len(updated_plugins)
-    LOGGER.info(f"Plugins with new install activity count={count}")
-    if count == 0:
-        return
+    recount_repos = {repo: data[repo] for repo in recount if repo in data}
+    if recount_repos:
+        LOGGER.info(f"Recounting total commits count={len(recount_repos)}")
+        _fetch_github_data_and_write_to_dynamo(
+            recount_repos,
+            GitHubActivityType.TOTAL,
+            plugin_name_by_repo,
+            counted_until=end_time,
+        )
 
-    for install_activity_type in InstallActivityType:
-        _fetch_install_data_and_write_to_dynamo(updated_plugins, install_activity_type)
 
+def _get_install_activity_stages(
+    updated_plugins: dict[str, datetime],
+    latest_plugins: dict[str, str],
+    start_time: int,
+    end_time: int,
+    incremental_totals: bool,
+) -> dict[str, Callable[[], None]]:
+    LOGGER.info(f"Plugins with new install activity count={len(updated_plugins)}")
+    if not updated_plugins:
+        return {}
+    stages = {
+        f"install-{install_activity_type.name}": partial(
+            _fetch_install_data_and_write_to_dynamo,
+            updated_plugins,
+            install_activity_type,
+        )
+        for install_activity_type in InstallActivityType
+        if install_activity_type is not InstallActivityType.TOTAL
+    }
+    if incremental_totals:
+        stages["install-TOTAL"] = partial(
+            _add_total_installs_in_window,
+            updated_plugins,
+            start_time,
+            end_time,
+            latest_plugins,
+        )
+    else:
+        stages["install-TOTAL"] = partial(
+            _count_total_installs_and_write_to_dynamo,
+            updated_plugins,
+            end_time,
+            latest_plugins,
+        )
+    return stages
 
-def _update_github_activity(start_time: int, end_time: int) -> None:
-    updated_plugins = snowflake.get_plugins_with_commits_in_window(start_time, end_time)
-    count = len(updated_plugins)
-    LOGGER.info(f"Plugins with new github activity count={count}")
-    if count == 0:
-        return
 
-    plugin_name_by_repo = get_plugin_name_by_repo()
-    for github_activity_type in GitHubActivityType:
-        _fetch_github_data_and_write_to_dynamo(
-            updated_plugins, github_activity_type, plugin_name_by_repo
+def _get_github_activity_stages(
+    updated_plugins: dict[str, datetime],
+    plugin_name_by_repo: dict[str, str],
+    start_time: int,
+    end_time: int,
+    incremental_totals: bool,
+) -> dict[str, Callable[[], None]]:
+    LOGGER.info(f"Plugins with new github activity count={len(updated_plugins)}")
+    if not updated_plugins:
+        return {}
+    stages = {
+        f"github-{github_activity_type.name}": partial(
+            _fetch_github_data_and_write_to_dynamo,
+            updated_plugins,
+            github_activity_type,
+            plugin_name_by_repo,
+        )
+        for github_activity_type in GitHubActivityType
+        if github_activity_type is not GitHubActivityType.TOTAL
+    }
+    if incremental_totals:
+        stages["github-TOTAL"] = partial(
+            _add_total_commits_in_window,
+            updated_plugins,
+            plugin_name_by_repo,
+            start_time,
+            end_time,
+        )
+    else:
+        stages["github-TOTAL"] = partial(
+            _fetch_github_data_and_write_to_dynamo,
+            updated_plugins,
+            GitHubActivityType.TOTAL,
+            plugin_name_by_repo,
+            end_time,
+        )
+    return stages
+
+
+def is_incremental_totals_enabled() -> bool:
+    """
+    Returns if TOTAL counts are incremented with the activity ingested since the last
+    update instead of recounted, enabled with the ACTIVITY_INCREMENTAL_TOTALS
+    environment variable.
+    """
+    return os.getenv("ACTIVITY_INCREMENTAL_TOTALS", "false").lower() == "true"
+
+
+def get_reconcile_interval_millis() -> int:
+    """
+    Returns the interval after which TOTAL counts are recounted in full when they are
+    incremented, configured in days with ACTIVITY_TOTALS_RECONCILE_DAYS, defaults to 7.
+    """
+    days = int(os.getenv("ACTIVITY_TOTALS_RECONCILE_DAYS", "7"))
+    return days * _MILLIS_PER_DAY
+
+
+def get_stage_parallelism() -> int:
+    """
+    Returns the number of activity stages run concurrently, configured with the
+    ACTIVITY_STAGE_PARALLELISM environment variable, defaults to 1.
+    """
+    try:
+        return max(int(os.getenv("ACTIVITY_STAGE_PARALLELISM", "1")), 1)
+    except ValueError:
+        LOGGER.warning("Invalid ACTIVITY_STAGE_PARALLELISM, defaulting to 1")
+        return 1
+
+
+def get_window_chunk_millis() -> int:
+    """
+    Returns the maximum length of the windows the activity since the last update is
+    processed in, configured in days with ACTIVITY_WINDOW_CHUNK_DAYS, defaults to 0
+    for a single window.
+    """
+    days = int(os.getenv("ACTIVITY_WINDOW_CHUNK_DAYS", "0"))
+    return max(days, 0) * _MILLIS_PER_DAY
+
+
+def _get_windows(
+    start_time: int, end_time: int, checkpoints: dict[str, int], chunk_millis: int
+) -> list[tuple[int, int]]:
+    """
+    Splits (start_time, end_time] into the windows to process in order. Stages
+    checkpointed past start_time belong to the window of a failed run, which is
+    processed first so it resumes where it stopped. A chunk_millis of 0 processes
+    the rest of the range in a single window.
+    """
+    if chunk_millis < 0:
+        raise ValueError(f"Invalid window chunk_millis={chunk_millis}")
+    windows = []
+    resume_time = max(checkpoints.values(), default=start_time)
+    if start_time < resume_time < end_time:
+        windows.append((start_time, resume_time))
+        start_time = resume_time
+    while start_time < end_time:
+        window_end = (
+            min(start_time + chunk_millis, end_time) if chunk_millis else end_time
+        )
+        windows.append((start_time, window_end))
+        start_time = window_end
+    return windows
+
+
+def _run_stages(
+    stages: dict[str, Callable[[], None]],
+    parallelism: int,
+    on_complete: Optional[Callable[[str], None]] = None,
+) -> dict[str, float]:
+    """
+    Runs the independent stages with at most parallelism of them at the same time,
+    waiting for all of them to complete. The first failure is raised once all stages
+    are done.
+    :returns: duration of each completed stage in milliseconds keyed on stage name
+    """
+    durations = {}
+
+    def _run(name: str, stage: Callable[[], None]) -> None:
+        start = time.perf_counter()
+        try:
+            stage()
+        finally:
+            durations[name] = (time.perf_counter() - start) * 1000
+            LOGGER.info(f"Completed stage={name} timeTaken={durations[name]}ms")
+        if on_complete:
+            on_complete(name)
+
+    with futures.ThreadPoolExecutor(
+        max_workers=parallelism, thread_name_prefix="activity-stage"
+    ) as executor:
+        stage_futures = [
+            executor.submit(_run, name, stage) for name, stage in stages.items()
+        ]
+    for future in stage_futures:
+        future.result()
+    return durations
+
+
+def _update_activity_in_window(
+    checkpoints: dict[str, int],
+    start_time: int,
+    end_time: int,
+    incremental_totals: bool,
+    save_checkpoints: Callable[[dict[str, int]], None],
+) -> None:
+    """
+    Runs the stages for the activity ingested in (start_time, end_time], skipping the
+    stages checkpointed at end_time, and checkpoints each stage once it completes.
+    """
+    lock = threading.Lock()
+
+    def _is_pending(names: Iterable[str]) -> bool:
+        return any(checkpoints.get(name, start_time) < end_time for name in names)
+
+    def _checkpoint(name: str) -> None:
+        with lock:
+            checkpoints[name] = end_time
+            save_checkpoints(dict(checkpoints))
+
+    plugins_with_installs = {}
+    if _is_pending(_INSTALL_STAGES):
+        plugins_with_installs = snowflake.get_plugins_with_installs_in_window(
+            start_time, end_time
         )
+    repos_with_commits = {}
+    if _is_pending(_GITHUB_STAGES):
+        repos_with_commits = snowflake.get_plugins_with_commits_in_window(
+            start_time, end_time
+        )
+    latest_plugins = get_latest_plugins() if plugins_with_installs else {}
+    plugin_name_by_repo = get_plugin_name_by_repo() if repos_with_commits else {}
+    window = (start_time, end_time, incremental_totals)
+    stages = {
+        **_get_install_activity_stages(plugins_with_installs, latest_plugins, *window),
+        **_get_github_activity_stages(repos_with_commits, plugin_name_by_repo, *window),
+    }
+    stages = {name: stage for name, stage in stages.items() if _is_pending([name])}
+    parallelism = get_stage_parallelism()
+    start = time.perf_counter()
+    durations = _run_stages(stages, parallelism, on_complete=_checkpoint)
+    duration = (time.perf_counter() - start) * 1000
+    LOGGER.info(
+        f"Completed activity stages start={start_time} end={end_time} "
+        f"parallelism={parallelism} timeTaken={duration}ms stages={durations}"
+    )
+
+    rollups = _get_rollups(
+        plugins_with_installs, repos_with_commits, plugin_name_by_repo
+    )
+    for name, rollup in rollups.items():
+        if _is_pending([name]):
+            rollup()
+            _checkpoint(name)
+
+
+def _get_rollups(
+    plugins_with_installs: dict[str, datetime],
+    repos_with_commits: dict[str, datetime],
+    plugin_name_by_repo: dict[str, str],
+) -> dict[str, Callable[[], None]]:
+    rollups = {}
+    if plugins_with_installs:
+        rollups["install-ROLLUP"] = partial(
+            install_activity.write_rollups, plugins_with_installs.keys()
+        )
+    if repos_with_commits:
+        rollups["github-ROLLUP"] = partial(
+            github_activity.write_rollups,
+            {
+                repo: plugin_name_by_repo[repo]
+                for repo in repos_with_commits
+                if repo in plugin_name_by_repo
+            },
+        )
+    return rollups
 
 
 def update_activity() -> None:
     parameter_store = ParameterStoreAdapter()
     last_updated_timestamp = parameter_store.get_last_updated_timestamp()
     current_timestamp = nhcommons.utils.get_current_timestamp()
-    _update_install_activity(last_updated_timestamp, current_timestamp)
-    _update_github_activity(last_updated_timestamp, current_timestamp)
-    parameter_store.set_last_updated_timestamp(current_timestamp)
+    incremental_totals = is_incremental_totals_enabled()
+    if incremental_totals:
+        last_reconciled_timestamp = parameter_store.get_last_reconciled_timestamp()
+        incremental_totals = (
+            last_reconciled_timestamp is not None
+            and current_timestamp - last_reconciled_timestamp
+            < get_reconcile_interval_millis()
+        )
+    checkpoints = parameter_store.get_stage_checkpoints()
+    windows = _get_windows(
+        last_updated_timestamp,
+        current_timestamp,
+        checkpoints,
+        get_window_chunk_millis(),
+    )
+    LOGGER.info(
+        f"Updating activity incremental_totals={incremental_totals} "
+        f"windows={len(windows)}"
+    )
+
+    with snowflake.snowflake_session():
+        for start_time, end_time in windows:
+            _update_activity_in_window(
+                checkpoints,
+                start_time,
+                end_time,
+                incremental_totals,
+                parameter_store.set_stage_checkpoints,
+            )
+            # advancing the last updated timestamp also clears the saved checkpoints
+            parameter_store.set_last_updated_timestamp(end_time)
+            checkpoints.clear()
+    if not incremental_totals:
+        _add_missing_total_installs()
+        parameter_store.set_last_reconciled_timestamp(current_timestamp)
+
+
+def _add_missing_total_installs() -> None:
+    """
+    Sets total_installs on the latest plugins that have none yet, so plugins without
+    install activity in the updated windows are materialized as well.
+    """
+    latest_plugins = get_latest_plugins_without_total_installs()
+    LOGGER.info(f"Plugins missing total installs count={len(latest_plugins)}")
+    if latest_plugins:
+        totals = install_activity.batch_get_total_installs(latest_plugins.keys())
+        update_total_installs(totals, latest_plugins)
+
+
+def backfill_activity(
+    start_time: int,
+    end_time: int,
+    chunk_days: int,
+    workers: int,
+    progress_path: str,
+) -> None:
+    """
+    Rebuilds the activity ingested in (start_time, end_time] in windows of chunk_days,
+    processed by a pool of workers. Each window rewrites the DAY and MONTH install
+    records of the periods its installs fall in, counted in full, so windows can be
+    processed in any order. Completed windows are saved to the progress file and
+    skipped when the backfill is rerun with the same range and chunk_days. Once all
+    windows are done, the totals, commit activity and rollups of the plugins and
+    repos active in the range are rebuilt in a single pass. The last updated
+    timestamp and stage checkpoints of the scheduled workflow are left as is.
+
+    :param int start_time: timestamp the range starts after
+    :param int end_time: timestamp the range ends at
+    :param int chunk_days: number of days in each window
+    :param int workers: number of windows processed at the same time
+    :param str progress_path: path of the file tracking completed windows
+    """
+    if chunk_days < 1 or workers < 1:
+        raise ValueError(
+            f"Invalid backfill chunk_days={chunk_days} workers={workers}, both must "
+            f"be positive"
+        )
+    windows = _get_windows(start_time, end_time, {}, chunk_days * _MILLIS_PER_DAY)
+    completed = _load_backfill_progress(progress_path)
+    pending = [window for window in windows if window not in completed]
+    LOGGER.info(
+        f"Backfilling activity windows={len(windows)} pending={len(pending)} "
+        f"workers={workers}"
+    )
+    lock = threading.Lock()
+
+    def _backfill_window(window: tuple[int, int]) -> None:
+        _backfill_installs_in_window(*window)
+        with lock:
+            completed.add(window)
+            _save_backfill_progress(progress_path, completed)
+        LOGGER.info(f"Backfilled window start={window[0]} end={window[1]}")
+
+    with snowflake.snowflake_session():
+        with futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="activity-backfill"
+        ) as executor:
+            window_futures = [
+                executor.submit(_backfill_window, window) for window in pending
+            ]
+        for future in window_futures:
+            future.result()
+        _backfill_totals(start_time, end_time)
+
+
+def _backfill_installs_in_window(start_time: int, end_time: int) -> None:
+    """
+    Rewrites the DAY and MONTH install records of the plugins with installs ingested
+    in the window, only querying the periods up to the one containing end_time.
+    """
+    plugins_with_installs = snowflake.get_plugins_with_installs_in_window(
+        start_time, end_time
+    )
+    LOGGER.info(f"Plugins with new install activity count={len(plugins_with_installs)}")
+    if not plugins_with_installs:
+        return
+    stages = {
+        f"install-{install_activity_type.name}": partial(
+            _fetch_install_data_and_write_to_dynamo,
+            plugins_with_installs,
+            install_activity_type,
+            end_time,
+        )
+        for install_activity_type in InstallActivityType
+        if install_activity_type is not InstallActivityType.TOTAL
+    }
+    _run_stages(stages, get_stage_parallelism())
+
+
+def _backfill_totals(start_time: int, end_time: int) -> None:
+    """
+    Recounts the TOTAL records, rebuilds the commit activity, and writes the rollups
+    of the plugins and repos with activity ingested in (start_time, end_time]. The
+    TOTAL records are counted until the current timestamp, as the installs and
+    commits are counted over all time.
+    """
+    plugins_with_installs = snowflake.get_plugins_with_installs_in_window(
+        start_time, end_time
+    )
+    repos_with_commits = snowflake.get_plugins_with_commits_in_window(
+        start_time, end_time
+    )
+    latest_plugins = get_latest_plugins() if plugins_with_installs else {}
+    plugin_name_by_repo = get_plugin_name_by_repo() if repos_with_commits else {}
+    counted_until = nhcommons.utils.get_current_timestamp()
+    LOGGER.info(
+        f"Backfilling totals plugins={len(plugins_with_installs)} "
+        f"repos={len(repos_with_commits)}"
+    )
+    stages = _get_github_activity_stages(
+        repos_with_commits, plugin_name_by_repo, start_time, counted_until, False
+    )
+    if plugins_with_installs:
+        stages["install-TOTAL"] = partial(
+            _count_total_installs_and_write_to_dynamo,
+            plugins_with_installs,
+            counted_until,
+            latest_plugins,
+        )
+    _run_stages(stages, get_stage_parallelism())
+    rollups = _get_rollups(
+        plugins_with_installs, repos_with_commits, plugin_name_by_repo
+    )
+    for rollup in rollups.values():
+        rollup()
+
+
+def _load_backfill_progress(path: str) -> set[tuple[int, int]]:
+    if not os.path.exists(path):
+        return set()
+    with open(path) as file:
+        return {tuple(window) for window in json.load(file)["completed"]}
+
+
+def _save_backfill_progress(path: str, completed: set[tuple[int, int]]) -> None:
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump({"completed": sorted(completed)}, file)
+    os.replace(temp_path, path)
@@ -1,20 +1,127 @@
-import copy
+import hashlib
 import logging
+import threading
 import time
+from contextlib import contextmanager
 from datetime import datetime
 import os
 from functools import reduce
-from typing import List, Any, Callable, Iterable
+from itertools import chain, groupby
+from typing import List, Any, Callable, Iterable, Iterator, Optional
 
 import snowflake.connector
+from snowflake.connector import SnowflakeConnection
 from snowflake.connector.cursor import SnowflakeCursor
 
 from activity.install_activity_model import InstallActivityType
 from activity.github_activity_model import GitHubActivityType
 from activity.utils import generate_months_default_value
 
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
 LOGGER = logging.getLogger(__name__)
 TIMESTAMP_FORMAT = "TO_TIMESTAMP('{0:%Y-%m-%d %H:%M:%S}')"
+KEYS_TABLE_ALIAS = "plugin_keys"
+
+
+class _SnowflakeSession:
+    """
+    Snowflake connections reused by all queries run within a session, opened on
+    first use for each schema and closed together when the session ends.
+    """
+
+    def __init__(self):
+        self._connections: dict[str, SnowflakeConnection] = {}
+        self._staged_tables: set[tuple[str, str]] = set()
+        self._lock = threading.Lock()
+
+    def get_connection(self, schema: str) -> SnowflakeConnection:
+        with self._lock:
+            if schema not in self._connections:
+                self._connections[schema] = _connect(schema)
+            return self._connections[schema]
+
+    def stage_keys(
+        self, schema: str, plugins_by_earliest_ts: dict[str, datetime]
+    ) -> str:
+        """
+        Uploads the plugin names with their earliest timestamp to a temporary table
+        using bound parameters, the table is only uploaded once per session for the
+        same keys.
+        :returns: name of the temporary table with plugin_name and
+        earliest_timestamp columns
+        """
+        rows = sorted(
+            (name, f"{ts:%Y-%m-%d %H:%M:%S}")
+            for name, ts in plugins_by_earliest_ts.items()
+        )
+        digest = hashlib.sha1(repr(rows).encode("utf-8")).hexdigest()[:16]
+        table = f"{KEYS_TABLE_ALIAS}_{digest}"
+        connection = self.get_connection(schema)
+        with self._lock:
+            if (schema, table) in self._staged_tables:
+                return table
+            start = time.perf_counter()
+            cursor = connection.cursor()
+            try:
+                cursor.execute(
+                    f"CREATE TEMPORARY TABLE {table} "
+                    f"(plugin_name VARCHAR, earliest_timestamp TIMESTAMP_NTZ)"
+                )
+                if rows:
+                    cursor.executemany(
+                        f"INSERT INTO {table} (plugin_name, earliest_timestamp) "
+                        f"VALUES (%s, %s)",
+                        rows,
+                    )
+            finally:
+                cursor.close()
+                duration = time.perf_counter() - start
+                LOGGER.info(
+                    f"Staged keys table={table} count={len(rows)} "
+                    f"time={duration * 1000}ms"
+                )
+            self._staged_tables.add((schema, table))
+            return table
+
+    def close(self) -> None:
+        with self._lock:
+            for schema, connection in self._connections.items():
+                try:
+                    connection.close()
+                except Exception:
+                    LOGGER.exception(f"Exception closing connection schema={schema}")
+            self._connections.clear()
+            self._staged_tables.clear()
+
+
+_session: Optional[_SnowflakeSession] = None
+_session_lock = threading.Lock()
+
+
+@contextmanager
+def snowflake_session() -> Iterator[None]:
+    """
+    Context in which queries reuse their snowflake connection instead of
+    authenticating for each query, the connections are closed on exit. Nested
+    contexts reuse the outermost session.
+    """
+    global _session
+    with _session_lock:
+        is_owner = _session is None
+        if is_owner:
+            _session = _SnowflakeSession()
+        session = _session
+    try:
+        yield
+    finally:
+        if is_owner:
+            with _session_lock:
+                _session = None
+            session.close()
 
 
 def get_plugins_with_installs_in_window(
@@ -40,28 +147,135 @@ def get_plugins_with_installs_in_window(
     return _mapped_query_results(query, "PYPI", {}, _cursor_to_timestamp_by_name_mapper)
 
 
+def is_arrow_fetch_enabled() -> bool:
+    """
+    Returns if query results should be fetched as arrow record batches, enabled with
+    the SNOWFLAKE_ARROW_FETCH environment variable.
+    :raises RuntimeError: if arrow fetch is enabled without pyarrow installed
+    """
+    if os.getenv("SNOWFLAKE_ARROW_FETCH", "false").lower() != "true":
+        return False
+    if pyarrow is None:
+        raise RuntimeError(
+            "SNOWFLAKE_ARROW_FETCH requires pyarrow, install "
+            "snowflake-connector-python[pandas]"
+        )
+    return True
+
+
 def get_plugins_install_count_since_timestamp(
     plugins_by_earliest_ts: dict[str, datetime],
     install_activity_type: InstallActivityType,
+    end_millis: Optional[int] = None,
 ) -> dict[str, List]:
-    query = f"""
+    """
+    Fetches the install counts of the plugins since their earliest timestamp.
+    :param dict[str, datetime] plugins_by_earliest_ts: plugin name by earliest
+    timestamp of the installs to count
+    :param InstallActivityType install_activity_type:
+    :param int end_millis: if set, only the DAY and MONTH periods up to the one
+    containing this timestamp are counted, and TOTAL only counts the installs
+    ingested up to it
+    """
+    with snowflake_session():
+        keys_table = _session.stage_keys("PYPI", plugins_by_earliest_ts)
+        query = _get_install_count_query(keys_table, install_activity_type, end_millis)
+        LOGGER.info(f"Fetching data for granularity={install_activity_type.name}")
+        counts_by_name = _mapped_query_results(
+            query, "PYPI", {}, _get_cursor_to_plugin_activity_mapper([])
+        )
+        return _to_activity_entries(counts_by_name)
+
+
+def iter_plugins_install_count_since_timestamp(
+    plugins_by_earliest_ts: dict[str, datetime],
+    install_activity_type: InstallActivityType,
+    end_millis: Optional[int] = None,
+) -> Iterator[tuple[str, List]]:
+    """
+    Streams the same install counts as get_plugins_install_count_since_timestamp, one
+    plugin at a time while the query results are being fetched. This relies on the
+    query results being ordered on name.
+    """
+    with snowflake_session():
+        keys_table = _session.stage_keys("PYPI", plugins_by_earliest_ts)
+        query = _get_install_count_query(keys_table, install_activity_type, end_millis)
+        LOGGER.info(f"Fetching data for granularity={install_activity_type.name}")
+        yield from _grouped_query_results(
+            query,
+            "PYPI",
+            _get_cursor_to_plugin_activity_mapper([]),
+            _to_activity_entries,
+        )
+
+
+def get_plugins_install_count_batches(
+    plugins_by_earliest_ts: dict[str, datetime],
+    install_activity_type: InstallActivityType,
+    end_millis: Optional[int] = None,
+) -> Iterator["pyarrow.RecordBatch"]:
+    """
+    Fetches the same install counts as get_plugins_install_count_since_timestamp as
+    arrow record batches with NAME, TS and COUNT columns, without creating python
+    objects for each row. The batches are fetched lazily as they are iterated.
+    """
+    with snowflake_session():
+        keys_table = _session.stage_keys("PYPI", plugins_by_earliest_ts)
+        query = _get_install_count_query(keys_table, install_activity_type, end_millis)
+        LOGGER.info(
+            f"Fetching arrow batches for granularity={install_activity_type.name}"
+        )
+        yield from _fetch_arrow_batches("PYPI", query)
+
+
+def _get_install_count_query(
+    keys_table: str,
+    install_activity_type: InstallActivityType,
+    end_millis: Optional[int] = None,
+) -> str:
+    return f"""
             SELECT 
                 LOWER(file_project) AS name, 
                 {install_activity_type.get_query_timestamp_projection()} AS ts, 
                 COUNT(*) AS count
             FROM
                 imaging.pypi.labeled_downloads
+                JOIN {keys_table} AS {KEYS_TABLE_ALIAS}
+                    ON LOWER(file_project) = {KEYS_TABLE_ALIAS}.plugin_name
             WHERE 
                 download_type = 'pip'
                 AND project_type = 'plugin'
-                AND ({_generate_subquery_by_type(plugins_by_earliest_ts, install_activity_type)})
+                {_generate_timestamp_filter(install_activity_type, end_millis)}
             GROUP BY name, ts
             ORDER BY name, ts
             """
-    LOGGER.info(f"Fetching data for granularity={install_activity_type.name}")
-    return _mapped_query_results(
-        query, "PYPI", {}, _get_cursor_to_plugin_activity_mapper([])
+
+
+def get_plugins_install_count_in_window(
+    start_millis: int, end_millis: int
+) -> dict[str, int]:
+    """
+    Counts the installs of each plugin ingested in the window (start, end], used to
+    increment the total installs without counting all of their history.
+    """
+    query = f"""
+            SELECT 
+                LOWER(file_project) AS name, 
+                COUNT(*) AS count
+            FROM
+                imaging.pypi.labeled_downloads
+            WHERE 
+                download_type = 'pip'
+                AND project_type = 'plugin'
+                AND TO_TIMESTAMP(ingestion_timestamp) > {_format_timestamp(timestamp_millis=start_millis)}
+                AND TO_TIMESTAMP(ingestion_timestamp) <= {_format_timestamp(timestamp_millis=end_millis)}
+            GROUP BY name
+            ORDER BY name
+            """
+    LOGGER.info(
+        f"Counting installs ingested between start_timestamp={start_millis} end_timestamp={end_millis}"
     )
+    return _mapped_query_results(query, "PYPI", {}, _cursor_to_count_by_name_mapper)
 
 
 def get_plugins_with_commits_in_window(
@@ -88,9 +302,36 @@ def get_plugins_with_commits_in_window(
     )
 
 
+def get_plugins_commit_count_in_window(
+    start_millis: int, end_millis: int
+) -> dict[str, int]:
+    """
+    Counts the commits of each repo ingested in the window (start, end], used to
+    increment the total commits without counting all of their history.
+    """
+    query = f"""
+            SELECT 
+                repo AS name, 
+                COUNT(*) AS commit_count 
+            FROM 
+                imaging.github.commits  
+            WHERE 
+                repo_type = 'plugin'
+                AND TO_TIMESTAMP(ingestion_time) > {_format_timestamp(timestamp_millis=start_millis)}
+                AND TO_TIMESTAMP(ingestion_time) <= {_format_timestamp(timestamp_millis=end_millis)}
+            GROUP BY name
+            ORDER BY name
+            """
+    LOGGER.info(
+        f"Counting commits ingested between start_timestamp={start_millis} end_timestamp={end_millis}"
+    )
+    return _mapped_query_results(query, "GITHUB", {}, _cursor_to_count_by_name_mapper)
+
+
 def get_plugins_commit_count_since_timestamp(
     plugins_by_earliest_ts: dict[str, datetime],
     github_activity_type: GitHubActivityType,
+    end_millis: Optional[int] = None,
 ) -> dict[str, List]:
     """This method gets the commit data since a specific starting point for each plugin.
     If GitHubActivityType.LATEST, fetch the latest commit timestamp, so construct query
@@ -102,56 +343,105 @@ def get_plugins_commit_count_since_timestamp(
     :param dict[str, datetime] plugins_by_earliest_ts: plugin name by earliest timestamp
      of commit record added
     :param GitHubActivityType github_activity_type:
+    :param int end_millis: if set, TOTAL only counts the commits ingested up to this
+    timestamp
     """
-    if github_activity_type is GitHubActivityType.LATEST:
-        accumulator_updater = _cursor_to_plugin_github_activity_latest_mapper
-    elif github_activity_type is GitHubActivityType.MONTH:
-        default_value = generate_months_default_value(14)
-        accumulator_updater = _get_cursor_to_plugin_activity_mapper(default_value)
-    else:
-        accumulator_updater = _cursor_to_plugin_github_activity_total_mapper
+    accumulator_updater, materializer = _get_github_activity_reducer(
+        github_activity_type
+    )
     LOGGER.info(f"Fetching data for granularity={github_activity_type.name}")
-    return _mapped_query_results(
-        query=github_activity_type.get_query(plugins_by_earliest_ts),
-        schema="GITHUB",
-        accumulator={},
-        accumulator_updater=accumulator_updater,
+    with snowflake_session():
+        keys_table = _session.stage_keys("GITHUB", plugins_by_earliest_ts)
+        result = _mapped_query_results(
+            query=github_activity_type.get_query(
+                keys_table, KEYS_TABLE_ALIAS, end_millis
+            ),
+            schema="GITHUB",
+            accumulator={},
+            accumulator_updater=accumulator_updater,
+        )
+    return materializer(result) if materializer else result
+
+
+def iter_plugins_commit_count_since_timestamp(
+    plugins_by_earliest_ts: dict[str, datetime],
+    github_activity_type: GitHubActivityType,
+    end_millis: Optional[int] = None,
+) -> Iterator[tuple[str, List]]:
+    """
+    Streams the same commit data as get_plugins_commit_count_since_timestamp, one
+    repo at a time while the query results are being fetched. This relies on the
+    query results being ordered on name.
+    """
+    accumulator_updater, materializer = _get_github_activity_reducer(
+        github_activity_type
     )
+    LOGGER.info(f"Fetching data for granularity={github_activity_type.name}")
+    with snowflake_session():
+        keys_table = _session.stage_keys("GITHUB", plugins_by_earliest_ts)
+        yield from _grouped_query_results(
+            query=github_activity_type.get_query(
+                keys_table, KEYS_TABLE_ALIAS, end_millis
+            ),
+            schema="GITHUB",
+            accumulator_updater=accumulator_updater,
+            materializer=materializer,
+        )
 
 
-def _generate_subquery_by_type(
-    plugins_by_timestamp: dict[str, datetime],
-    install_activity_type: InstallActivityType,
-):
+def _get_github_activity_reducer(
+    github_activity_type: GitHubActivityType,
+) -> tuple[Callable, Optional[Callable[[dict], dict]]]:
+    """
+    Returns the accumulator updater for the cursor records of the activity type, and
+    the materializer to apply on the accumulated result if any.
+    """
+    if github_activity_type is GitHubActivityType.LATEST:
+        return _cursor_to_plugin_github_activity_latest_mapper, None
+    if github_activity_type is GitHubActivityType.MONTH:
+        default_value = generate_months_default_value(14)
+        mapper = _get_cursor_to_plugin_activity_mapper(default_value)
+        return mapper, _to_activity_entries
+    return _cursor_to_plugin_github_activity_total_mapper, None
+
+
+def _generate_timestamp_filter(
+    install_activity_type: InstallActivityType, end_millis: Optional[int] = None
+) -> str:
     """
-    Returns subquery clause generated from the plugins_by_timestamp data based on the InstallActivityType. It is used to
+    Returns the filter on the install timestamp joined with the staged keys, used to
     get the install count since a specific starting point for each plugin.
-    If InstallActivityType.TOTAL, fetch the sum of installs over all time, so construct subquery without timestamp
-    constraint.
-    If InstallActivityType.MONTH, fetch the sum of installs from the beginning of the month of the timestamp specified
-    for each of the plugin.
-    If InstallActivityType.DAY, fetch the sum of installs from the beginning of the day of the timestamp specified
-    for each of the plugin.
-    :param dict[str, datetime] plugins_by_timestamp: plugin name by earliest timestamp of install record added
+    If InstallActivityType.TOTAL, fetch the sum of installs over all time, so there is
+    no timestamp constraint.
+    If InstallActivityType.MONTH, fetch the sum of installs from the beginning of the
+    month of the earliest timestamp of the plugin.
+    If InstallActivityType.DAY, fetch the sum of installs from the beginning of the
+    day of the earliest timestamp of the plugin.
+    Installs are ingested after they happen, so the installs ingested up to end_millis
+    are all in the periods up to the one containing it. Those periods are counted in
+    full, as installs ingested later in them are counted as well. TOTAL only counts
+    the installs ingested up to end_millis, matching the counted_until it is stored
+    with.
     :param InstallActivityType install_activity_type:
+    :param int end_millis: timestamp of the last period to count, unbounded if None
     """
+    earliest_timestamp = f"{KEYS_TABLE_ALIAS}.earliest_timestamp"
     if install_activity_type is InstallActivityType.TOTAL:
-        return f"""LOWER(file_project) IN ({','.join([f"'{plugin}'" for plugin in plugins_by_timestamp.keys()])})"""
-
+        if end_millis is None:
+            return ""
+        end_timestamp = _format_timestamp(timestamp_millis=end_millis)
+        return f"AND TO_TIMESTAMP(ingestion_timestamp) <= {end_timestamp}"
+    period = install_activity_type.name
     if install_activity_type is InstallActivityType.MONTH:
-        plugins_by_formatted_timestamp = {
-            plugin: ts.replace(day=1) for plugin, ts in plugins_by_timestamp.items()
-        }
-    else:
-        plugins_by_formatted_timestamp = plugins_by_timestamp
-
-    return " OR ".join(
-        [
-            f"LOWER(file_project) = '{name}' AND timestamp >= "
-            f"{TIMESTAMP_FORMAT.format(ts)}"
-            for name, ts in plugins_by_formatted_timestamp.items()
-        ]
-    )
+        earliest_timestamp = f"DATE_TRUNC('MONTH', {earliest_timestamp})"
+    timestamp_filter = f"AND timestamp >= {earliest_timestamp}"
+    if end_millis is not None:
+        end_timestamp = _format_timestamp(timestamp_millis=end_millis)
+        timestamp_filter += (
+            f" AND timestamp < DATEADD('{period}', 1, "
+            f"DATE_TRUNC('{period}', {end_timestamp}))"
+        )
+    return timestamp_filter
 
 
 def _format_timestamp(timestamp_millis):
@@ -173,33 +463,62 @@ def _cursor_to_timestamp_by_name_mapper(
     return accumulator
 
 
+def _cursor_to_count_by_name_mapper(
+    accumulator: dict[str, int], cursor
+) -> dict[str, int]:
+    """
+    Updates the accumulator with data from the cursor. Count is added to the
+    accumulator keyed on name.
+    The cursor contains the fields name and count
+    :param dict[str, int] accumulator: Accumulator that will be updated with new data
+    :param SnowflakeCursor cursor:
+    :returns: Accumulator after data from cursor has been added
+    """
+    for name, count in cursor:
+        accumulator[name] = accumulator.get(name, 0) + count
+    return accumulator
+
+
 def _get_cursor_to_plugin_activity_mapper(
     default_val: List,
-) -> Callable[[dict[str, List], Any], dict[str, List]]:
-    def _mapper(accumulator: dict[str, List], cursor: Any) -> dict[str, List]:
+) -> Callable[[dict[str, dict], Any], dict[str, dict]]:
+    default_counts = {item["timestamp"]: item["count"] for item in default_val}
+
+    def _mapper(accumulator: dict[str, dict], cursor: Any) -> dict[str, dict]:
         """
-        Updates the accumulator with data from the cursor. Object with timestamp and
-        count attributes are created from the cursor record and added to the accumulator
-        keyed on name.
+        Updates the accumulator with data from the cursor. The count is added to the
+        accumulator keyed on name and timestamp, so each record is accumulated in
+        constant time. Use _to_activity_entries to get the list of entries per name.
         The cursor contains the fields name, timestamp, and count
-        :param dict[str, List] accumulator: Accumulator that will be updated with new data
+        :param dict[str, dict] accumulator: Accumulator that will be updated with new data
         :param SnowflakeCursor cursor:
         :returns: Accumulator after data from cursor has been added
         """
         for name, timestamp, count in cursor:
-            entry = accumulator.setdefault(name, copy.deepcopy(default_val))
-            match = next(
-                (item for item in entry if item["timestamp"] == timestamp), None
-            )
-            if match:
-                match["count"] = count
-            else:
-                entry.append({"timestamp": timestamp, "count": count})
+            counts = accumulator.get(name)
+            if counts is None:
+                counts = accumulator[name] = dict(default_counts)
+            counts[timestamp] = count
         return accumulator
 
     return _mapper
 
 
+def _to_activity_entries(counts_by_name: dict[str, dict]) -> dict[str, List]:
+    """
+    Materializes the counts accumulated by _get_cursor_to_plugin_activity_mapper into
+    objects with timestamp and count attributes, default entries come first followed
+    by the entries in the order of the cursor records.
+    """
+    return {
+        name: [
+            {"timestamp": timestamp, "count": count}
+            for timestamp, count in counts.items()
+        ]
+        for name, counts in counts_by_name.items()
+    }
+
+
 def _cursor_to_plugin_github_activity_latest_mapper(
     accumulator: dict[str, List], cursor
 ) -> dict[str, List]:
@@ -232,15 +551,24 @@ def _cursor_to_plugin_github_activity_total_mapper(
     return accumulator
 
 
+def _connect(schema: str) -> SnowflakeConnection:
+    start = time.perf_counter()
+    try:
+        return snowflake.connector.connect(
+            user=os.getenv("SNOWFLAKE_USER"),
+            password=os.getenv("SNOWFLAKE_PASSWORD"),
+            account="CZI-IMAGING",
+            warehouse="IMAGING",
+            database="IMAGING",
+            schema=schema,
+        )
+    finally:
+        duration = time.perf_counter() - start
+        LOGGER.info(f"Connect schema={schema} time={duration * 1000}ms")
+
+
 def _execute_query(schema: str, query: str) -> Iterable[SnowflakeCursor]:
-    connection = snowflake.connector.connect(
-        user=os.getenv("SNOWFLAKE_USER"),
-        password=os.getenv("SNOWFLAKE_PASSWORD"),
-        account="CZI-IMAGING",
-        warehouse="IMAGING",
-        database="IMAGING",
-        schema=schema,
-    )
+    connection = _session.get_connection(schema)
     start = time.perf_counter()
     try:
         return connection.execute_string(query)
@@ -251,7 +579,44 @@ def _execute_query(schema: str, query: str) -> Iterable[SnowflakeCursor]:
         LOGGER.info(f"Query execution time={duration * 1000}ms")
 
 
+def _fetch_arrow_batches(schema: str, query: str) -> Iterator["pyarrow.RecordBatch"]:
+    cursor = _session.get_connection(schema).cursor()
+    start = time.perf_counter()
+    try:
+        cursor.execute(query)
+        for table in cursor.fetch_arrow_batches():
+            yield from table.to_batches()
+    finally:
+        cursor.close()
+        duration = time.perf_counter() - start
+        LOGGER.info(f"Arrow fetch time={duration * 1000}ms")
+
+
+def _grouped_query_results(
+    query: str,
+    schema: str,
+    accumulator_updater: Callable,
+    materializer: Optional[Callable[[dict], dict]] = None,
+) -> Iterator[tuple[str, Any]]:
+    """
+    Streams the results of a query ordered on name, reducing the records of each name
+    with the accumulator_updater as soon as all of them have been fetched, so only
+    the records of one name are held in memory at a time.
+    :param Callable accumulator_updater: updates the accumulator with records
+    :param Callable materializer: transforms the accumulator before it is yielded
+    :returns: tuples of name and its accumulated value, in the order of the query
+    """
+    with snowflake_session():
+        records = chain.from_iterable(_execute_query(schema, query))
+        for _, name_records in groupby(records, key=lambda record: record[0]):
+            accumulator = accumulator_updater({}, name_records)
+            if materializer:
+                accumulator = materializer(accumulator)
+            yield from accumulator.items()
+
+
 def _mapped_query_results(
     query: str, schema: str, accumulator: Any, accumulator_updater: Callable
 ) -> Any:
-    return reduce(accumulator_updater, _execute_query(schema, query), accumulator)
+    with snowflake_session():
+        return reduce(accumulator_updater, _execute_query(schema, query), accumulator)
@@ -20,3 +20,14 @@ class MockSnowflakeCursor:
             else:
                 return self._data[self._index][0], self._data[self._index][1]
         raise StopIteration
+
+
+def get_staged_keys(connection_mock) -> tuple[str, list]:
+    """
+    Returns the name of the temporary keys table staged on the connection mock, and
+    the rows inserted in it
+    """
+    cursor = connection_mock.cursor.return_value
+    table = cursor.execute.call_args.args[0].split()[3]
+    rows = cursor.executemany.call_args.args[1] if cursor.executemany.called else []
+    return table, rows
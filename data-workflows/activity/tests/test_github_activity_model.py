@@ -1,5 +1,5 @@
 from datetime import datetime, timezone, time
-from unittest.mock import Mock
+from unittest.mock import ANY, Mock
 
 import pytest
 from dateutil.relativedelta import relativedelta
@@ -59,7 +59,11 @@ def ts_format(timestamp):
 class TestGitHubActivityModels:
     @pytest.fixture
     def mock_batch_write(self, monkeypatch):
-        mock_batch_write = Mock()
+        written = []
+        mock_batch_write = Mock(
+            side_effect=lambda records, **_: written.extend(records)
+        )
+        mock_batch_write.written = written
         monkeypatch.setattr(
             activity.github_activity_model, "batch_write", mock_batch_write
         )
@@ -72,10 +76,13 @@ class TestGitHubActivityModels:
             "org2/bar": [{"timestamp": get_relative_datetime(days=23)}],
         }
 
-        transform_and_write_to_dynamo(data, GitHubActivityType.LATEST, PLUGIN_BY_REPO)
+        transform_and_write_to_dynamo(
+            data.items(), GitHubActivityType.LATEST, PLUGIN_BY_REPO
+        )
 
         expected = generate_expected(data, "LATEST", "LATEST:{repo}", ts_format)
-        mock_batch_write.assert_called_once_with(expected)
+        mock_batch_write.assert_called_once_with(ANY, skip_unchanged=True)
+        assert mock_batch_write.written == expected
 
     def test_transform_to_dynamo_records_for_month(self, mock_batch_write):
         data = {
@@ -91,12 +98,15 @@ class TestGitHubActivityModels:
             ],
         }
 
-        transform_and_write_to_dynamo(data, GitHubActivityType.MONTH, PLUGIN_BY_REPO)
+        transform_and_write_to_dynamo(
+            data.items(), GitHubActivityType.MONTH, PLUGIN_BY_REPO
+        )
 
         expected = generate_expected(
             data, "MONTH", "MONTH:{ts:%Y%m}:{repo}", ts_day_format, include_expiry=True
         )
-        mock_batch_write.assert_called_once_with(expected)
+        mock_batch_write.assert_called_once_with(ANY, skip_unchanged=True)
+        assert mock_batch_write.written == expected
 
     def test_transform_to_dynamo_records_for_total(self, mock_batch_write):
         data = {
@@ -105,7 +115,10 @@ class TestGitHubActivityModels:
             "org2/bar": [{"count": 65}],
         }
 
-        transform_and_write_to_dynamo(data, GitHubActivityType.TOTAL, PLUGIN_BY_REPO)
+        transform_and_write_to_dynamo(
+            data.items(), GitHubActivityType.TOTAL, PLUGIN_BY_REPO
+        )
 
         expected = generate_expected(data, "TOTAL", "TOTAL:{repo}", lambda ts: None)
-        mock_batch_write.assert_called_once_with(expected)
+        mock_batch_write.assert_called_once_with(ANY, skip_unchanged=True)
+        assert mock_batch_write.written == expected
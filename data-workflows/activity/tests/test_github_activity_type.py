@@ -28,25 +28,22 @@ def plugin_by_earliest_ts() -> dict[str, datetime]:
 
 @pytest.fixture
 def remove_whitespace() -> Callable[[str], str]:
-    return lambda formatted_str: re.compile(r"[ \t]+").sub(" ", formatted_str).strip()
+    return lambda formatted_str: re.compile(r"\s+").sub(" ", formatted_str).strip()
 
 
 @pytest.fixture
-def get_maintenance_subquery(
-    plugin_by_earliest_ts: dict[str, datetime]
-) -> Callable[[GitHubActivityType], str]:
-    def _get_maintenance_subquery(activity_type: GitHubActivityType) -> str:
-        filters = [f"'{repo}'" for repo in plugin_by_earliest_ts.keys()]
+def get_maintenance_filter() -> Callable[[GitHubActivityType], str]:
+    def _get_maintenance_filter(activity_type: GitHubActivityType) -> str:
         if activity_type != GitHubActivityType.MONTH:
-            return f"repo IN ({','.join(filters)})"
+            return ""
 
         ts = datetime.combine(datetime.now() - relativedelta(months=14), time.min)
         return (
-            f"repo IN ({','.join(filters)}) AND TO_TIMESTAMP(commit_author_date) >= "
+            f"AND TO_TIMESTAMP(commit_author_date) >= "
             f"TO_TIMESTAMP('{ts.replace(day=1)}')"
         )
 
-    return _get_maintenance_subquery
+    return _get_maintenance_filter
 
 
 @pytest.mark.parametrize(
@@ -74,8 +71,7 @@ def test_github_activity_type_query_generation(
     activity_type: GitHubActivityType,
     projection: str,
     group_by: str,
-    plugin_by_earliest_ts: dict[str, datetime],
-    get_maintenance_subquery: Callable[[GitHubActivityType], str],
+    get_maintenance_filter: Callable[[GitHubActivityType], str],
     remove_whitespace: Callable[[str], str],
 ):
     expected_query = f"""
@@ -84,16 +80,41 @@ def test_github_activity_type_query_generation(
             {projection}
         FROM
             imaging.github.commits
+            JOIN keys_table AS keys
+                ON repo = keys.plugin_name
         WHERE 
             repo_type = 'plugin'
-            AND ({get_maintenance_subquery(activity_type)})
+            {get_maintenance_filter(activity_type)}
         GROUP BY {group_by}
         ORDER BY {group_by}
     """
-    actual = activity_type.get_query(plugin_by_earliest_ts)
+    actual = activity_type.get_query("keys_table", "keys")
     assert remove_whitespace(actual) == remove_whitespace(expected_query)
 
 
+def test_github_activity_type_total_query_with_end(
+    remove_whitespace: Callable[[str], str]
+):
+    actual = GitHubActivityType.TOTAL.get_query("keys_table", "keys", 1615705553000)
+
+    # commits ingested after the end are not part of the recount
+    assert (
+        "AND TO_TIMESTAMP(ingestion_time) <= TO_TIMESTAMP('2021-03-14 07:05:53')"
+        in remove_whitespace(actual)
+    )
+
+
+@pytest.mark.parametrize(
+    "activity_type", [GitHubActivityType.LATEST, GitHubActivityType.MONTH]
+)
+def test_github_activity_type_query_ignores_end_for_periods(
+    activity_type: GitHubActivityType,
+):
+    assert activity_type.get_query("keys_table", "keys", 1615705553000) == (
+        activity_type.get_query("keys_table", "keys")
+    )
+
+
 @pytest.mark.parametrize(
     "activity_type, input_ts, timestamp, type_id, expiry",
     [
@@ -7,7 +7,7 @@ from activity.snowflake_adapter import (
     get_plugins_with_commits_in_window,
     get_plugins_commit_count_since_timestamp,
 )
-from activity.tests.test_fixture import MockSnowflakeCursor
+from activity.tests.test_fixture import MockSnowflakeCursor, get_staged_keys
 
 START_TIME = 1615705553000
 END_TIME = datetime.now().replace(tzinfo=timezone.utc)
@@ -55,15 +55,17 @@ class TestGithubSnowflakeAdapter:
     @pytest.fixture
     def get_plugins_commit_count_since_timestamp_query(self):
         return (
-            lambda projection, subquery, grouping: f"""
+            lambda projection, table, timestamp_filter, grouping: f"""
                 SELECT
                     repo AS name,
                     {projection}
                 FROM
                     imaging.github.commits
+                    JOIN {table} AS plugin_keys
+                        ON repo = plugin_keys.plugin_name
                 WHERE 
                     repo_type = 'plugin'
-                    AND {subquery}
+                    {timestamp_filter}
                 GROUP BY {grouping}
                 ORDER BY {grouping}
                 """
@@ -158,9 +160,12 @@ class TestGithubSnowflakeAdapter:
         )
 
         assert expected == actual
+        table, rows = get_staged_keys(connection_mock)
+        assert [name for name, _ in rows] == ["bar", "baz", "foo"]
         query = get_plugins_commit_count_since_timestamp_query(
             "TO_TIMESTAMP(MAX(commit_author_date)) AS latest_commit",
-            "(repo IN ('foo','bar','baz'))",
+            table,
+            "",
             "name",
         )
         connection_mock.execute_string.assert_called_once_with(query)
@@ -216,13 +221,14 @@ class TestGithubSnowflakeAdapter:
         timestamp = datetime.combine(
             datetime.now() - relativedelta(months=14), time.min
         ).replace(day=1)
-        subquery = (
-            "(repo IN ('foo','bar','baz') AND TO_TIMESTAMP(commit_author_date)"
-            f" >= TO_TIMESTAMP('{timestamp}'))"
+        timestamp_filter = (
+            f"AND TO_TIMESTAMP(commit_author_date) >= TO_TIMESTAMP('{timestamp}')"
         )
+        table, _ = get_staged_keys(connection_mock)
         query = get_plugins_commit_count_since_timestamp_query(
             "DATE_TRUNC('month', TO_DATE(commit_author_date)) AS month, COUNT(*) AS commit_count",
-            subquery,
+            table,
+            timestamp_filter,
             "name, month",
         )
         connection_mock.execute_string.assert_called_once_with(query)
@@ -261,8 +267,8 @@ class TestGithubSnowflakeAdapter:
         )
 
         assert expected == actual
-        subquery = "(repo IN ('foo','bar','baz'))"
+        table, _ = get_staged_keys(connection_mock)
         query = get_plugins_commit_count_since_timestamp_query(
-            "COUNT(*) AS commit_count", subquery, "name"
+            "COUNT(*) AS commit_count", table, "", "name"
         )
         connection_mock.execute_string.assert_called_once_with(query)
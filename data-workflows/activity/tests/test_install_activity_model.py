@@ -1,6 +1,7 @@
 from datetime import datetime, timezone
-from unittest.mock import Mock
+from unittest.mock import ANY, Mock
 
+import pyarrow
 import pytest
 from dateutil.relativedelta import relativedelta
 
@@ -8,6 +9,7 @@ import activity
 from activity.install_activity_model import (
     InstallActivityType,
     transform_and_write_to_dynamo,
+    transform_batches_and_write_to_dynamo,
 )
 
 
@@ -39,6 +41,17 @@ def get_relative_timestamp(**args):
     return datetime.now() - relativedelta(**args)
 
 
+@pytest.fixture
+def mock_batch_write(monkeypatch):
+    written = []
+    mock_batch_write = Mock(side_effect=lambda records, **_: written.extend(records))
+    mock_batch_write.written = written
+    monkeypatch.setattr(
+        activity.install_activity_model, "batch_write", mock_batch_write
+    )
+    return mock_batch_write
+
+
 @pytest.mark.parametrize(
     "activity_type, timestamp, projection, type_timestamp",
     [
@@ -65,14 +78,6 @@ def test_install_activity_type(activity_type, timestamp, projection, type_timest
 
 
 class TestInstallActivityModels:
-    @pytest.fixture
-    def mock_batch_write(self, monkeypatch):
-        mock_batch_write = Mock()
-        monkeypatch.setattr(
-            activity.install_activity_model, "batch_write", mock_batch_write
-        )
-        return mock_batch_write
-
     def test_transform_to_dynamo_records_for_day(self, mock_batch_write):
         data = {
             "FOO": [
@@ -86,12 +91,13 @@ class TestInstallActivityModels:
                 {"timestamp": get_relative_timestamp(days=23), "count": 10},
             ],
         }
-        transform_and_write_to_dynamo(data, InstallActivityType.DAY)
+        transform_and_write_to_dynamo(data.items(), InstallActivityType.DAY)
 
         expected = generate_expected(
             data, "DAY", lambda ts: f'DAY:{ts.strftime("%Y%m%d")}', ts_format
         )
-        mock_batch_write.assert_called_once_with(expected)
+        mock_batch_write.assert_called_once_with(ANY, skip_unchanged=True)
+        assert mock_batch_write.written == expected
 
     def test_transform_to_dynamo_records_for_month(self, mock_batch_write):
         data = {
@@ -106,12 +112,13 @@ class TestInstallActivityModels:
                 {"timestamp": get_relative_timestamp(months=11), "count": 7},
             ],
         }
-        transform_and_write_to_dynamo(data, InstallActivityType.MONTH)
+        transform_and_write_to_dynamo(data.items(), InstallActivityType.MONTH)
 
         expected = generate_expected(
             data, "MONTH", lambda ts: f'MONTH:{ts.strftime("%Y%m")}', ts_format
         )
-        mock_batch_write.assert_called_once_with(expected)
+        mock_batch_write.assert_called_once_with(ANY, skip_unchanged=True)
+        assert mock_batch_write.written == expected
 
     def test_transform_to_dynamo_records_for_total(self, mock_batch_write):
         data = {
@@ -119,9 +126,52 @@ class TestInstallActivityModels:
             "BAR": [{"timestamp": 1, "count": 8}],
             "BAZ": [{"timestamp": 1, "count": 3}],
         }
-        transform_and_write_to_dynamo(data, InstallActivityType.TOTAL)
+        transform_and_write_to_dynamo(data.items(), InstallActivityType.TOTAL)
 
         expected = generate_expected(
             data, "TOTAL", lambda ts: f"TOTAL:", lambda ts: None, "true"
         )
-        mock_batch_write.assert_called_once_with(expected)
+        mock_batch_write.assert_called_once_with(ANY, skip_unchanged=True)
+        assert mock_batch_write.written == expected
+
+
+class TestInstallActivityColumnarModels:
+    @pytest.mark.parametrize(
+        "activity_type, type_timestamp_formatter",
+        [
+            (InstallActivityType.DAY, lambda ts: f'DAY:{ts.strftime("%Y%m%d")}'),
+            (InstallActivityType.MONTH, lambda ts: f'MONTH:{ts.strftime("%Y%m")}'),
+        ],
+    )
+    def test_transform_batches_matches_row_transform(
+        self, mock_batch_write, activity_type, type_timestamp_formatter
+    ):
+        timestamps = [datetime(2023, 3, 21), datetime(2023, 4, 1), datetime(2022, 1, 5)]
+        batches = [
+            pyarrow.RecordBatch.from_pydict(
+                {"NAME": ["FOO", "foo"], "TS": timestamps[:2], "COUNT": [2, 3]}
+            ),
+            pyarrow.RecordBatch.from_pydict(
+                {"NAME": ["Bar"], "TS": timestamps[2:], "COUNT": [8]}
+            ),
+        ]
+
+        transform_batches_and_write_to_dynamo(batches, activity_type)
+
+        data = [
+            {"FOO": [{"timestamp": timestamps[0], "count": 2}]},
+            {"foo": [{"timestamp": timestamps[1], "count": 3}]},
+            {"Bar": [{"timestamp": timestamps[2], "count": 8}]},
+        ]
+        expected = [
+            generate_expected(
+                item, activity_type.name, type_timestamp_formatter, ts_format
+            )
+            for item in data
+        ]
+        mock_batch_write.assert_called_once_with(ANY, skip_unchanged=True)
+        assert mock_batch_write.written == expected[0] + expected[1] + expected[2]
+
+    def test_transform_batches_rejects_total(self, mock_batch_write):
+        with pytest.raises(ValueError):
+            transform_batches_and_write_to_dynamo([], InstallActivityType.TOTAL)
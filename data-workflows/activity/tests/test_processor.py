@@ -1,5 +1,7 @@
+import threading
+import time
 from datetime import datetime
-from unittest.mock import Mock
+from unittest.mock import Mock, call
 
 import pytest
 
@@ -10,8 +12,14 @@ import activity.processor as processor
 from activity.install_activity_model import InstallActivityType
 from activity.github_activity_model import GitHubActivityType
 from utils.utils import ParameterStoreAdapter
-from nhcommons.models.plugin import get_plugin_name_by_repo
+from nhcommons.models.plugin import (
+    get_latest_plugins,
+    get_latest_plugins_without_total_installs,
+    get_plugin_name_by_repo,
+    update_total_installs,
+)
 import nhcommons
+from nhcommons.models import github_activity, install_activity
 
 START_TIME = 1234567
 END_TIME = 1239876
@@ -20,7 +28,7 @@ MOCK_DATA = {"foo": datetime.now()}
 PLUGINS_WITH_INSTALLS_IN_WINDOW = {
     InstallActivityType.DAY: {"bari": ["data1i", "data2i"]},
     InstallActivityType.MONTH: {"bazi": ["data3i", "data4i"]},
-    InstallActivityType.TOTAL: {"hapi": ["data5i"]},
+    InstallActivityType.TOTAL: {"hapi": [{"timestamp": 1, "count": 5}]},
 }
 PLUGINS_WITH_COMMITS_IN_WINDOW = {
     GitHubActivityType.LATEST: {"barg": ["data1g"]},
@@ -28,13 +36,13 @@ PLUGINS_WITH_COMMITS_IN_WINDOW = {
     GitHubActivityType.TOTAL: {"hapg": ["data5g"]},
 }
 MOCK_PLUGIN_BY_REPO = {"napari-demo": "chanzuckerberg/napari-demo"}
+MOCK_LATEST_PLUGINS = {"hapi": "1.0.0", "new": "0.1.0"}
 
 
 class TestActivityProcessor:
     def _verify_default(self):
-        self._parameter_store.set_last_updated_timestamp.assert_called_once_with(
-            END_TIME
-        )
+        actual = self._parameter_store.set_last_updated_timestamp.call_args_list
+        assert actual == [call(timestamp) for timestamp in self._expected_windows]
 
     @classmethod
     def _setup_snowflake_response(cls, monkeypatch, data):
@@ -44,15 +52,24 @@ class TestActivityProcessor:
         monkeypatch.setattr(
             snowflake,
             "get_plugins_install_count_since_timestamp",
-            lambda _, iat: PLUGINS_WITH_INSTALLS_IN_WINDOW.get(iat),
+            lambda _, iat, end_millis=None: PLUGINS_WITH_INSTALLS_IN_WINDOW.get(iat),
+        )
+        monkeypatch.setattr(
+            snowflake,
+            "iter_plugins_install_count_since_timestamp",
+            lambda _, iat, end_millis=None: PLUGINS_WITH_INSTALLS_IN_WINDOW.get(
+                iat
+            ).items(),
         )
         monkeypatch.setattr(
             snowflake, "get_plugins_with_commits_in_window", lambda _, __: data
         )
         monkeypatch.setattr(
             snowflake,
-            "get_plugins_commit_count_since_timestamp",
-            lambda _, iat: PLUGINS_WITH_COMMITS_IN_WINDOW.get(iat),
+            "iter_plugins_commit_count_since_timestamp",
+            lambda _, iat, end_millis=None: PLUGINS_WITH_COMMITS_IN_WINDOW.get(
+                iat
+            ).items(),
         )
 
     @pytest.fixture(autouse=True)
@@ -60,7 +77,9 @@ class TestActivityProcessor:
         self._parameter_store = Mock(
             spec=ParameterStoreAdapter,
             get_last_updated_timestamp=lambda: START_TIME,
+            get_stage_checkpoints=lambda: {},
         )
+        self._expected_windows = [END_TIME]
         monkeypatch.setattr(
             processor, "ParameterStoreAdapter", lambda: self._parameter_store
         )
@@ -77,8 +96,42 @@ class TestActivityProcessor:
         self._plugin_mock = Mock(
             spec=get_plugin_name_by_repo, return_value=MOCK_PLUGIN_BY_REPO
         )
+        self._total_installs_mock = Mock(spec=update_total_installs)
+        monkeypatch.setattr(
+            processor, "update_total_installs", self._total_installs_mock
+        )
+        self._latest_plugins_mock = Mock(
+            spec=get_latest_plugins, return_value=MOCK_LATEST_PLUGINS
+        )
+        monkeypatch.setattr(processor, "get_latest_plugins", self._latest_plugins_mock)
+        self._missing_total_installs_mock = Mock(
+            spec=get_latest_plugins_without_total_installs, return_value={}
+        )
+        monkeypatch.setattr(
+            processor,
+            "get_latest_plugins_without_total_installs",
+            self._missing_total_installs_mock,
+        )
+        self._batch_get_total_installs_mock = Mock(
+            spec=install_activity.batch_get_total_installs
+        )
+        monkeypatch.setattr(
+            processor.install_activity,
+            "batch_get_total_installs",
+            self._batch_get_total_installs_mock,
+        )
+        self._install_rollups_mock = Mock(spec=install_activity.write_rollups)
+        monkeypatch.setattr(
+            processor.install_activity, "write_rollups", self._install_rollups_mock
+        )
+        self._github_rollups_mock = Mock(spec=github_activity.write_rollups)
+        monkeypatch.setattr(
+            processor.github_activity, "write_rollups", self._github_rollups_mock
+        )
 
-    def test_update_install_activity_with_new_updates(self, monkeypatch):
+    @pytest.mark.parametrize("parallelism", ["1", "6"])
+    def test_update_install_activity_with_new_updates(self, monkeypatch, parallelism):
+        monkeypatch.setenv("ACTIVITY_STAGE_PARALLELISM", parallelism)
         self._setup_snowflake_response(monkeypatch, MOCK_DATA)
 
         monkeypatch.setattr(
@@ -92,16 +145,144 @@ class TestActivityProcessor:
         processor.update_activity()
 
         assert self._installs_mock.call_count == 3
-        for iat in InstallActivityType:
+        for iat in [InstallActivityType.DAY, InstallActivityType.MONTH]:
             self._installs_mock.assert_any_call(
-                PLUGINS_WITH_INSTALLS_IN_WINDOW[iat], iat
+                PLUGINS_WITH_INSTALLS_IN_WINDOW[iat].items(), iat
             )
+        self._installs_mock.assert_any_call(
+            PLUGINS_WITH_INSTALLS_IN_WINDOW[InstallActivityType.TOTAL].items(),
+            InstallActivityType.TOTAL,
+            counted_until=END_TIME,
+        )
         assert self._commits_mock.call_count == 3
         for gat in GitHubActivityType:
             self._commits_mock.assert_any_call(
-                PLUGINS_WITH_COMMITS_IN_WINDOW[gat], gat, MOCK_PLUGIN_BY_REPO
+                PLUGINS_WITH_COMMITS_IN_WINDOW[gat].items(),
+                gat,
+                MOCK_PLUGIN_BY_REPO,
+                counted_until=END_TIME if gat is GitHubActivityType.TOTAL else None,
             )
         self._plugin_mock.assert_called_once()
+        self._total_installs_mock.assert_called_once_with(
+            {"hapi": 5}, MOCK_LATEST_PLUGINS
+        )
+        self._install_rollups_mock.assert_called_once_with(MOCK_DATA.keys())
+        self._github_rollups_mock.assert_called_once_with({})
+        self._parameter_store.set_last_reconciled_timestamp.assert_called_once_with(
+            END_TIME
+        )
+
+    @pytest.mark.parametrize(
+        "last_reconciled, incremental",
+        [(END_TIME - 1000, True), (None, False), (END_TIME - 8 * 86400000, False)],
+    )
+    def test_update_activity_with_incremental_totals(
+        self, monkeypatch, last_reconciled, incremental
+    ):
+        monkeypatch.setenv("ACTIVITY_INCREMENTAL_TOTALS", "true")
+        self._parameter_store.get_last_reconciled_timestamp = lambda: last_reconciled
+        window_plugins = {"hapi": datetime.now(), "new": datetime.now()}
+        self._setup_snowflake_response(monkeypatch, window_plugins)
+        total_installs_query = Mock(
+            return_value=PLUGINS_WITH_INSTALLS_IN_WINDOW[InstallActivityType.TOTAL]
+        )
+        monkeypatch.setattr(
+            snowflake, "get_plugins_install_count_since_timestamp", total_installs_query
+        )
+        monkeypatch.setattr(
+            snowflake,
+            "get_plugins_install_count_in_window",
+            Mock(return_value={"hapi": 2, "new": 1}),
+        )
+        monkeypatch.setattr(
+            snowflake,
+            "get_plugins_commit_count_in_window",
+            Mock(return_value={"chanzuckerberg/napari-demo": 3}),
+        )
+        add_installs = Mock(return_value=({"hapi": 7}, ["new"]))
+        monkeypatch.setattr(install_activity, "add_total_installs", add_installs)
+        add_commits = Mock(return_value=[])
+        monkeypatch.setattr(github_activity, "add_total_commits", add_commits)
+        monkeypatch.setattr(
+            activity_iam, "transform_and_write_to_dynamo", self._installs_mock
+        )
+        monkeypatch.setattr(
+            activity_gam, "transform_and_write_to_dynamo", self._commits_mock
+        )
+        monkeypatch.setattr(processor, "get_plugin_name_by_repo", self._plugin_mock)
+
+        processor.update_activity()
+
+        total_calls = [
+            call
+            for call in self._installs_mock.call_args_list
+            if call.args[1] is InstallActivityType.TOTAL
+        ]
+        assert len(total_calls) == 1
+        assert total_calls[0].kwargs == {"counted_until": END_TIME}
+        if incremental:
+            add_installs.assert_called_once_with(
+                {"hapi": 2, "new": 1}, START_TIME, END_TIME
+            )
+            add_commits.assert_called_once_with(
+                {"chanzuckerberg/napari-demo": 3},
+                MOCK_PLUGIN_BY_REPO,
+                START_TIME,
+                END_TIME,
+            )
+            self._total_installs_mock.assert_any_call({"hapi": 7}, MOCK_LATEST_PLUGINS)
+            # only recounts the plugins without a TOTAL record counted to the window
+            total_installs_query.assert_called_once_with(
+                {"new": window_plugins["new"]},
+                InstallActivityType.TOTAL,
+                end_millis=END_TIME,
+            )
+            self._missing_total_installs_mock.assert_not_called()
+            self._parameter_store.set_last_reconciled_timestamp.assert_not_called()
+        else:
+            self._missing_total_installs_mock.assert_called_once()
+            add_installs.assert_not_called()
+            add_commits.assert_not_called()
+            total_installs_query.assert_called_once_with(
+                window_plugins, InstallActivityType.TOTAL, end_millis=END_TIME
+            )
+            self._parameter_store.set_last_reconciled_timestamp.assert_called_once_with(
+                END_TIME
+            )
+
+    def test_update_install_activity_with_arrow_fetch(self, monkeypatch):
+        self._setup_snowflake_response(monkeypatch, MOCK_DATA)
+        monkeypatch.setattr(snowflake, "is_arrow_fetch_enabled", lambda: True)
+        monkeypatch.setattr(
+            snowflake,
+            "get_plugins_install_count_batches",
+            lambda _, iat, end_millis=None: [f"{iat.name}-batch"],
+        )
+        batches_mock = Mock(spec=activity_iam.transform_batches_and_write_to_dynamo)
+        monkeypatch.setattr(
+            activity_iam, "transform_batches_and_write_to_dynamo", batches_mock
+        )
+        monkeypatch.setattr(
+            activity_iam, "transform_and_write_to_dynamo", self._installs_mock
+        )
+        monkeypatch.setattr(
+            activity_gam, "transform_and_write_to_dynamo", self._commits_mock
+        )
+        monkeypatch.setattr(processor, "get_plugin_name_by_repo", self._plugin_mock)
+
+        processor.update_activity()
+
+        assert batches_mock.call_count == 2
+        batches_mock.assert_any_call(["DAY-batch"], InstallActivityType.DAY)
+        batches_mock.assert_any_call(["MONTH-batch"], InstallActivityType.MONTH)
+        self._installs_mock.assert_called_once_with(
+            PLUGINS_WITH_INSTALLS_IN_WINDOW[InstallActivityType.TOTAL].items(),
+            InstallActivityType.TOTAL,
+            counted_until=END_TIME,
+        )
+        self._total_installs_mock.assert_called_once_with(
+            {"hapi": 5}, MOCK_LATEST_PLUGINS
+        )
 
     def test_update_install_activity_with_no_new_updates(self, monkeypatch):
         self._setup_snowflake_response(monkeypatch, [])
@@ -111,3 +292,310 @@ class TestActivityProcessor:
         self._installs_mock.assert_not_called()
         self._commits_mock.assert_not_called()
         self._plugin_mock.assert_not_called()
+        self._latest_plugins_mock.assert_not_called()
+        self._total_installs_mock.assert_not_called()
+        self._install_rollups_mock.assert_not_called()
+        self._github_rollups_mock.assert_not_called()
+
+    def test_update_activity_adds_missing_total_installs(self, monkeypatch):
+        self._setup_snowflake_response(monkeypatch, [])
+        missing = {"napari-quiet": "0.1.0"}
+        self._missing_total_installs_mock.return_value = missing
+        self._batch_get_total_installs_mock.return_value = {"napari-quiet": 0}
+
+        processor.update_activity()
+
+        self._batch_get_total_installs_mock.assert_called_once_with(missing.keys())
+        self._total_installs_mock.assert_called_once_with({"napari-quiet": 0}, missing)
+
+    def test_update_activity_resumes_failed_window(self, monkeypatch):
+        resume_time = START_TIME + 1000
+        checkpoints = {
+            "install-DAY": resume_time,
+            "install-MONTH": resume_time,
+            "install-TOTAL": resume_time,
+            "install-ROLLUP": resume_time,
+            "github-LATEST": START_TIME,
+        }
+        self._parameter_store.get_stage_checkpoints = lambda: checkpoints
+        self._expected_windows = [resume_time, END_TIME]
+        self._setup_snowflake_response(monkeypatch, MOCK_DATA)
+        installs_window = Mock(return_value=MOCK_DATA)
+        monkeypatch.setattr(
+            snowflake, "get_plugins_with_installs_in_window", installs_window
+        )
+        commits_window = Mock(return_value=MOCK_DATA)
+        monkeypatch.setattr(
+            snowflake, "get_plugins_with_commits_in_window", commits_window
+        )
+        monkeypatch.setattr(
+            activity_iam, "transform_and_write_to_dynamo", self._installs_mock
+        )
+        monkeypatch.setattr(
+            activity_gam, "transform_and_write_to_dynamo", self._commits_mock
+        )
+        monkeypatch.setattr(processor, "get_plugin_name_by_repo", self._plugin_mock)
+
+        processor.update_activity()
+
+        # install stages of the failed window are not rerun
+        installs_window.assert_called_once_with(resume_time, END_TIME)
+        assert commits_window.call_args_list == [
+            call(START_TIME, resume_time),
+            call(resume_time, END_TIME),
+        ]
+        assert self._installs_mock.call_count == 3
+        assert self._commits_mock.call_count == 6
+        assert self._install_rollups_mock.call_count == 1
+        assert self._github_rollups_mock.call_count == 2
+        last_checkpoints = self._parameter_store.set_stage_checkpoints.call_args.args
+        assert last_checkpoints[0] == {
+            name: END_TIME
+            for name in processor._INSTALL_STAGES + processor._GITHUB_STAGES
+        }
+
+    def test_update_activity_checkpoints_completed_stages(self, monkeypatch):
+        self._expected_windows = []
+        self._setup_snowflake_response(monkeypatch, MOCK_DATA)
+        monkeypatch.setattr(
+            activity_iam, "transform_and_write_to_dynamo", self._installs_mock
+        )
+        self._commits_mock.side_effect = ValueError("timed out")
+        monkeypatch.setattr(
+            activity_gam, "transform_and_write_to_dynamo", self._commits_mock
+        )
+        monkeypatch.setattr(processor, "get_plugin_name_by_repo", self._plugin_mock)
+
+        with pytest.raises(ValueError):
+            processor.update_activity()
+
+        last_checkpoints = self._parameter_store.set_stage_checkpoints.call_args.args
+        assert last_checkpoints[0] == {
+            "install-DAY": END_TIME,
+            "install-MONTH": END_TIME,
+            "install-TOTAL": END_TIME,
+        }
+        self._install_rollups_mock.assert_not_called()
+        self._parameter_store.set_last_reconciled_timestamp.assert_not_called()
+
+    def test_update_activity_in_chunked_windows(self, monkeypatch):
+        monkeypatch.setattr(processor, "get_window_chunk_millis", lambda: 2000)
+        self._parameter_store.get_last_updated_timestamp = lambda: END_TIME - 5000
+        self._expected_windows = [END_TIME - 3000, END_TIME - 1000, END_TIME]
+        self._setup_snowflake_response(monkeypatch, MOCK_DATA)
+        installs_window = Mock(return_value=MOCK_DATA)
+        monkeypatch.setattr(
+            snowflake, "get_plugins_with_installs_in_window", installs_window
+        )
+        monkeypatch.setattr(
+            snowflake, "get_plugins_with_commits_in_window", lambda _, __: {}
+        )
+        monkeypatch.setattr(
+            activity_iam, "transform_and_write_to_dynamo", self._installs_mock
+        )
+
+        processor.update_activity()
+
+        assert installs_window.call_args_list == [
+            call(END_TIME - 5000, END_TIME - 3000),
+            call(END_TIME - 3000, END_TIME - 1000),
+            call(END_TIME - 1000, END_TIME),
+        ]
+        # checkpoints are cleared as each window advances the last updated timestamp
+        saved = self._parameter_store.set_stage_checkpoints.call_args_list
+        assert saved
+        for checkpoints_call in saved:
+            assert len(set(checkpoints_call.args[0].values())) == 1
+
+
+class TestGetWindows:
+    @pytest.mark.parametrize(
+        "checkpoints, chunk_millis, expected",
+        [
+            ({}, 0, [(0, 10)]),
+            ({}, 4, [(0, 4), (4, 8), (8, 10)]),
+            ({"install-DAY": 3, "github-MONTH": 0}, 0, [(0, 3), (3, 10)]),
+            ({"install-DAY": 3}, 4, [(0, 3), (3, 7), (7, 10)]),
+            ({"install-DAY": 10}, 0, [(0, 10)]),
+        ],
+    )
+    def test_get_windows(self, checkpoints, chunk_millis, expected):
+        assert processor._get_windows(0, 10, checkpoints, chunk_millis) == expected
+
+    def test_get_windows_rejects_negative_chunk(self):
+        with pytest.raises(ValueError):
+            processor._get_windows(0, 10, {}, -4)
+
+
+class TestStageScheduler:
+    def test_runs_stages_up_to_parallelism(self):
+        barrier = threading.Barrier(3, timeout=5)
+        stages = {f"stage-{i}": barrier.wait for i in range(3)}
+
+        durations = processor._run_stages(stages, 3)
+
+        assert set(durations) == set(stages)
+
+    def test_limits_concurrent_stages(self):
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def _stage():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.01)
+            with lock:
+                running.pop()
+
+        processor._run_stages({f"stage-{i}": _stage for i in range(6)}, 2)
+
+        assert max(peak) <= 2
+
+    def test_raises_stage_failure_after_all_stages(self):
+        completed = Mock()
+
+        with pytest.raises(ValueError):
+            processor._run_stages(
+                {"fails": Mock(side_effect=ValueError()), "succeeds": completed}, 1
+            )
+
+        completed.assert_called_once()
+
+    @pytest.mark.parametrize(
+        "env_value, expected", [(None, 1), ("4", 4), ("0", 1), ("foo", 1)]
+    )
+    def test_get_stage_parallelism(self, monkeypatch, env_value, expected):
+        if env_value is None:
+            monkeypatch.delenv("ACTIVITY_STAGE_PARALLELISM", raising=False)
+        else:
+            monkeypatch.setenv("ACTIVITY_STAGE_PARALLELISM", env_value)
+
+        assert processor.get_stage_parallelism() == expected
+
+
+class TestBackfill:
+    @pytest.fixture(autouse=True)
+    def setup(self, monkeypatch, tmp_path):
+        self._progress_path = str(tmp_path / "progress.json")
+        self._failing_windows = set()
+        self._install_queries = []
+        self._plugins = {"foo": datetime(2023, 1, 1), "bar": datetime(2023, 2, 1)}
+
+        def _installs_in_window(start, end):
+            if (start, end) in self._failing_windows:
+                raise ValueError("timed out")
+            return self._plugins
+
+        def _install_counts(data, iat, end_millis=None):
+            self._install_queries.append((iat, end_millis))
+            return []
+
+        monkeypatch.setattr(
+            snowflake, "get_plugins_with_installs_in_window", _installs_in_window
+        )
+        monkeypatch.setattr(
+            snowflake, "iter_plugins_install_count_since_timestamp", _install_counts
+        )
+        self._commits_in_window = Mock(return_value={"foo/bar": datetime(2023, 1, 1)})
+        monkeypatch.setattr(
+            snowflake, "get_plugins_with_commits_in_window", self._commits_in_window
+        )
+        self._total_installs_query = Mock(return_value={"foo": []})
+        monkeypatch.setattr(
+            snowflake,
+            "get_plugins_install_count_since_timestamp",
+            self._total_installs_query,
+        )
+        self._commit_counts = Mock(return_value=[])
+        monkeypatch.setattr(
+            snowflake, "iter_plugins_commit_count_since_timestamp", self._commit_counts
+        )
+        monkeypatch.setattr(activity_iam, "transform_and_write_to_dynamo", Mock())
+        monkeypatch.setattr(activity_gam, "transform_and_write_to_dynamo", Mock())
+        monkeypatch.setattr(nhcommons.utils, "get_current_timestamp", lambda: END_TIME)
+        monkeypatch.setattr(
+            processor, "get_latest_plugins", Mock(return_value=MOCK_LATEST_PLUGINS)
+        )
+        monkeypatch.setattr(
+            processor,
+            "get_plugin_name_by_repo",
+            Mock(return_value={"foo/bar": "foo"}),
+        )
+        self._total_installs_mock = Mock(spec=update_total_installs)
+        monkeypatch.setattr(
+            processor, "update_total_installs", self._total_installs_mock
+        )
+        self._install_rollups_mock = Mock(spec=install_activity.write_rollups)
+        monkeypatch.setattr(
+            processor.install_activity, "write_rollups", self._install_rollups_mock
+        )
+        self._github_rollups_mock = Mock(spec=github_activity.write_rollups)
+        monkeypatch.setattr(
+            processor.github_activity, "write_rollups", self._github_rollups_mock
+        )
+
+    def _backfill(self, workers: int = 2):
+        day = 86400000
+        processor.backfill_activity(0, 3 * day + 1, 1, workers, self._progress_path)
+
+    def test_backfill_bounds_window_queries_and_totals_once(self):
+        self._backfill()
+
+        day = 86400000
+        windows = [(0, day), (day, 2 * day), (2 * day, 3 * day), (3 * day, 3 * day + 1)]
+        # each window only queries the DAY and MONTH periods up to its end
+        expected_queries = [
+            (iat, end)
+            for _, end in windows
+            for iat in [InstallActivityType.DAY, InstallActivityType.MONTH]
+        ]
+        assert len(self._install_queries) == len(expected_queries)
+        assert set(self._install_queries) == set(expected_queries)
+        assert processor._load_backfill_progress(self._progress_path) == set(windows)
+        self._total_installs_query.assert_called_once_with(
+            self._plugins, InstallActivityType.TOTAL, end_millis=END_TIME
+        )
+        self._total_installs_mock.assert_called_once_with(
+            {"foo": 0}, MOCK_LATEST_PLUGINS
+        )
+        self._commits_in_window.assert_called_once_with(0, 3 * day + 1)
+        assert sorted(c.args[1].name for c in self._commit_counts.call_args_list) == [
+            "LATEST",
+            "MONTH",
+            "TOTAL",
+        ]
+        self._install_rollups_mock.assert_called_once_with(self._plugins.keys())
+        self._github_rollups_mock.assert_called_once_with({"foo/bar": "foo"})
+
+    def test_backfill_resumes_pending_windows(self):
+        day = 86400000
+        self._failing_windows = {(day, 2 * day)}
+
+        with pytest.raises(ValueError):
+            self._backfill()
+
+        assert len(self._install_queries) == 6
+        self._total_installs_query.assert_not_called()
+        self._install_rollups_mock.assert_not_called()
+        self._failing_windows = set()
+        self._install_queries = []
+
+        self._backfill(workers=1)
+
+        assert self._install_queries == [
+            (InstallActivityType.DAY, 2 * day),
+            (InstallActivityType.MONTH, 2 * day),
+        ]
+        self._total_installs_query.assert_called_once()
+        self._install_rollups_mock.assert_called_once()
+
+    @pytest.mark.parametrize("chunk_days, workers", [(0, 2), (-1, 2), (1, 0)])
+    def test_backfill_rejects_invalid_arguments(self, chunk_days: int, workers: int):
+        with pytest.raises(ValueError):
+            processor.backfill_activity(
+                0, 86400000, chunk_days, workers, self._progress_path
+            )
+
+        assert self._install_queries == []
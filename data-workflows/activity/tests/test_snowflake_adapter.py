@@ -5,12 +5,19 @@ import pytest
 import snowflake.connector
 from dateutil.relativedelta import relativedelta
 
+import activity.snowflake_adapter
 from activity.install_activity_model import InstallActivityType
 from activity.snowflake_adapter import (
     get_plugins_with_installs_in_window,
     get_plugins_install_count_since_timestamp,
+    get_plugins_with_commits_in_window,
+    get_plugins_install_count_in_window,
+    snowflake_session,
+    is_arrow_fetch_enabled,
+    _get_cursor_to_plugin_activity_mapper,
+    _to_activity_entries,
 )
-from activity.tests.test_fixture import MockSnowflakeCursor
+from activity.tests.test_fixture import MockSnowflakeCursor, get_staged_keys
 
 SNOWFLAKE_USER = "super-secret-username"
 SNOWFLAKE_PASSWORD = "a-password-that-cant-be-shared"
@@ -48,7 +55,9 @@ def get_plugins_with_installs_in_window_query():
             """
 
 
-def get_plugins_install_count_since_timestamp_query(projection, subquery):
+def get_plugins_install_count_since_timestamp_query(
+    projection, table, timestamp_filter
+):
     return f"""
             SELECT 
                 LOWER(file_project) AS name, 
@@ -56,10 +65,12 @@ def get_plugins_install_count_since_timestamp_query(projection, subquery):
                 COUNT(*) AS count
             FROM
                 imaging.pypi.labeled_downloads
+                JOIN {table} AS plugin_keys
+                    ON LOWER(file_project) = plugin_keys.plugin_name
             WHERE 
                 download_type = 'pip'
                 AND project_type = 'plugin'
-                AND ({subquery})
+                {timestamp_filter}
             GROUP BY name, ts
             ORDER BY name, ts
             """
@@ -153,6 +164,20 @@ class TestSnowflakeAdapter:
             get_plugins_with_installs_in_window_query()
         )
 
+    def test_get_plugins_install_count_in_window(self):
+        self._connection_params["schema"] = "PYPI"
+        self._expected_cursor_result = [
+            MockSnowflakeCursor([["foo", 2], ["bar", 8]], 2),
+            MockSnowflakeCursor([["foo", 3]], 2),
+        ]
+
+        actual = get_plugins_install_count_in_window(START_TIME, END_TIMESTAMP)
+
+        assert {"foo": 5, "bar": 8} == actual
+        query = self._connection_mock.execute_string.call_args.args[0]
+        assert "COUNT(*) AS count" in query
+        assert "TO_TIMESTAMP(ingestion_timestamp) > TO_TIMESTAMP(" in query
+
     @pytest.mark.parametrize(
         "expected_cursor_result,expected",
         [
@@ -186,13 +211,16 @@ class TestSnowflakeAdapter:
         )
 
         assert expected == actual
-        subquery = (
-            "LOWER(file_project) = 'foo' AND timestamp >= TO_TIMESTAMP('2021-03-14 00:00:00') OR "
-            "LOWER(file_project) = 'bar' AND timestamp >= TO_TIMESTAMP('2022-07-05 00:00:00') OR "
-            "LOWER(file_project) = 'baz' AND timestamp >= TO_TIMESTAMP('2023-06-26 00:00:00')"
-        )
+        table, rows = get_staged_keys(self._connection_mock)
+        assert rows == [
+            ("bar", "2022-07-05 00:00:00"),
+            ("baz", "2023-06-26 00:00:00"),
+            ("foo", "2021-03-14 00:00:00"),
+        ]
         query = get_plugins_install_count_since_timestamp_query(
-            "DATE_TRUNC('DAY', timestamp)", subquery
+            "DATE_TRUNC('DAY', timestamp)",
+            table,
+            "AND timestamp >= plugin_keys.earliest_timestamp",
         )
         self._connection_mock.execute_string.assert_called_once_with(query)
 
@@ -229,13 +257,11 @@ class TestSnowflakeAdapter:
         )
 
         assert expected == actual
-        subquery = (
-            "LOWER(file_project) = 'foo' AND timestamp >= TO_TIMESTAMP('2021-03-01 00:00:00') OR "
-            "LOWER(file_project) = 'bar' AND timestamp >= TO_TIMESTAMP('2022-07-01 00:00:00') OR "
-            "LOWER(file_project) = 'baz' AND timestamp >= TO_TIMESTAMP('2023-06-01 00:00:00')"
-        )
+        table, _ = get_staged_keys(self._connection_mock)
         query = get_plugins_install_count_since_timestamp_query(
-            "DATE_TRUNC('MONTH', timestamp)", subquery
+            "DATE_TRUNC('MONTH', timestamp)",
+            table,
+            "AND timestamp >= DATE_TRUNC('MONTH', plugin_keys.earliest_timestamp)",
         )
         self._connection_mock.execute_string.assert_called_once_with(query)
 
@@ -270,6 +296,143 @@ class TestSnowflakeAdapter:
         )
 
         assert expected == actual
-        subquery = "LOWER(file_project) IN ('foo','bar','baz')"
-        query = get_plugins_install_count_since_timestamp_query("1", subquery)
+        table, _ = get_staged_keys(self._connection_mock)
+        query = get_plugins_install_count_since_timestamp_query("1", table, "")
         self._connection_mock.execute_string.assert_called_once_with(query)
+
+    @pytest.mark.parametrize(
+        "install_activity_type, timestamp_filter",
+        [
+            (
+                InstallActivityType.DAY,
+                "AND timestamp >= plugin_keys.earliest_timestamp "
+                "AND timestamp < DATEADD('DAY', 1, "
+                "DATE_TRUNC('DAY', TO_TIMESTAMP('2021-03-14 07:05:53')))",
+            ),
+            (
+                InstallActivityType.MONTH,
+                "AND timestamp >= DATE_TRUNC('MONTH', plugin_keys.earliest_timestamp) "
+                "AND timestamp < DATEADD('MONTH', 1, "
+                "DATE_TRUNC('MONTH', TO_TIMESTAMP('2021-03-14 07:05:53')))",
+            ),
+            # installs ingested after the end are not part of the recount
+            (
+                InstallActivityType.TOTAL,
+                "AND TO_TIMESTAMP(ingestion_timestamp) <= "
+                "TO_TIMESTAMP('2021-03-14 07:05:53')",
+            ),
+        ],
+    )
+    def test_get_plugins_install_count_since_timestamp_with_end(
+        self, install_activity_type, timestamp_filter, plugins_by_earliest_ts
+    ):
+        self._connection_params["schema"] = "PYPI"
+        self._expected_cursor_result = [MockSnowflakeCursor([], 3)]
+
+        get_plugins_install_count_since_timestamp(
+            plugins_by_earliest_ts, install_activity_type, end_millis=START_TIME
+        )
+
+        table, _ = get_staged_keys(self._connection_mock)
+        query = get_plugins_install_count_since_timestamp_query(
+            install_activity_type.get_query_timestamp_projection(),
+            table,
+            timestamp_filter,
+        )
+        self._connection_mock.execute_string.assert_called_once_with(query)
+
+
+class TestSnowflakeSession:
+    @pytest.fixture(autouse=True)
+    def connect(self, monkeypatch) -> Mock:
+        monkeypatch.setenv("SNOWFLAKE_USER", SNOWFLAKE_USER)
+        monkeypatch.setenv("SNOWFLAKE_PASSWORD", SNOWFLAKE_PASSWORD)
+        self._connections = {}
+
+        def _connect(**kwargs):
+            connection = Mock()
+            connection.execute_string.side_effect = lambda _: [
+                MockSnowflakeCursor([], 2)
+            ]
+            self._connections.setdefault(kwargs["schema"], []).append(connection)
+            return connection
+
+        connect = Mock(side_effect=_connect)
+        monkeypatch.setattr(snowflake.connector, "connect", connect)
+        return connect
+
+    def test_session_reuses_connection_per_schema(self, connect: Mock):
+        with snowflake_session():
+            get_plugins_with_installs_in_window(START_TIME, END_TIMESTAMP)
+            get_plugins_with_installs_in_window(START_TIME, END_TIMESTAMP)
+            get_plugins_with_commits_in_window(START_TIME, END_TIMESTAMP)
+
+            assert connect.call_count == 2
+            pypi_connection = self._connections["PYPI"][0]
+            assert pypi_connection.execute_string.call_count == 2
+            pypi_connection.close.assert_not_called()
+
+        pypi_connection.close.assert_called_once()
+        self._connections["GITHUB"][0].close.assert_called_once()
+
+    def test_query_without_session_closes_connection(self, connect: Mock):
+        get_plugins_with_installs_in_window(START_TIME, END_TIMESTAMP)
+        get_plugins_with_installs_in_window(START_TIME, END_TIMESTAMP)
+
+        assert connect.call_count == 2
+        for connection in self._connections["PYPI"]:
+            connection.close.assert_called_once()
+
+
+def test_plugin_activity_mapper_accumulates_by_timestamp():
+    default_val = [
+        {"timestamp": to_ts(1), "count": 0},
+        {"timestamp": to_ts(2), "count": 0},
+    ]
+    mapper = _get_cursor_to_plugin_activity_mapper(default_val)
+
+    accumulator = mapper({}, [("foo", to_ts(2), 5), ("bar", to_ts(3), 1)])
+    accumulator = mapper(accumulator, [("foo", to_ts(4), 2)])
+
+    assert _to_activity_entries(accumulator) == {
+        "foo": [
+            {"timestamp": to_ts(1), "count": 0},
+            {"timestamp": to_ts(2), "count": 5},
+            {"timestamp": to_ts(4), "count": 2},
+        ],
+        "bar": [
+            {"timestamp": to_ts(1), "count": 0},
+            {"timestamp": to_ts(2), "count": 0},
+            {"timestamp": to_ts(3), "count": 1},
+        ],
+    }
+    assert default_val[1]["count"] == 0
+
+
+@pytest.mark.parametrize(
+    "env_value, has_pyarrow, expected",
+    [
+        ("true", True, True),
+        ("True", True, True),
+        (None, True, False),
+        (None, False, False),
+    ],
+)
+def test_is_arrow_fetch_enabled(monkeypatch, env_value, has_pyarrow, expected):
+    if env_value is None:
+        monkeypatch.delenv("SNOWFLAKE_ARROW_FETCH", raising=False)
+    else:
+        monkeypatch.setenv("SNOWFLAKE_ARROW_FETCH", env_value)
+    monkeypatch.setattr(
+        activity.snowflake_adapter, "pyarrow", Mock() if has_pyarrow else None
+    )
+
+    assert is_arrow_fetch_enabled() == expected
+
+
+def test_is_arrow_fetch_enabled_without_pyarrow(monkeypatch):
+    monkeypatch.setenv("SNOWFLAKE_ARROW_FETCH", "true")
+    monkeypatch.setattr(activity.snowflake_adapter, "pyarrow", None)
+
+    with pytest.raises(RuntimeError):
+        is_arrow_fetch_enabled()
@@ -0,0 +1,82 @@
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+from activity.utils import write_streamed
+
+
+class TestWriteStreamed:
+    def test_writes_all_items_on_background_thread(self):
+        written = []
+        writer_threads = set()
+
+        def _writer(items):
+            for item in items:
+                writer_threads.add(threading.current_thread().name)
+                written.append(item)
+            return len(written)
+
+        count = write_streamed(iter(range(250)), _writer, max_pending=10)
+
+        assert count == 250
+        assert written == list(range(250))
+        assert writer_threads == {"stream-writer"}
+
+    def test_producer_blocks_on_bounded_queue(self):
+        release = threading.Event()
+        produced = []
+
+        def _items():
+            for i in range(20):
+                produced.append(i)
+                yield i
+
+        def _writer(items):
+            release.wait(timeout=5)
+            list(items)
+
+        thread = threading.Thread(
+            target=write_streamed, args=(_items(), _writer), kwargs={"max_pending": 5}
+        )
+        thread.start()
+        thread.join(timeout=0.5)
+        assert thread.is_alive()
+        assert len(produced) <= 7
+
+        release.set()
+        thread.join(timeout=5)
+        assert len(produced) == 20
+
+    def test_returns_count_saved_by_writer(self):
+        def _writer(items):
+            return sum(1 for item in items if item % 2)
+
+        assert write_streamed(iter(range(10)), _writer) == 5
+
+    def test_writer_error_is_raised(self):
+        def _writer(items):
+            next(iter(items))
+            raise ValueError("write failed")
+
+        with pytest.raises(ValueError, match="write failed"):
+            write_streamed(iter(range(1000)), _writer, max_pending=2)
+
+    def test_producer_error_abandons_pending_write(self):
+        consumed = []
+        commit = Mock()
+
+        def _writer(items):
+            consumed.extend(items)
+            commit()
+            return len(consumed)
+
+        def _items():
+            yield 1
+            raise KeyError("fetch failed")
+
+        with pytest.raises(KeyError):
+            write_streamed(_items(), _writer)
+
+        assert consumed == [1]
+        commit.assert_not_called()
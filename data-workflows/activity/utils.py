@@ -1,8 +1,16 @@
+import queue
+import threading
 from datetime import datetime, date, timezone
-from typing import Union
+from typing import Any, Callable, Iterable, Iterator, Union
 
 from dateutil.relativedelta import relativedelta
 
+# enough for the writer to build the next 25 item batch while one is in flight
+_WRITE_QUEUE_SIZE = 100
+_WRITE_DONE = object()
+_WRITE_ABORTED = object()
+_PUT_TIMEOUT_SECONDS = 0.5
+
 
 def _to_default_entry(timestamp: date) -> dict[str, Union[date, int]]:
     return {
@@ -19,3 +27,68 @@ def generate_months_default_value(limit: int):
         _to_default_entry((upper - relativedelta(months=i)).date())
         for i in range(limit - 1, -1, -1)
     ]
+
+
+class _WriteAborted(Exception):
+    pass
+
+
+def write_streamed(
+    items: Iterable[Any],
+    writer: Callable[[Iterable[Any]], int],
+    max_pending: int = _WRITE_QUEUE_SIZE,
+) -> int:
+    """
+    Writes the items with the writer on a background thread while they are still
+    being produced, the bounded queue between them caps the number of items held in
+    memory and blocks the producer when the writer falls behind. If producing the
+    items fails, the writer's iterable raises so the pending batch is not committed.
+    :param Iterable items: items to write, consumed lazily on the calling thread
+    :param Callable writer: consumes an iterable of items and returns the number
+    of items saved, like a dynamo batch_write
+    :param int max_pending: maximum number of produced items waiting to be written
+    :returns: number of items saved by the writer
+    """
+    pending = queue.Queue(maxsize=max_pending)
+    errors = []
+    results = []
+
+    def _iter_pending() -> Iterator[Any]:
+        while (item := pending.get()) is not _WRITE_DONE:
+            if item is _WRITE_ABORTED:
+                raise _WriteAborted()
+            yield item
+
+    def _write() -> None:
+        try:
+            results.append(writer(_iter_pending()))
+        except _WriteAborted:
+            pass
+        except BaseException as e:
+            errors.append(e)
+
+    def _put(item: Any) -> None:
+        while thread.is_alive():
+            try:
+                pending.put(item, timeout=_PUT_TIMEOUT_SECONDS)
+                return
+            except queue.Full:
+                continue
+        if errors:
+            raise errors[0]
+        raise RuntimeError("Writer stopped before consuming all items")
+
+    thread = threading.Thread(target=_write, name="stream-writer", daemon=True)
+    thread.start()
+    done = _WRITE_ABORTED
+    try:
+        for item in items:
+            _put(item)
+        done = _WRITE_DONE
+    finally:
+        if thread.is_alive():
+            _put(done)
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results[0]
@@ -2,7 +2,12 @@ import logging
 from typing import Any, Optional
 
 from nhcommons.models.plugin_utils import PluginMetadataType, PluginVisibility
-from nhcommons.models import plugins_blocked, plugin, plugin_metadata
+from nhcommons.models import (
+    install_activity,
+    plugins_blocked,
+    plugin,
+    plugin_metadata,
+)
 from plugin.manifest import get_formatted_manifest
 from plugin.categories import merge_metadata_manifest_categories
 
@@ -90,6 +95,7 @@ def _generate_record(
 
     if metadata_by_type.get(PluginMetadataType.PYPI, {}).get("is_latest"):
         plugin_record["is_latest"] = "true"
+        plugin_record["total_installs"] = install_activity.get_total_installs(name)
         if visibility != PluginVisibility.PUBLIC:
             plugin_record["excluded"] = visibility.name
 
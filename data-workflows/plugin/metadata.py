@@ -1,22 +1,23 @@
+import asyncio
 import logging
 from collections import defaultdict
 from typing import Optional
 
 from nhcommons.utils.custom_parser import render_description
-from nhcommons.utils.github_adapter import get_github_metadata, is_valid_repo_url
-from nhcommons.utils.pypi_adapter import get_plugin_pypi_metadata
+from nhcommons.utils.github_adapter import get_github_metadata_async, is_valid_repo_url
+from nhcommons.utils.pypi_adapter import get_plugin_pypi_metadata_async
 from plugin.categories import process_for_categories
 
 logger = logging.getLogger(__name__)
 
 
-def get_formatted_metadata(plugin: str, version: str) -> Optional[dict]:
-    pypi_metadata = get_plugin_pypi_metadata(plugin, version)
+async def get_formatted_metadata(plugin: str, version: str) -> Optional[dict]:
+    pypi_metadata = await get_plugin_pypi_metadata_async(plugin, version)
     if not pypi_metadata:
         return None
 
-    metadata = _generate_metadata(pypi_metadata)
-    return _format_metadata(metadata)
+    metadata = await _generate_metadata(pypi_metadata)
+    return await asyncio.to_thread(_format_metadata, metadata)
 
 
 def _format_metadata(metadata: dict) -> dict:
@@ -39,9 +40,9 @@ def _format_metadata(metadata: dict) -> dict:
     return metadata
 
 
-def _generate_metadata(pypi_metadata: dict) -> dict:
+async def _generate_metadata(pypi_metadata: dict) -> dict:
     github_repo_url = pypi_metadata.get("code_repository")
     if is_valid_repo_url(github_repo_url):
-        github_metadata = get_github_metadata(github_repo_url)
+        github_metadata = await get_github_metadata_async(github_repo_url)
         return {**pypi_metadata, **github_metadata}
     return pypi_metadata
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from concurrent import futures
 from typing import Optional
@@ -12,6 +13,10 @@ from plugin.metadata import get_formatted_metadata
 from utils import zulip
 
 logger = logging.getLogger(__name__)
+# new plugins being updated at the same time, their requests are limited per host
+_MAX_PLUGINS_IN_FLIGHT = 64
+# threads running the blocking dynamo, lambda and zulip calls
+_MAX_WORKERS = 32
 
 
 def update_plugin() -> None:
@@ -26,15 +31,7 @@ def update_plugin() -> None:
     logger.info(f"Count of new plugins={len(new_plugins)}")
 
     # update for new version of plugins
-    with futures.ThreadPoolExecutor(max_workers=32) as executor:
-        update_futures = [
-            executor.submit(
-                _update_for_new_plugin, name, version, dynamo_latest_plugins.get(name)
-            )
-            for name, version in new_plugins.items()
-        ]
-
-    futures.wait(update_futures, return_when="ALL_COMPLETED")
+    asyncio.run(_update_for_new_plugins(new_plugins, dynamo_latest_plugins))
 
     # update for removed plugins and existing older version of plugins
     for name, version in dynamo_latest_plugins.items():
@@ -53,17 +50,50 @@ def update_plugin() -> None:
             zulip.plugin_no_longer_on_hub(name)
 
 
-def _update_for_new_plugin(name: str, version: str, old_version: Optional[str]) -> None:
+async def _update_for_new_plugins(
+    new_plugins: dict[str, str], dynamo_latest_plugins: dict[str, str]
+) -> None:
+    """
+    Updates the new plugins as a pipeline, the pypi and github fetches of some plugins
+    overlap with the dynamo writes of others.
+    :param new_plugins: new version keyed on plugin name
+    :param dynamo_latest_plugins: latest version in dynamo keyed on plugin name
+    """
+    asyncio.get_running_loop().set_default_executor(
+        futures.ThreadPoolExecutor(max_workers=_MAX_WORKERS)
+    )
+    semaphore = asyncio.Semaphore(_MAX_PLUGINS_IN_FLIGHT)
+
+    async def _update(name: str, version: str) -> None:
+        async with semaphore:
+            try:
+                await _update_for_new_plugin(
+                    name, version, dynamo_latest_plugins.get(name)
+                )
+            except Exception:
+                logger.exception(f"Failed update for plugin={name} version={version}")
+
+    await asyncio.gather(
+        *(_update(name, version) for name, version in new_plugins.items())
+    )
+
+
+async def _update_for_new_plugin(
+    name: str, version: str, old_version: Optional[str]
+) -> None:
     logger.info(f"Update for new plugin={name} version={version}")
-    put_plugin_metadata(
+    await asyncio.to_thread(
+        put_plugin_metadata,
         plugin=name,
         version=version,
         is_latest=True,
         plugin_metadata_type=PluginMetadataType.PYPI,
     )
-    cached_plugins = get_existing_types(name, version)
-    _build_plugin_metadata(name, version, cached_plugins, old_version)
-    _build_plugin_manifest(name, version, cached_plugins)
+    cached_plugins = await asyncio.to_thread(get_existing_types, name, version)
+    await asyncio.gather(
+        _build_plugin_metadata(name, version, cached_plugins, old_version),
+        asyncio.to_thread(_build_plugin_manifest, name, version, cached_plugins),
+    )
 
 
 def _build_plugin_manifest(
@@ -83,7 +113,7 @@ def _build_plugin_manifest(
     LambdaAdapter().invoke(plugin, version)
 
 
-def _build_plugin_metadata(
+async def _build_plugin_metadata(
     plugin: str,
     version: str,
     cache: set[PluginMetadataType],
@@ -98,17 +128,19 @@ def _build_plugin_metadata(
     """
     if PluginMetadataType.METADATA in cache:
         return
-    data = get_formatted_metadata(plugin, version)
+    data = await get_formatted_metadata(plugin, version)
     if not data:
         return
 
-    put_plugin_metadata(
+    await asyncio.to_thread(
+        put_plugin_metadata,
         plugin=plugin,
         version=version,
         plugin_metadata_type=PluginMetadataType.METADATA,
         data=data,
     )
     if old_version:
-        zulip.plugin_updated_on_hub(plugin, version, data.get("code_repository"))
+        notify = zulip.plugin_updated_on_hub
     else:
-        zulip.new_plugin_on_hub(plugin, version, data.get("code_repository"))
+        notify = zulip.new_plugin_on_hub
+    await asyncio.to_thread(notify, plugin, version, data.get("code_repository"))
@@ -9,6 +9,7 @@ PLUGIN = "plugin-1"
 VERSION = "2.34"
 BLOCKED_PLUGIN = "foo"
 DEFAULT_MANIFEST = {"field": "value"}
+TOTAL_INSTALLS = 42
 
 
 class TestAggregator:
@@ -44,6 +45,15 @@ class TestAggregator:
             aggregator, "get_formatted_manifest", self._get_formatted_manifest
         )
 
+    @pytest.fixture(autouse=True)
+    def get_total_installs(self, monkeypatch):
+        self._get_total_installs = Mock(return_value=TOTAL_INSTALLS)
+        monkeypatch.setattr(
+            aggregator.install_activity,
+            "get_total_installs",
+            self._get_total_installs,
+        )
+
     @pytest.fixture(autouse=True)
     def put_plugin(self, monkeypatch):
         self._put_plugin = Mock()
@@ -84,6 +94,8 @@ class TestAggregator:
             for field in {"excluded", "is_latest"}:
                 if field in data_field:
                     result[field] = data_field.pop(field)
+            if "is_latest" in result:
+                result["total_installs"] = TOTAL_INSTALLS
 
             aggregate_visibility = self._formatted_manifest.get("visibility")
             if not aggregate_visibility:
@@ -1,4 +1,5 @@
-from unittest.mock import Mock, call
+import asyncio
+from unittest.mock import AsyncMock, Mock, call
 
 import pytest
 
@@ -82,14 +83,20 @@ class TestMetadata:
 
     @pytest.fixture(autouse=True)
     def setup(self, monkeypatch) -> None:
-        self._mock_pypi_data = Mock(
-            side_effect=self._get_pypi_response, spec=metadata.get_plugin_pypi_metadata
+        self._mock_pypi_data = AsyncMock(
+            side_effect=self._get_pypi_response,
+            spec=metadata.get_plugin_pypi_metadata_async,
         )
-        monkeypatch.setattr(metadata, "get_plugin_pypi_metadata", self._mock_pypi_data)
-        self._mock_github_data = Mock(
-            side_effect=self._get_github_response, spec=metadata.get_github_metadata
+        monkeypatch.setattr(
+            metadata, "get_plugin_pypi_metadata_async", self._mock_pypi_data
+        )
+        self._mock_github_data = AsyncMock(
+            side_effect=self._get_github_response,
+            spec=metadata.get_github_metadata_async,
+        )
+        monkeypatch.setattr(
+            metadata, "get_github_metadata_async", self._mock_github_data
         )
-        monkeypatch.setattr(metadata, "get_github_metadata", self._mock_github_data)
         self._mock_render_desc = Mock(
             return_value=RENDERED_DESCRIPTION, spec=metadata.render_description
         )
@@ -119,7 +126,7 @@ class TestMetadata:
 
     def test_get_metadata_none_from_pypi(self, verify_calls) -> None:
         self._plugin_pypi_metadata_response = {}
-        actual = get_formatted_metadata(PLUGIN, VERSION)
+        actual = asyncio.run(get_formatted_metadata(PLUGIN, VERSION))
 
         assert actual is None
         verify_calls()
@@ -130,7 +137,7 @@ class TestMetadata:
         self._plugin_pypi_metadata_response = pypi_metadata
         pypi_metadata["code_repository"] = None
 
-        actual = get_formatted_metadata(PLUGIN, VERSION)
+        actual = asyncio.run(get_formatted_metadata(PLUGIN, VERSION))
 
         assert actual == self._plugin_pypi_metadata_response
         verify_calls()
@@ -141,7 +148,7 @@ class TestMetadata:
         self._plugin_pypi_metadata_response = pypi_metadata
         pypi_metadata["code_repository"] = "https://bb.com/czi/napari-demo"
 
-        actual = get_formatted_metadata(PLUGIN, VERSION)
+        actual = asyncio.run(get_formatted_metadata(PLUGIN, VERSION))
 
         assert actual == self._plugin_pypi_metadata_response
         verify_calls()
@@ -154,7 +161,7 @@ class TestMetadata:
         self._plugin_pypi_metadata_response = pypi_metadata
         self._github_metadata_response = github_metadata
 
-        actual = get_formatted_metadata(PLUGIN, VERSION)
+        actual = asyncio.run(get_formatted_metadata(PLUGIN, VERSION))
 
         del expected["description"]
         del expected["description_text"]
@@ -171,7 +178,7 @@ class TestMetadata:
         self._plugin_pypi_metadata_response = pypi_metadata
         self._github_metadata_response = github_metadata
 
-        actual = get_formatted_metadata(PLUGIN, VERSION)
+        actual = asyncio.run(get_formatted_metadata(PLUGIN, VERSION))
 
         del expected["description"]
         del expected["description_text"]
@@ -187,7 +194,7 @@ class TestMetadata:
         self._github_metadata_response = github_metadata
         del github_metadata["labels"]
 
-        actual = get_formatted_metadata(PLUGIN, VERSION)
+        actual = asyncio.run(get_formatted_metadata(PLUGIN, VERSION))
 
         del expected["category"]
         del expected["category_hierarchy"]
@@ -201,7 +208,7 @@ class TestMetadata:
         self._github_metadata_response = github_metadata
         del github_metadata["description"]
 
-        actual = get_formatted_metadata(PLUGIN, VERSION)
+        actual = asyncio.run(get_formatted_metadata(PLUGIN, VERSION))
 
         del expected["description"]
         del expected["description_text"]
@@ -214,7 +221,7 @@ class TestMetadata:
         self._plugin_pypi_metadata_response = pypi_metadata
         self._github_metadata_response = github_metadata
 
-        actual = get_formatted_metadata(PLUGIN, VERSION)
+        actual = asyncio.run(get_formatted_metadata(PLUGIN, VERSION))
 
         assert actual == expected
         verify_calls(
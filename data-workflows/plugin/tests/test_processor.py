@@ -1,4 +1,4 @@
-from unittest.mock import Mock, call
+from unittest.mock import AsyncMock, Mock, call
 
 import pytest
 
@@ -55,7 +55,7 @@ class TestProcessor:
 
     @pytest.fixture
     def mock_get_formatted_metadata(self, monkeypatch) -> Mock:
-        mock = Mock(
+        mock = AsyncMock(
             side_effect=lambda _, __: self._formatted_metadata,
             spec=plugin.metadata.get_formatted_metadata,
         )
@@ -249,6 +249,21 @@ class TestProcessor:
         else:
             self._zulip.assert_not_called()
 
+    def test_new_plugin_failure_does_not_stop_others(self):
+        self._dynamo_latest_plugins = {}
+        self._pypi_latest_plugins = {"bar": "2.4.6", PLUGIN: VERSION}
+        self._existing_types = {PMType.DISTRIBUTION, PMType.METADATA}
+
+        def _put_plugin_metadata(plugin, **_):
+            if plugin == "bar":
+                raise ValueError("throttled")
+
+        self._put_plugin_metadata.side_effect = _put_plugin_metadata
+
+        processor.update_plugin()
+
+        self._get_existing_types.assert_called_once_with(PLUGIN, VERSION)
+
 
 def _create_put_pm_call(pm_type, data=None, is_latest=False, version=VERSION) -> call:
     kwargs = {"plugin": PLUGIN, "version": version, "plugin_metadata_type": pm_type}
@@ -7,8 +7,11 @@ import categories.processor
 import logging
 import activity.processor
 
+from datetime import datetime
 from typing import Dict
 
+from utils.utils import datetime_to_utc_timestamp_in_millis
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -20,6 +23,8 @@ def run_workflow(event: Dict):
 
     Events:
         activity: {}
+        backfill: { start: YYYY-MM-DD, end: YYYY-MM-DD, chunk_days: int,
+                    workers: int, progress_file: string }
         seed-s3-categories: { version: string, categories_path: string }
     """
 
@@ -28,6 +33,22 @@ def run_workflow(event: Dict):
     if event_type == "activity":
         activity.processor.update_activity()
         LOGGER.info(f"Update successful for type={event_type}")
+    elif event_type == "backfill":
+        chunk_days = event.get("chunk_days", 7)
+        workers = event.get("workers", 4)
+        if chunk_days < 1 or workers < 1:
+            raise ValueError(
+                f"Invalid backfill chunk_days={chunk_days} workers={workers}, both "
+                f"must be positive"
+            )
+        activity.processor.backfill_activity(
+            _to_timestamp(event["start"]),
+            _to_timestamp(event["end"]),
+            chunk_days,
+            workers,
+            event.get("progress_file", "activity-backfill-progress.json"),
+        )
+        LOGGER.info(f"Update successful for type={event_type}")
     elif event_type == "seed-s3-categories":
         version = event.get("version")
         categories_path = event.get("categories_path")
@@ -36,6 +57,17 @@ def run_workflow(event: Dict):
         LOGGER.info(f"Update successful for type={event_type}")
 
 
+def _to_timestamp(value: str) -> int:
+    return datetime_to_utc_timestamp_in_millis(datetime.strptime(value, "%Y-%m-%d"))
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
+
 def _get_arg_parser():
     parser = argparse.ArgumentParser(
         prog="run-workflow",
@@ -51,6 +83,17 @@ def _get_arg_parser():
 
     subparsers.add_parser("activity", help="activity help")
 
+    backfill_parser = subparsers.add_parser(
+        "backfill", help="rebuilds activity ingested in a date range"
+    )
+    backfill_parser.add_argument("--start", required=True, help="YYYY-MM-DD")
+    backfill_parser.add_argument("--end", required=True, help="YYYY-MM-DD")
+    backfill_parser.add_argument("--chunk-days", type=_positive_int, default=7)
+    backfill_parser.add_argument("--workers", type=_positive_int, default=4)
+    backfill_parser.add_argument(
+        "--progress-file", default="activity-backfill-progress.json"
+    )
+
     return parser
 
 
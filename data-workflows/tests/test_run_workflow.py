@@ -11,6 +11,10 @@ class TestHandle:
     @pytest.fixture(autouse=True)
     def setup(self, monkeypatch):
         self._update_activity = Mock(spec=activity.processor.update_activity)
+        self._backfill_activity = Mock(spec=activity.processor.backfill_activity)
+        monkeypatch.setattr(
+            activity.processor, "backfill_activity", self._backfill_activity
+        )
         self._seed_s3_categories_workflow = Mock(
             spec=categories.processor.seed_s3_categories_workflow
         )
@@ -53,6 +57,40 @@ class TestHandle:
         run_workflow({"type": "seed-s3-categories"})
         self._verify_s3_seed(s3_seed_call_count=1)
 
+    def test_handle_backfill_event_type(self):
+        from run_workflow import run_workflow
+
+        run_workflow({"type": "backfill", "start": "2023-01-01", "end": "2023-01-15"})
+
+        self._backfill_activity.assert_called_once_with(
+            1672531200000, 1673740800000, 7, 4, "activity-backfill-progress.json"
+        )
+        self._verify_update_activity()
+
+    @pytest.mark.parametrize(
+        "options", [{"chunk_days": 0}, {"chunk_days": -7}, {"workers": 0}]
+    )
+    def test_handle_backfill_event_with_invalid_options(self, options: Dict):
+        from run_workflow import run_workflow
+
+        event = {"type": "backfill", "start": "2023-01-01", "end": "2023-01-15"}
+        with pytest.raises(ValueError):
+            run_workflow({**event, **options})
+
+        self._backfill_activity.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "args", [["--chunk-days", "0"], ["--chunk-days", "-7"], ["--workers", "0"]]
+    )
+    def test_backfill_arguments_must_be_positive(self, args):
+        from run_workflow import _get_arg_parser
+
+        parser = _get_arg_parser()
+        with pytest.raises(SystemExit):
+            parser.parse_args(
+                ["backfill", "--start", "2023-01-01", "--end", "2023-01-15", *args]
+            )
+
     @pytest.mark.parametrize(
         "event",
         [{"type": "foo"}, {"type": "bar"}, {}],
@@ -63,3 +101,4 @@ class TestHandle:
         run_workflow(event)
         self._verify_update_activity()
         self._verify_s3_seed()
+        self._backfill_activity.assert_not_called()
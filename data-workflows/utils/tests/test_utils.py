@@ -66,3 +66,57 @@ class TestParameterStore:
             "last_activity_fetched_timestamp"
         )
         assert actual == timestamp
+
+    @mock_ssm
+    def test_set_last_updated_timestamp_clears_stage_checkpoints(self, aws_credentials):
+        self._client = boto3.client("ssm")
+        self._client.put_parameter(
+            Name=EXPECTED_PARAMETER_NAME,
+            Value=PARAMETER_STORE_VALUE,
+            Type="SecureString",
+        )
+        from utils.utils import ParameterStoreAdapter
+
+        adapter = ParameterStoreAdapter()
+        adapter.set_stage_checkpoints({"install-DAY": TIMESTAMP + 10})
+
+        adapter.set_last_updated_timestamp(TIMESTAMP + 10)
+
+        assert adapter.get_stage_checkpoints() == {}
+        assert adapter.get_last_updated_timestamp() == TIMESTAMP + 10
+
+    @mock_ssm
+    def test_set_last_reconciled_timestamp_keeps_other_values(self, aws_credentials):
+        self._client = boto3.client("ssm")
+        self._client.put_parameter(
+            Name=EXPECTED_PARAMETER_NAME,
+            Value=PARAMETER_STORE_VALUE,
+            Type="SecureString",
+        )
+        from utils.utils import ParameterStoreAdapter
+
+        adapter = ParameterStoreAdapter()
+        assert adapter.get_last_reconciled_timestamp() is None
+
+        adapter.set_last_reconciled_timestamp(TIMESTAMP + 10)
+
+        assert adapter.get_last_reconciled_timestamp() == TIMESTAMP + 10
+        assert adapter.get_last_updated_timestamp() == TIMESTAMP
+
+    @mock_ssm
+    def test_set_stage_checkpoints(self, aws_credentials):
+        self._client = boto3.client("ssm")
+        self._client.put_parameter(
+            Name=EXPECTED_PARAMETER_NAME,
+            Value=PARAMETER_STORE_VALUE,
+            Type="SecureString",
+        )
+        from utils.utils import ParameterStoreAdapter
+
+        adapter = ParameterStoreAdapter()
+        assert adapter.get_stage_checkpoints() == {}
+
+        adapter.set_stage_checkpoints({"install-DAY": TIMESTAMP + 10})
+
+        assert adapter.get_stage_checkpoints() == {"install-DAY": TIMESTAMP + 10}
+        assert adapter.get_last_updated_timestamp() == TIMESTAMP
@@ -1,11 +1,14 @@
 import boto3
 import json
 from datetime import date, datetime, timezone, time
+from typing import Optional
 
 from .env import get_required_env
 
 
 LAST_UPDATED_TIMESTAMP_KEY = "last_activity_fetched_timestamp"
+LAST_RECONCILED_TIMESTAMP_KEY = "last_activity_totals_reconciled_timestamp"
+STAGE_CHECKPOINTS_KEY = "activity_stage_checkpoints"
 
 
 def to_datetime(timestamp: date) -> datetime:
@@ -24,15 +27,35 @@ class ParameterStoreAdapter:
         self._ssm_client = boto3.client("ssm")
 
     def get_last_updated_timestamp(self) -> int:
+        return self._get_config().get(LAST_UPDATED_TIMESTAMP_KEY)
+
+    def set_last_updated_timestamp(self, timestamp) -> None:
+        # checkpoints belong to the window being advanced past, clearing them in the
+        # same update leaves checkpoints only for a partially failed window
+        self._update_config(
+            {LAST_UPDATED_TIMESTAMP_KEY: timestamp, STAGE_CHECKPOINTS_KEY: {}}
+        )
+
+    def get_last_reconciled_timestamp(self) -> Optional[int]:
+        return self._get_config().get(LAST_RECONCILED_TIMESTAMP_KEY)
+
+    def set_last_reconciled_timestamp(self, timestamp) -> None:
+        self._update_config({LAST_RECONCILED_TIMESTAMP_KEY: timestamp})
+
+    def get_stage_checkpoints(self) -> dict[str, int]:
+        return self._get_config().get(STAGE_CHECKPOINTS_KEY, {})
+
+    def set_stage_checkpoints(self, checkpoints: dict[str, int]) -> None:
+        self._update_config({STAGE_CHECKPOINTS_KEY: checkpoints})
+
+    def _get_config(self) -> dict:
         response = self._ssm_client.get_parameter(
             Name=self._parameter_name, WithDecryption=True
         )
-        return json.loads(response["Parameter"]["Value"]).get(
-            LAST_UPDATED_TIMESTAMP_KEY
-        )
+        return json.loads(response["Parameter"]["Value"])
 
-    def set_last_updated_timestamp(self, timestamp) -> None:
-        value = json.dumps({LAST_UPDATED_TIMESTAMP_KEY: timestamp})
+    def _update_config(self, values: dict) -> None:
+        value = json.dumps({**self._get_config(), **values})
         self._ssm_client.put_parameter(
             Name=self._parameter_name, Value=value, Overwrite=True, Type="SecureString"
         )
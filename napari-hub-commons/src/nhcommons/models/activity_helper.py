@@ -1,11 +1,21 @@
 from datetime import datetime, timezone
 from functools import partial
-from typing import Dict, Any, List, Union
+from typing import Dict, Any, List, Optional, Union
 
 from dateutil.relativedelta import relativedelta
 from pynamodb.attributes import Attribute
 
 
+# months covered by rolled-up timelines, ending with the current month
+TIMELINE_MONTHS = 14
+
+
+def _get_first_of_current_month() -> datetime:
+    return datetime.combine(
+        datetime.today().replace(day=1), datetime.min.time(), timezone.utc
+    )
+
+
 def _get_first_of_last_month() -> datetime:
     return datetime.combine(
         datetime.today().replace(day=1) - relativedelta(months=1),
@@ -53,3 +63,42 @@ def _timestamp_to_entry(
         "timestamp": timestamp,
         activity_value_key: value_by_timestamp.get(timestamp, 0),
     }
+
+
+def get_rollup_months() -> List[datetime]:
+    """
+    Returns the first of the month for the months of a rolled-up timeline, oldest
+    first and ending with the current month.
+    """
+    current_month = _get_first_of_current_month()
+    return [
+        current_month - relativedelta(months=i)
+        for i in range(TIMELINE_MONTHS - 1, -1, -1)
+    ]
+
+
+def to_millis(value: datetime) -> int:
+    return int(value.timestamp()) * 1000
+
+
+def rollup_to_timeline_results(
+    start_timestamp: int, counts: List[int], month_delta: int
+) -> Optional[Dict[int, int]]:
+    """
+    Maps the monthly counts of a rolled-up timeline to counts keyed on the month
+    timestamp, as expected by process_timeline_results.
+    :returns: counts by month timestamp, None if the rollup does not cover the
+    month_delta months of the timeline
+
+    :param int start_timestamp: timestamp in millis of the first month of the rollup
+    :param List[int] counts: counts for consecutive months from the first month
+    :param int month_delta: Number of months in timeline.
+    """
+    start = datetime.fromtimestamp(start_timestamp / 1000, timezone.utc)
+    earliest = _get_first_of_last_month() - relativedelta(months=month_delta - 1)
+    if start > earliest:
+        return None
+    return {
+        to_millis(start + relativedelta(months=i)): count
+        for i, count in enumerate(counts)
+    }
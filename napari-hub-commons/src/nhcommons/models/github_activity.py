@@ -1,13 +1,22 @@
 import logging
 import time
 
-from typing import Dict, Any, List, Optional, Iterator
-from pynamodb.attributes import UnicodeAttribute, NumberAttribute
+from typing import Dict, Any, List, Optional, Iterator, Iterable
+from pynamodb.attributes import ListAttribute, UnicodeAttribute, NumberAttribute
+from pynamodb.exceptions import UpdateError
 from nhcommons.models.activity_helper import (
     build_timeline_query_parameters,
+    get_rollup_months,
     process_timeline_results,
+    rollup_to_timeline_results,
+    to_millis,
 )
-from nhcommons.models.pynamo_helper import set_ddb_metadata, PynamoWrapper
+from nhcommons.models.pynamo_helper import (
+    filter_changed,
+    set_ddb_metadata,
+    PynamoWrapper,
+)
+from nhcommons.utils import get_current_timestamp
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +33,9 @@ class _GitHubActivity(PynamoWrapper):
     repo = UnicodeAttribute()
     timestamp = NumberAttribute(null=True)
     expiry = NumberAttribute(null=True)
+    counts = ListAttribute(of=NumberAttribute, null=True)
+    # ingestion timestamp up to which commits are included in the TOTAL: count
+    counted_until = NumberAttribute(null=True)
 
     @staticmethod
     def from_dict(data: Dict[str, Any]):
@@ -35,19 +47,33 @@ class _GitHubActivity(PynamoWrapper):
             repo=data["repo"],
             timestamp=data.get("timestamp"),
             expiry=data.get("expiry"),
+            counts=data.get("counts"),
+            counted_until=data.get("counted_until"),
         )
 
 
-def batch_write(records: List[Dict]) -> None:
+def batch_write(records: Iterable[Dict], skip_unchanged: bool = False) -> int:
+    """
+    Writes the records with BatchWriteItem, in batches of 25 items.
+    :param Iterable[Dict] records: records to write
+    :param bool skip_unchanged: if records identical to the stored item are skipped
+    :returns int: number of records saved
+    """
     start = time.perf_counter()
+    count = 0
     try:
         batch = _GitHubActivity.batch_write()
-        for record in records:
-            batch.save(_GitHubActivity.from_dict(record))
+        items = (_GitHubActivity.from_dict(record) for record in records)
+        if skip_unchanged:
+            items = filter_changed(_GitHubActivity, items)
+        for item in items:
+            batch.save(item)
+            count += 1
         batch.commit()
+        return count
     finally:
         duration = (time.perf_counter() - start) * 1000
-        logger.info(f"_GitHubActivity duration={duration}ms")
+        logger.info(f"_GitHubActivity count={count} duration={duration}ms")
 
 
 def get_total_commits(plugin: str, repo: str) -> int:
@@ -87,10 +113,150 @@ def get_timeline(plugin: str, repo: str, month_delta: int) -> List[Dict[str, int
     return process_timeline_results(results, month_delta, "commits")
 
 
+def batch_get_stats(repo_by_plugin: Dict[str, Optional[str]]) -> Dict[str, Dict]:
+    """
+    Fetches total_commits and latest_commit_timestamp for the plugins with
+    BatchGetItem, in pages of 100 keys with unprocessed keys retried.
+    :returns Dict[str, Dict]: A dict of stats keyed on lowercase plugin name
+
+    :param Dict[str, Optional[str]] repo_by_plugin: Name of the GitHub repo keyed on
+    plugin name
+    """
+    result = {}
+    keys = []
+    for plugin, repo in repo_by_plugin.items():
+        name = plugin.lower()
+        result[name] = {"total_commits": 0, "latest_commit_timestamp": None}
+        if repo:
+            keys.extend([(name, f"TOTAL:{repo}"), (name, f"LATEST:{repo}")])
+
+    start = time.perf_counter()
+    try:
+        items = _GitHubActivity.batch_get(
+            keys,
+            attributes_to_get=[
+                "plugin_name",
+                "type_identifier",
+                "commit_count",
+                "timestamp",
+            ],
+        )
+        for item in items:
+            stats = result[item.plugin_name]
+            if item.type_identifier.startswith("TOTAL:"):
+                stats["total_commits"] = item.commit_count
+            else:
+                stats["latest_commit_timestamp"] = item.timestamp
+        return result
+    finally:
+        duration = (time.perf_counter() - start) * 1000
+        logger.info(f"batch_get count={len(keys)} duration={duration}ms")
+
+
+def add_total_commits(
+    commit_counts: Dict[str, int],
+    plugin_by_repo: Dict[str, str],
+    counted_from: int,
+    counted_until: int,
+) -> List[str]:
+    """
+    Atomically adds the commits ingested in the window (counted_from, counted_until]
+    to the TOTAL:{repo} records. A record is incremented if it was counted until the
+    start of the window or earlier, as every window since then was processed without
+    commits for the repo. A record counted past the start of the window, or without
+    counted_until, has to be recounted in full to not double count commits.
+    :returns List[str]: repos to recount
+
+    :param Dict[str, int] commit_counts: commits ingested in the window keyed on repo
+    :param Dict[str, str] plugin_by_repo: Name of the plugin keyed on the GitHub repo,
+    repos without plugin are skipped
+    :param int counted_from: timestamp the window starts after
+    :param int counted_until: timestamp the window ends at
+    """
+    count = 0
+    recount = []
+    start = time.perf_counter()
+    try:
+        for repo, commit_count in commit_counts.items():
+            plugin = plugin_by_repo.get(repo)
+            if plugin is None:
+                logger.warning(f"Unable to find plugin name for repo={repo}")
+                continue
+            record = _GitHubActivity(plugin.lower(), f"TOTAL:{repo}")
+            try:
+                record.update(
+                    actions=[
+                        _GitHubActivity.commit_count.add(commit_count),
+                        _GitHubActivity.counted_until.set(counted_until),
+                        _GitHubActivity.last_updated_timestamp.set(
+                            get_current_timestamp()
+                        ),
+                    ],
+                    condition=_GitHubActivity.counted_until <= counted_from,
+                )
+                count += 1
+            except UpdateError as e:
+                if e.cause_response_code != "ConditionalCheckFailedException":
+                    raise
+                recount.append(repo)
+        return recount
+    finally:
+        duration = (time.perf_counter() - start) * 1000
+        logger.info(
+            f"add_total_commits count={count} recount={len(recount)} "
+            f"duration={duration}ms"
+        )
+
+
+def write_rollups(plugin_by_repo: Dict[str, str]) -> None:
+    """
+    Rolls up the MONTH: records of the repos into a TIMELINE:MONTH:{repo} record
+    holding the monthly commit counts as a list, so timelines are read with one
+    GetItem.
+
+    :param Dict[str, str] plugin_by_repo: Name of the plugin keyed on the GitHub repo
+    with updated commit activity
+    """
+    months = get_rollup_months()
+    batch = []
+    for repo, plugin in plugin_by_repo.items():
+        type_format = "MONTH:{0:%Y%m}:" + repo
+        query_params = {
+            "hash_key": plugin.lower(),
+            "range_key_condition": _GitHubActivity.type_identifier.between(
+                type_format.format(months[0]), type_format.format(months[-1])
+            ),
+            "filter_condition": _GitHubActivity.repo == repo,
+        }
+        counts_by_type = {
+            row.type_identifier: row.commit_count for row in _query_table(query_params)
+        }
+        counts = [counts_by_type.get(type_format.format(month), 0) for month in months]
+        batch.append(
+            {
+                "plugin_name": plugin.lower(),
+                "type_identifier": f"TIMELINE:MONTH:{repo}",
+                "granularity": "TIMELINE",
+                "commit_count": sum(counts),
+                "repo": repo,
+                "timestamp": to_millis(months[0]),
+                "counts": counts,
+            }
+        )
+    batch_write(batch)
+
+
 def _query_for_timeline(plugin: str, repo: str, month_delta: int) -> Dict[int, int]:
     if not repo:
         logger.info(f"Skipping timeline query for {plugin} as repo={repo}")
         return {}
+    rollup = _get_item(plugin, f"TIMELINE:MONTH:{repo}")
+    if rollup:
+        results = rollup_to_timeline_results(
+            rollup.timestamp, rollup.counts, month_delta
+        )
+        if results is not None:
+            return results
     query_params = build_timeline_query_parameters(
         plugin,
         f"MONTH:{{timestamp:%Y%m}}:{repo}",
@@ -1,22 +1,39 @@
 import logging
 import os
 import time
-from datetime import date
+from datetime import date, datetime, timezone
 from functools import reduce
-from typing import Dict, Any, List, Iterator
+from typing import Dict, Any, List, Iterator, Iterable, Optional, Tuple
 
 from dateutil.relativedelta import relativedelta
-from pynamodb.attributes import UnicodeAttribute, NumberAttribute
+from pynamodb.attributes import ListAttribute, UnicodeAttribute, NumberAttribute
+from pynamodb.exceptions import UpdateError
 from pynamodb.indexes import GlobalSecondaryIndex, IncludeProjection
 
 from nhcommons.models.activity_helper import (
     build_timeline_query_parameters,
+    get_rollup_months,
     process_timeline_results,
+    rollup_to_timeline_results,
+    to_millis,
 )
-from nhcommons.models.pynamo_helper import set_ddb_metadata, PynamoWrapper
+from nhcommons.models.pynamo_helper import (
+    filter_changed,
+    set_ddb_metadata,
+    PynamoWrapper,
+    scan,
+)
+from nhcommons.utils import get_current_timestamp
 
 logger = logging.getLogger(__name__)
 
+_DAY_TYPE_FORMAT = "DAY:{0:%Y%m%d}"
+_MONTH_TYPE_FORMAT = "MONTH:{0:%Y%m}"
+_TIMELINE_TYPE = "TIMELINE:MONTH"
+_ROLLING_TYPE = "ROLLING:30D"
+# days covered by the rolling rollup, ending with the day it is written
+_ROLLING_DAYS = 31
+
 
 class _TotalInstallsIndex(GlobalSecondaryIndex):
     class Meta:
@@ -38,6 +55,9 @@ class _InstallActivity(PynamoWrapper):
     install_count = NumberAttribute()
     is_total = UnicodeAttribute(null=True)
     timestamp = NumberAttribute(null=True)
+    counts = ListAttribute(of=NumberAttribute, null=True)
+    # ingestion timestamp up to which installs are included in the TOTAL: count
+    counted_until = NumberAttribute(null=True)
 
     total_installs = _TotalInstallsIndex()
 
@@ -50,19 +70,33 @@ class _InstallActivity(PynamoWrapper):
             install_count=data["install_count"],
             is_total=data.get("is_total"),
             timestamp=data.get("timestamp"),
+            counts=data.get("counts"),
+            counted_until=data.get("counted_until"),
         )
 
 
-def batch_write(records: List[Dict]) -> None:
+def batch_write(records: Iterable[Dict], skip_unchanged: bool = False) -> int:
+    """
+    Writes the records with BatchWriteItem, in batches of 25 items.
+    :param Iterable[Dict] records: records to write
+    :param bool skip_unchanged: if records identical to the stored item are skipped
+    :returns int: number of records saved
+    """
     start = time.perf_counter()
+    count = 0
     try:
         batch = _InstallActivity.batch_write()
-        for record in records:
-            batch.save(_InstallActivity.from_dict(record))
+        items = (_InstallActivity.from_dict(record) for record in records)
+        if skip_unchanged:
+            items = filter_changed(_InstallActivity, items)
+        for item in items:
+            batch.save(item)
+            count += 1
         batch.commit()
+        return count
     finally:
         duration = (time.perf_counter() - start) * 1000
-        logger.info(f"_InstallActivity duration={duration}ms")
+        logger.info(f"_InstallActivity count={count} duration={duration}ms")
 
 
 def get_total_installs(plugin: str) -> int:
@@ -91,10 +125,16 @@ def get_recent_installs(plugin: str, day_delta: int) -> int:
     :param str plugin: Name of the plugin in lowercase.
     :param int day_delta: Specifies the number of days to include in the computation.
     """
-    day_type_format = "DAY:{0:%Y%m%d}"
     today = date.today()
-    upper = day_type_format.format(today)
-    lower = day_type_format.format(today - relativedelta(days=day_delta))
+    rollup = _get_rollup(plugin, _ROLLING_TYPE)
+    if rollup:
+        start = datetime.fromtimestamp(rollup.timestamp / 1000, timezone.utc).date()
+        offset = (today - relativedelta(days=day_delta) - start).days
+        if offset >= 0:
+            return sum(rollup.counts[offset : offset + day_delta + 1])
+
+    upper = _DAY_TYPE_FORMAT.format(today)
+    lower = _DAY_TYPE_FORMAT.format(today - relativedelta(days=day_delta))
 
     query_params = {
         "hash_key": plugin.lower(),
@@ -116,13 +156,22 @@ def get_timeline(plugin: str, month_delta: int) -> List[Dict[str, int]]:
     :param str plugin: Name of the plugin in lowercase.
     :param int month_delta: Number of months in timeline.
     """
-    query_params = build_timeline_query_parameters(
-        plugin,
-        f"MONTH:{{timestamp:%Y%m}}",
-        month_delta,
-        _InstallActivity.type_timestamp,
-    )
-    results = {row.timestamp: row.install_count for row in _query_table(query_params)}
+    rollup = _get_rollup(plugin, _TIMELINE_TYPE)
+    results = None
+    if rollup:
+        results = rollup_to_timeline_results(
+            rollup.timestamp, rollup.counts, month_delta
+        )
+    if results is None:
+        query_params = build_timeline_query_parameters(
+            plugin,
+            f"MONTH:{{timestamp:%Y%m}}",
+            month_delta,
+            _InstallActivity.type_timestamp,
+        )
+        results = {
+            row.timestamp: row.install_count for row in _query_table(query_params)
+        }
     return process_timeline_results(results, month_delta, "installs")
 
 
@@ -133,8 +182,9 @@ def get_total_installs_by_plugins() -> Dict[str, int]:
     """
     start = time.perf_counter()
     try:
-        iterator = _InstallActivity.total_installs.scan(
-            attributes_to_get=["plugin_name", "install_count"]
+        iterator = scan(
+            _InstallActivity.total_installs,
+            attributes_to_get=["plugin_name", "install_count"],
         )
         return {item.plugin_name: item.install_count for item in iterator}
     finally:
@@ -142,6 +192,133 @@ def get_total_installs_by_plugins() -> Dict[str, int]:
         logging.info(f"scan duration={duration}ms")
 
 
+def batch_get_total_installs(plugins: Iterable[str]) -> Dict[str, int]:
+    """
+    Fetches total_installs for the plugins with BatchGetItem, in pages of 100 keys
+    with unprocessed keys retried.
+    :returns Dict[str, int]: A dict of total_installs keyed on lowercase plugin name,
+    0 for plugins without TOTAL: record
+
+    :param Iterable[str] plugins: Names of the plugins
+    """
+    names = {plugin.lower() for plugin in plugins}
+    result = {name: 0 for name in names}
+    start = time.perf_counter()
+    try:
+        items = _InstallActivity.batch_get(
+            [(name, "TOTAL:") for name in names],
+            attributes_to_get=["plugin_name", "install_count"],
+        )
+        result.update({item.plugin_name: item.install_count for item in items})
+        return result
+    finally:
+        duration = (time.perf_counter() - start) * 1000
+        logger.info(f"batch_get count={len(names)} duration={duration}ms")
+
+
+def add_total_installs(
+    install_counts: Dict[str, int], counted_from: int, counted_until: int
+) -> Tuple[Dict[str, int], List[str]]:
+    """
+    Atomically adds the installs ingested in the window (counted_from, counted_until]
+    to the TOTAL: records of the plugins. A record is incremented if it was counted
+    until the start of the window or earlier, as every window since then was processed
+    without installs for the plugin. A record counted past the start of the window, or
+    without counted_until, has to be recounted in full to not double count installs.
+    :returns Tuple[Dict[str, int], List[str]]: updated total_installs keyed on
+    lowercase plugin name, and the plugins to recount
+
+    :param Dict[str, int] install_counts: installs ingested in the window keyed on
+    plugin name
+    :param int counted_from: timestamp the window starts after
+    :param int counted_until: timestamp the window ends at
+    """
+    totals = {}
+    recount = []
+    start = time.perf_counter()
+    try:
+        for plugin, count in install_counts.items():
+            record = _InstallActivity(plugin.lower(), "TOTAL:")
+            try:
+                record.update(
+                    actions=[
+                        _InstallActivity.install_count.add(count),
+                        _InstallActivity.counted_until.set(counted_until),
+                        _InstallActivity.last_updated_timestamp.set(
+                            get_current_timestamp()
+                        ),
+                    ],
+                    condition=_InstallActivity.counted_until <= counted_from,
+                )
+                totals[record.plugin_name] = record.install_count
+            except UpdateError as e:
+                if e.cause_response_code != "ConditionalCheckFailedException":
+                    raise
+                recount.append(plugin.lower())
+        return totals, recount
+    finally:
+        duration = (time.perf_counter() - start) * 1000
+        logger.info(
+            f"add_total_installs count={len(totals)} recount={len(recount)} "
+            f"duration={duration}ms"
+        )
+
+
+def write_rollups(plugins: Iterable[str]) -> None:
+    """
+    Rolls up the MONTH: records of the plugins into a TIMELINE:MONTH record, and the
+    DAY: records of the last 30 days into a ROLLING:30D record, each holding the
+    counts as a list, so timelines and recent installs are read with one GetItem.
+
+    :param Iterable[str] plugins: Names of the plugins with updated install activity
+    """
+    months = get_rollup_months()
+    today = date.today()
+    days = [today - relativedelta(days=i) for i in range(_ROLLING_DAYS - 1, -1, -1)]
+    batch = []
+    for plugin in {plugin.lower() for plugin in plugins}:
+        batch.append(_build_rollup(plugin, _TIMELINE_TYPE, _MONTH_TYPE_FORMAT, months))
+        batch.append(_build_rollup(plugin, _ROLLING_TYPE, _DAY_TYPE_FORMAT, days))
+    batch_write(batch)
+
+
+def _build_rollup(
+    plugin: str, type_timestamp: str, type_format: str, periods: List[date]
+) -> Dict[str, Any]:
+    query_params = {
+        "hash_key": plugin,
+        "range_key_condition": _InstallActivity.type_timestamp.between(
+            type_format.format(periods[0]), type_format.format(periods[-1])
+        ),
+    }
+    counts_by_type = {
+        row.type_timestamp: row.install_count for row in _query_table(query_params)
+    }
+    counts = [counts_by_type.get(type_format.format(period), 0) for period in periods]
+    start = datetime.combine(periods[0], datetime.min.time(), timezone.utc)
+    return {
+        "plugin_name": plugin,
+        "type_timestamp": type_timestamp,
+        "granularity": type_timestamp.split(":")[0],
+        "install_count": sum(counts),
+        "timestamp": to_millis(start),
+        "counts": counts,
+    }
+
+
+def _get_rollup(plugin: str, type_timestamp: str) -> Optional[_InstallActivity]:
+    start = time.perf_counter()
+    try:
+        return _InstallActivity.get(
+            plugin.lower(), type_timestamp, attributes_to_get=["timestamp", "counts"]
+        )
+    except _InstallActivity.DoesNotExist:
+        return None
+    finally:
+        duration = (time.perf_counter() - start) * 1000
+        logger.info(f"get {type_timestamp} for plugin={plugin} duration={duration}ms")
+
+
 def _query_table(kwargs: dict) -> Iterator[_InstallActivity]:
     start = time.perf_counter()
     try:
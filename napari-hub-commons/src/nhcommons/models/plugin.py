@@ -1,13 +1,34 @@
+import gzip
+import json
 import logging
+import os
 import time
-from typing import Any, Dict, List, Callable, Optional, Iterator, Set, TypeVar
-
-from pynamodb.attributes import UnicodeAttribute, ListAttribute, MapAttribute
+from typing import (
+    Any,
+    Dict,
+    List,
+    Callable,
+    Optional,
+    Iterable,
+    Iterator,
+    Set,
+    TypeVar,
+    Union,
+)
+
+from pynamodb.attributes import (
+    BinaryAttribute,
+    UnicodeAttribute,
+    ListAttribute,
+    MapAttribute,
+    NumberAttribute,
+)
 from pynamodb.expressions.condition import Condition
+from pynamodb.exceptions import UpdateError
+from pynamodb.expressions.operand import Path
 from pynamodb.indexes import GlobalSecondaryIndex, AllProjection
-from pynamodb.pagination import ResultIterator
 
-from .pynamo_helper import set_ddb_metadata, get_stack_name, PynamoWrapper
+from .pynamo_helper import set_ddb_metadata, get_stack_name, PynamoWrapper, scan
 from .plugin_utils import PluginVisibility
 from ..utils.adapter_helpers import GithubClientHelper
 
@@ -33,13 +54,15 @@ class _Plugin(PynamoWrapper):
     version = UnicodeAttribute(range_key=True)
 
     authors = ListAttribute(null=True)
-    data = MapAttribute()
+    data = MapAttribute(null=True)
+    data_blob = BinaryAttribute(null=True)
     code_repository = UnicodeAttribute(null=True)
     display_name = UnicodeAttribute(null=True)
     first_released = UnicodeAttribute()
     summary = UnicodeAttribute(null=True)
     release_date = UnicodeAttribute()
     visibility = UnicodeAttribute(null=True)
+    total_installs = NumberAttribute(null=True)
 
     is_latest = UnicodeAttribute(null=True)
     excluded = UnicodeAttribute(null=True)
@@ -72,14 +95,40 @@ _INDEX_SUBSET = {
 }
 
 
+# Storage of the plugin data, "map" stores it in the data map attribute, "blob" in
+# the data_blob gzip compressed json attribute, and "both" writes both but reads from
+# the map, which allows migrating the records before switching reads to the blob.
+_DATA_STORAGE_MODES = {"map", "blob", "both"}
+
+
 def get_index(
     visibility_filter: Optional[Set[PluginVisibility]],
+    include_total_installs: bool = False,
 ) -> List[Dict[str, Any]]:
-    return _scan_latest_plugins_index(
-        attributes=["name", "version", "data", "visibility"],
-        mapper=_index_list_mapper(),
+    """
+    Get the index page metadata of the latest plugins.
+    :params visibility_filter: visibilities to filter results by, if None all plugins
+    are returned
+    :params include_total_installs: include the total_installs materialized on the
+    plugin, which is None for plugins it has not been written to yet
+    :return: list of index page metadata sorted on name, so the same plugins always
+    serialize the same way whatever order the scan segments complete in
+    """
+    attributes = [
+        "name",
+        "version",
+        "visibility",
+        *_to_data_paths(_INDEX_SUBSET),
+        *_to_data_blob_projection(),
+    ]
+    if include_total_installs:
+        attributes.append("total_installs")
+    index = _scan_latest_plugins_index(
+        attributes=attributes,
+        mapper=_index_list_mapper(include_total_installs),
         filter_conditions=_to_visibility_condition(visibility_filter),
     )
+    return sorted(index, key=lambda plugin: plugin.get("name", ""))
 
 
 def get_latest_plugins() -> Dict[str, str]:
@@ -89,13 +138,44 @@ def get_latest_plugins() -> Dict[str, str]:
     )
 
 
+def get_plugin_names(visibility_filter: Optional[Set[PluginVisibility]]) -> Set[str]:
+    """
+    Get the names of the latest plugins that have data, without fetching the data.
+    :params visibility_filter: visibilities to filter results by, if None all plugins
+    are returned
+    :return: set of plugin names
+    """
+    condition = _Plugin.data.exists()
+    if _get_data_storage() == "blob":
+        condition |= _Plugin.data_blob.exists()
+    visibility_condition = _to_visibility_condition(visibility_filter)
+    if visibility_condition is not None:
+        condition &= visibility_condition
+    return _scan_latest_plugins_index(
+        attributes=["name"],
+        mapper=lambda result: {plugin.name for plugin in result},
+        filter_conditions=condition,
+    )
+
+
 def get_latest_plugin(
-    name: str, visibilities: Optional[Set[PluginVisibility]]
+    name: str,
+    visibilities: Optional[Set[PluginVisibility]],
+    fields: Optional[Set[str]] = None,
 ) -> Dict[str, Any]:
+    """
+    Get the data of the latest version of the plugin.
+    :params name: name of the plugin
+    :params visibilities: visibilities to filter results by
+    :params fields: fields of the data to fetch, all fields are fetched if None
+    :return: plugin data, empty if the plugin is not found
+    """
     plugin = _query_for_latest_plugin(
-        name, ["data", "release_date"], _to_visibility_condition(visibilities)
+        name,
+        [*_to_data_projection(fields), "release_date"],
+        _to_visibility_condition(visibilities),
     )
-    return plugin.data.as_dict() if plugin and plugin.data else {}
+    return _to_data(plugin, fields)
 
 
 def get_latest_version(name: str) -> Optional[str]:
@@ -110,57 +190,165 @@ def get_plugin_name_by_repo() -> Dict[str, str]:
 
 
 def get_plugin_by_version(
-    name: str, version: str, visibilities: Optional[Set[PluginVisibility]]
+    name: str,
+    version: str,
+    visibilities: Optional[Set[PluginVisibility]],
+    fields: Optional[Set[str]] = None,
 ) -> Dict[str, Any]:
+    """
+    Get the data of the specific version of the plugin.
+    :params name: name of the plugin
+    :params version: version of the plugin
+    :params visibilities: visibilities to filter results by
+    :params fields: fields of the data to fetch, all fields are fetched if None
+    :return: plugin data, empty if the plugin is not found
+    """
     kwargs = {
-        "attributes_to_get": ["data", "release_date"],
+        "attributes_to_get": [*_to_data_projection(fields), "release_date"],
         "filter_condition": _to_visibility_condition(visibilities),
         "hash_key": name,
         "range_key_condition": _Plugin.version == version,
     }
     plugin = _get_latest([plugin for plugin in _query_table(kwargs)])
-    return plugin.data.as_dict() if plugin and plugin.data else {}
+    return _to_data(plugin, fields)
 
 
 def put_plugin(name: str, version: str, record: Dict[str, Any]) -> None:
     start = time.perf_counter()
+    storage = _get_data_storage()
+    data = record.get("data", {})
     try:
         plugin = _Plugin(
             hash_key=name,
             range_key=version,
             authors=record.get("authors"),
-            data=record.get("data", {}),
+            data=data if storage in {"map", "both"} else None,
+            data_blob=_encode_data(data) if storage in {"blob", "both"} else None,
             code_repository=record.get("code_repository"),
             display_name=record.get("display_name"),
             first_released=record.get("first_released"),
             summary=record.get("summary"),
             release_date=record.get("release_date"),
             visibility=record.get("visibility"),
+            total_installs=record.get("total_installs"),
             is_latest=record.get("is_latest"),
             excluded=record.get("excluded"),
         )
         plugin.save()
     finally:
         duration = (time.perf_counter() - start) * 1000
-        logger.info(f"plugin={name} version={version} duration={duration}ms")
+        logger.info(
+            f"plugin={name} version={version} storage={storage} duration={duration}ms"
+        )
+
+
+def update_total_installs(
+    total_installs_by_plugin: Dict[str, int],
+    latest_plugins: Optional[Dict[str, str]] = None,
+) -> None:
+    """
+    Materializes total_installs on the latest plugin records, so the index does not
+    have to be joined with the install activity.
+    :params total_installs_by_plugin: total_installs keyed on plugin name, matched
+    to plugins case-insensitively
+    :params latest_plugins: latest version keyed on plugin name, the latest plugins
+    index is scanned for it if None
+    """
+    start = time.perf_counter()
+    count = 0
+    try:
+        if latest_plugins is None:
+            latest_plugins = get_latest_plugins()
+        keys = {
+            name.lower(): (name, version) for name, version in latest_plugins.items()
+        }
+        for plugin_name, total_installs in total_installs_by_plugin.items():
+            key = keys.get(plugin_name.lower())
+            if not key:
+                continue
+            try:
+                _Plugin(*key).update(
+                    actions=[_Plugin.total_installs.set(total_installs)],
+                    condition=_Plugin.name.exists(),
+                )
+                count += 1
+            except UpdateError:
+                logger.exception(f"Error updating total_installs plugin={key}")
+    finally:
+        duration = (time.perf_counter() - start) * 1000
+        logger.info(f"update_total_installs count={count} duration={duration}ms")
 
 
-def _index_list_mapper() -> Callable[[Iterator[_Plugin]], List[Dict[str, Any]]]:
+def get_latest_plugins_without_total_installs() -> Dict[str, str]:
+    """
+    Get the latest plugins total_installs has not been materialized on.
+    :return: latest version keyed on plugin name
+    """
+    return _scan_latest_plugins_index(
+        attributes=["name", "version"],
+        mapper=lambda result: {plugin.name: plugin.version for plugin in result},
+        filter_conditions=_Plugin.total_installs.does_not_exist(),
+    )
+
+
+def _index_list_mapper(
+    include_total_installs: bool = False,
+) -> Callable[[Iterator[_Plugin]], List[Dict[str, Any]]]:
     def _to_dict(item: _Plugin, data: Dict) -> Dict:
         result = {key: data[key] for key in _INDEX_SUBSET if key in data}
         result["visibility"] = item.visibility.lower()
+        if include_total_installs:
+            result["total_installs"] = item.total_installs
         return result
 
     def _mapper(plugins: Iterator[_Plugin]) -> List[Dict[str, Any]]:
-        return [
-            _to_dict(item, data)
-            for item in plugins
-            if item.data and (data := item.data.as_dict())
-        ]
+        return [_to_dict(item, data) for item in plugins if (data := _get_data(item))]
 
     return _mapper
 
 
+def _to_data_paths(fields: Iterable[str]) -> List[Path]:
+    return [Path(["data", field]) for field in sorted(fields)]
+
+
+def _to_data_projection(fields: Optional[Set[str]]) -> List[Union[str, Path]]:
+    # name is always projected to differentiate missing plugins from plugins without
+    # the requested fields
+    projection = ["data"] if fields is None else _to_data_paths({"name", *fields})
+    return [*projection, *_to_data_blob_projection()]
+
+
+def _to_data_blob_projection() -> List[str]:
+    return ["data_blob"] if _get_data_storage() == "blob" else []
+
+
+def _get_data_storage() -> str:
+    storage = os.getenv("PLUGIN_DATA_STORAGE", "map").lower()
+    return storage if storage in _DATA_STORAGE_MODES else "map"
+
+
+def _encode_data(data: Dict[str, Any]) -> bytes:
+    body = json.dumps(data, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return gzip.compress(body, mtime=0)
+
+
+def _get_data(plugin: Optional[_Plugin]) -> Dict[str, Any]:
+    # the blob is only projected when reading from it, records written before the
+    # switch to blob storage fall back to the map
+    if not plugin:
+        return {}
+    if plugin.data_blob:
+        return json.loads(gzip.decompress(plugin.data_blob))
+    return plugin.data.as_dict() if plugin.data else {}
+
+
+def _to_data(plugin: Optional[_Plugin], fields: Optional[Set[str]]) -> Dict[str, Any]:
+    data = _get_data(plugin)
+    if fields is None or not data:
+        return data
+    return {key: val for key, val in data.items() if key in fields or key == "name"}
+
+
 def _get_latest(plugins: Iterator[_Plugin]) -> Optional[_Plugin]:
     if not plugins:
         return None
@@ -181,14 +369,15 @@ def _query_for_latest_plugin(
 
 
 def _scan_latest_plugins_index(
-    attributes: List[str],
-    mapper: Callable[[ResultIterator[_Plugin]], T],
+    attributes: List[Union[str, Path]],
+    mapper: Callable[[Iterator[_Plugin]], T],
     filter_conditions: Optional[Condition] = None,
 ) -> T:
     result = {}
     start = time.perf_counter()
     try:
-        results = _Plugin.latest_plugin_index.scan(
+        results = scan(
+            _Plugin.latest_plugin_index,
             attributes_to_get=attributes,
             filter_condition=filter_conditions,
         )
@@ -199,7 +388,7 @@ def _scan_latest_plugins_index(
         logger.info(f"latest plugins count={len(result)} duration={duration}ms")
 
 
-def _to_plugin_name_by_repo(results: ResultIterator[_Plugin]) -> Dict[str, str]:
+def _to_plugin_name_by_repo(results: Iterator[_Plugin]) -> Dict[str, str]:
     return {_to_repo(plugin): plugin.name for plugin in results if _to_repo(plugin)}
 
 
@@ -1,12 +1,24 @@
+import logging
 import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
-from typing import Union, Optional
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, Type, Union, Optional
 
 from pynamodb.attributes import NumberAttribute
 from pynamodb.models import Model
 
 from nhcommons.utils import get_current_timestamp
 
+logger = logging.getLogger(__name__)
+_SEGMENT_DONE = object()
+# BatchGetItem accepts at most 100 keys per request
+_CHANGE_DETECTION_CHUNK_SIZE = 100
+# attributes that differ on every write without the content of the item changing
+_UNTRACKED_ATTRIBUTES = {"last_updated_timestamp"}
+
 
 class PynamoWrapper(Model):
     last_updated_timestamp = NumberAttribute(default_for_new=get_current_timestamp)
@@ -34,3 +46,109 @@ def set_ddb_metadata(
     dynamo_model_cls.Meta.region = os.getenv("AWS_REGION", "us-west-2")
     dynamo_model_cls.Meta.table_name = f"{get_stack_name()}-{table_name}"
     return dynamo_model_cls
+
+
+def get_scan_segments() -> int:
+    return max(int(os.getenv("DYNAMO_SCAN_SEGMENTS", "1")), 1)
+
+
+def scan(scannable: Any, segments: Optional[int] = None, **kwargs) -> Iterator[Any]:
+    """
+    Scans a model or index, splitting the scan in segments that are scanned in
+    parallel when more than one segment is configured. Items are yielded as they are
+    fetched from any segment, so the order of items is not deterministic.
+    :returns Iterator: items from all the segments
+
+    :params scannable: pynamo model or index to scan
+    :params int segments: number of segments to scan in parallel, defaults to the
+    DYNAMO_SCAN_SEGMENTS environment variable
+    :params kwargs: arguments passed to scan of each segment
+    """
+    total_segments = segments or get_scan_segments()
+    if total_segments <= 1:
+        yield from scannable.scan(**kwargs)
+        return
+
+    results = queue.Queue()
+    stop = threading.Event()
+
+    def _scan_segment(segment: int) -> None:
+        try:
+            for item in scannable.scan(
+                segment=segment, total_segments=total_segments, **kwargs
+            ):
+                if stop.is_set():
+                    return
+                results.put(item)
+        except Exception as e:
+            logger.exception(f"Error scanning segment={segment}/{total_segments}")
+            results.put(e)
+        finally:
+            results.put(_SEGMENT_DONE)
+
+    executor = ThreadPoolExecutor(
+        max_workers=total_segments, thread_name_prefix="dynamo-scan"
+    )
+    try:
+        for segment in range(total_segments):
+            executor.submit(_scan_segment, segment)
+        pending = total_segments
+        while pending:
+            item = results.get()
+            if item is _SEGMENT_DONE:
+                pending -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        stop.set()
+        executor.shutdown(wait=False)
+
+
+def filter_changed(
+    model_cls: Type[PynamoWrapper],
+    items: Iterable[PynamoWrapper],
+    chunk_size: int = _CHANGE_DETECTION_CHUNK_SIZE,
+) -> Iterator[PynamoWrapper]:
+    """
+    Filters out the items identical to the stored item with the same key, so only
+    changed or new items are written. The stored items are fetched with BatchGetItem
+    for each chunk of items, so items are consumed lazily.
+    :returns Iterator: items that differ from the stored items
+
+    :params model_cls: pynamo model of the items
+    :params Iterable items: items to compare to the stored items
+    :params int chunk_size: number of items compared with each BatchGetItem
+    """
+    iterator = iter(items)
+    skipped = 0
+    while chunk := list(islice(iterator, chunk_size)):
+        keys = [_get_key(model_cls, item) for item in chunk]
+        stored = {
+            _get_key(model_cls, item): _fingerprint(item)
+            for item in model_cls.batch_get(keys)
+        }
+        for key, item in zip(keys, chunk):
+            if stored.get(key) == _fingerprint(item):
+                skipped += 1
+            else:
+                yield item
+    logger.info(f"filter_changed model={model_cls.__name__} skipped={skipped}")
+
+
+def _get_key(model_cls: Type[PynamoWrapper], item: PynamoWrapper) -> Any:
+    if model_cls._range_keyname is None:
+        return getattr(item, model_cls._hash_keyname)
+    return (
+        getattr(item, model_cls._hash_keyname),
+        getattr(item, model_cls._range_keyname),
+    )
+
+
+def _fingerprint(item: PynamoWrapper) -> Dict[str, Any]:
+    return {
+        key: value
+        for key, value in item.serialize(null_check=False).items()
+        if key not in _UNTRACKED_ATTRIBUTES
+    }
@@ -4,6 +4,8 @@ from typing import Any, Dict, List
 import pytest
 from dateutil.relativedelta import relativedelta
 from moto import mock_dynamodb
+from unittest.mock import Mock
+
 from nhcommons.models import github_activity
 
 
@@ -95,7 +97,9 @@ class TestGithubActivity:
             table.put_item(Item=item)
 
     def test_batch_write(self, table, verify_table_data):
-        github_activity.batch_write(generate_github_activity_list(True))
+        records = generate_github_activity_list(True)
+
+        assert github_activity.batch_write(records) == len(records)
         verify_table_data(generate_github_activity_list(False), table)
 
     @pytest.mark.parametrize(
@@ -162,3 +166,99 @@ class TestGithubActivity:
     ):
         actual = github_activity.get_timeline(plugin_name, repo, month_delta)
         assert actual == generate_timeline(expected, month_delta, "commits")
+
+    def test_batch_get_stats(self, seed_data):
+        actual = github_activity.batch_get_stats(
+            {"Plugin-1": "Foo/Bar", "Plugin-7": "Bar/Baz", "Plugin-8": None}
+        )
+
+        assert actual == {
+            "plugin-1": {
+                "total_commits": 15,
+                "latest_commit_timestamp": int(
+                    get_relative_utc_datetime(days=3).timestamp()
+                )
+                * 1000,
+            },
+            "plugin-7": {"total_commits": 0, "latest_commit_timestamp": None},
+            "plugin-8": {"total_commits": 0, "latest_commit_timestamp": None},
+        }
+
+    def test_write_rollups(self, seed_data, table):
+        github_activity.write_rollups({"Foo/Bar": "Plugin-1"})
+
+        item = table.get_item(
+            Key={"plugin_name": "plugin-1", "type_identifier": "TIMELINE:MONTH:Foo/Bar"}
+        )["Item"]
+        assert len(item["counts"]) == 14
+        assert item["commit_count"] == 30
+        assert item["repo"] == "Foo/Bar"
+
+    @pytest.mark.parametrize(
+        "repo, month_delta, expected",
+        [("Foo/Bar", 12, {4: 10, 9: 20}), ("Foo/Bar", 6, {4: 10}), (None, 12, {})],
+    )
+    def test_get_timeline_from_rollup(
+        self,
+        seed_data,
+        generate_timeline,
+        monkeypatch: pytest.MonkeyPatch,
+        repo,
+        month_delta,
+        expected,
+    ):
+        github_activity.write_rollups({"Foo/Bar": "Plugin-1"})
+        query = Mock(side_effect=github_activity._query_table)
+        monkeypatch.setattr(github_activity, "_query_table", query)
+
+        actual = github_activity.get_timeline("Plugin-1", repo, month_delta)
+
+        assert actual == generate_timeline(expected, month_delta, "commits")
+        query.assert_not_called()
+
+    def test_add_total_commits(self, table):
+        for plugin, repo, count, counted_until in [
+            ("plugin-1", "foo/bar", 30, 100),
+            ("plugin-2", "foo/baz", 12, None),
+            ("plugin-3", "foo/quiet", 7, 40),
+            ("plugin-4", "foo/ahead", 3, 150),
+        ]:
+            item = {
+                "plugin_name": plugin,
+                "type_identifier": f"TOTAL:{repo}",
+                "type": "TOTAL",
+                "commit_count": count,
+                "repo": repo,
+            }
+            if counted_until:
+                item["counted_until"] = counted_until
+            table.put_item(Item=item)
+
+        recount = github_activity.add_total_commits(
+            {"foo/bar": 4, "foo/baz": 2, "foo/qux": 1, "foo/quiet": 1, "foo/ahead": 5},
+            {
+                "foo/bar": "Plugin-1",
+                "foo/baz": "plugin-2",
+                "foo/quiet": "plugin-3",
+                "foo/ahead": "plugin-4",
+            },
+            100,
+            200,
+        )
+
+        assert recount == ["foo/baz", "foo/ahead"]
+        item = table.get_item(
+            Key={"plugin_name": "plugin-1", "type_identifier": "TOTAL:foo/bar"}
+        )["Item"]
+        assert item["commit_count"] == 34
+        assert item["counted_until"] == 200
+        unchanged = table.get_item(
+            Key={"plugin_name": "plugin-2", "type_identifier": "TOTAL:foo/baz"}
+        )["Item"]
+        assert unchanged["commit_count"] == 12
+        # no commits in the windows between its last count and this window
+        quiet = table.get_item(
+            Key={"plugin_name": "plugin-3", "type_identifier": "TOTAL:foo/quiet"}
+        )["Item"]
+        assert quiet["commit_count"] == 8
+        assert quiet["counted_until"] == 200
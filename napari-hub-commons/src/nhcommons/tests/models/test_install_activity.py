@@ -4,7 +4,9 @@ from typing import Any, Dict, List, Optional
 import pytest
 from dateutil.relativedelta import relativedelta
 from moto import mock_dynamodb
-from nhcommons.models import install_activity
+from unittest.mock import Mock
+
+from nhcommons.models import install_activity, pynamo_helper
 
 
 def get_relative_utc_datetime(**kwargs) -> datetime:
@@ -99,10 +101,53 @@ class TestInstallActivity:
             table.put_item(Item=item)
 
     def test_batch_write(self, table, verify_table_data):
-        install_activity.batch_write(generate_install_activity_list(True))
+        records = generate_install_activity_list(True)
+
+        assert install_activity.batch_write(records) == len(records)
 
         verify_table_data(generate_install_activity_list(False), table)
 
+    def test_batch_write_skips_unchanged(
+        self, seed_data, table, monkeypatch: pytest.MonkeyPatch
+    ):
+        written = []
+
+        def _filter_changed(model_cls, items):
+            changed = list(pynamo_helper.filter_changed(model_cls, items))
+            written.extend(item.type_timestamp for item in changed)
+            return changed
+
+        monkeypatch.setattr(install_activity, "filter_changed", _filter_changed)
+        records = generate_install_activity_list(True)
+        records[0] = {**records[0], "install_count": 6}
+        records.append(
+            generate_install_activity(
+                "Plugin-3", granularity="TOTAL", install_count=1, is_input=True
+            )
+        )
+
+        count = install_activity.batch_write(records, skip_unchanged=True)
+
+        assert count == 2
+        assert written == [records[0]["type_timestamp"], "TOTAL:"]
+        expected = generate_install_activity_list(False)
+        expected[0]["install_count"] = 6
+        expected.append(
+            generate_install_activity(
+                "Plugin-3", granularity="TOTAL", install_count=1, is_input=False
+            )
+        )
+        verify_table_data = [
+            table.get_item(
+                Key={
+                    "plugin_name": e["plugin_name"],
+                    "type_timestamp": e["type_timestamp"],
+                }
+            )["Item"]["install_count"]
+            for e in expected
+        ]
+        assert verify_table_data == [e["install_count"] for e in expected]
+
     @pytest.mark.parametrize(
         "excluded_field", ["plugin_name", "type_timestamp", "granularity"]
     )
@@ -156,3 +201,148 @@ class TestInstallActivity:
     def test_get_total_installs_by_plugins(self, seed_data):
         expected = {"plugin-1": 25, "plugin-2": 83}
         assert install_activity.get_total_installs_by_plugins() == expected
+
+    def test_batch_get_total_installs(self, seed_data):
+        actual = install_activity.batch_get_total_installs(
+            ["Plugin-1", "plugin-2", "Plugin-7"]
+        )
+
+        assert actual == {"plugin-1": 25, "plugin-2": 83, "plugin-7": 0}
+
+    def test_batch_get_total_installs_pages_keys(self, table):
+        for i in range(150):
+            table.put_item(
+                Item={
+                    "plugin_name": f"plugin-{i}",
+                    "type_timestamp": "TOTAL:",
+                    "type": "TOTAL",
+                    "install_count": i,
+                    "is_total": "true",
+                }
+            )
+
+        actual = install_activity.batch_get_total_installs(
+            [f"plugin-{i}" for i in range(150)]
+        )
+
+        assert actual == {f"plugin-{i}": i for i in range(150)}
+
+    def test_write_rollups(self, seed_data, table):
+        install_activity.write_rollups(["Plugin-1", "plugin-7"])
+
+        timeline = table.get_item(
+            Key={"plugin_name": "plugin-1", "type_timestamp": "TIMELINE:MONTH"}
+        )["Item"]
+        assert len(timeline["counts"]) == 14
+        assert timeline["install_count"] == 15
+        rolling = table.get_item(
+            Key={"plugin_name": "plugin-1", "type_timestamp": "ROLLING:30D"}
+        )["Item"]
+        assert len(rolling["counts"]) == 31
+        assert rolling["install_count"] == 7
+        empty = table.get_item(
+            Key={"plugin_name": "plugin-7", "type_timestamp": "ROLLING:30D"}
+        )["Item"]
+        assert empty["counts"] == [0] * 31
+
+    @pytest.mark.parametrize(
+        "month_delta, expected", [(0, {}), (4, {3: 5}), (12, {6: 10, 3: 5})]
+    )
+    def test_get_timeline_from_rollup(
+        self,
+        seed_data,
+        generate_timeline,
+        monkeypatch: pytest.MonkeyPatch,
+        month_delta,
+        expected,
+    ):
+        install_activity.write_rollups(["Plugin-1"])
+        query = Mock(side_effect=install_activity._query_table)
+        monkeypatch.setattr(install_activity, "_query_table", query)
+
+        actual = install_activity.get_timeline("Plugin-1", month_delta)
+
+        assert actual == generate_timeline(expected, month_delta, "installs")
+        query.assert_not_called()
+
+    def test_get_timeline_falls_back_beyond_rollup(
+        self, seed_data, generate_timeline, monkeypatch: pytest.MonkeyPatch
+    ):
+        install_activity.write_rollups(["Plugin-1"])
+        query = Mock(side_effect=install_activity._query_table)
+        monkeypatch.setattr(install_activity, "_query_table", query)
+
+        actual = install_activity.get_timeline("Plugin-1", 20)
+
+        assert actual == generate_timeline({6: 10, 3: 5}, 20, "installs")
+        query.assert_called_once()
+
+    @pytest.mark.parametrize("day_delta, expected", [(2, 0), (10, 5), (20, 7), (30, 7)])
+    def test_get_recent_installs_from_rollup(
+        self, seed_data, monkeypatch: pytest.MonkeyPatch, day_delta, expected
+    ):
+        install_activity.write_rollups(["Plugin-1"])
+        query = Mock(side_effect=install_activity._query_table)
+        monkeypatch.setattr(install_activity, "_query_table", query)
+
+        assert install_activity.get_recent_installs("Plugin-1", day_delta) == expected
+        query.assert_not_called()
+
+    def test_add_total_installs(self, table):
+        table.put_item(
+            Item={
+                "plugin_name": "plugin-1",
+                "type_timestamp": "TOTAL:",
+                "type": "TOTAL",
+                "install_count": 25,
+                "is_total": "true",
+                "counted_until": 100,
+            }
+        )
+        table.put_item(
+            Item={
+                "plugin_name": "plugin-2",
+                "type_timestamp": "TOTAL:",
+                "type": "TOTAL",
+                "install_count": 83,
+                "is_total": "true",
+                "counted_until": 50,
+            }
+        )
+
+        table.put_item(
+            Item={
+                "plugin_name": "plugin-4",
+                "type_timestamp": "TOTAL:",
+                "type": "TOTAL",
+                "install_count": 9,
+                "is_total": "true",
+                "counted_until": 150,
+            }
+        )
+
+        totals, recount = install_activity.add_total_installs(
+            {"Plugin-1": 5, "plugin-2": 3, "plugin-3": 1, "plugin-4": 2}, 100, 200
+        )
+
+        assert totals == {"plugin-1": 30, "plugin-2": 86}
+        assert sorted(recount) == ["plugin-3", "plugin-4"]
+        item = table.get_item(
+            Key={"plugin_name": "plugin-1", "type_timestamp": "TOTAL:"}
+        )["Item"]
+        assert item["install_count"] == 30
+        assert item["counted_until"] == 200
+        assert item["is_total"] == "true"
+        # no installs in the windows between its last count and this window
+        quiet = table.get_item(
+            Key={"plugin_name": "plugin-2", "type_timestamp": "TOTAL:"}
+        )["Item"]
+        assert quiet["install_count"] == 86
+        assert quiet["counted_until"] == 200
+        unchanged = table.get_item(
+            Key={"plugin_name": "plugin-4", "type_timestamp": "TOTAL:"}
+        )["Item"]
+        assert unchanged["install_count"] == 9
+        assert "Item" not in table.get_item(
+            Key={"plugin_name": "plugin-3", "type_timestamp": "TOTAL:"}
+        )
@@ -1,9 +1,11 @@
+import json
 from typing import Dict, Any
+from unittest.mock import Mock
 
 import pytest
 from moto import mock_dynamodb
 
-from nhcommons.models import plugin
+from nhcommons.models import plugin, pynamo_helper
 from nhcommons.models.plugin_utils import PluginVisibility as pv
 
 _INDEX_SUBSET = {
@@ -255,6 +257,107 @@ class TestPlugin:
         sorted_expected = sorted(expected, key=lambda p: p["description_text"])
         assert sorted_actual == sorted_expected
 
+    def test_get_index_is_stable_across_segment_order(
+        self, seed_data, monkeypatch: pytest.MonkeyPatch
+    ):
+        # segments complete in a different order on each scan
+        orders = iter([list, lambda items: list(reversed(items))])
+
+        def _scan(scannable, **kwargs):
+            items = list(pynamo_helper.scan(scannable, segments=4, **kwargs))
+            return iter(next(orders)(items))
+
+        monkeypatch.setattr(plugin, "scan", _scan)
+
+        payloads = [
+            json.dumps(plugin.get_index(None), separators=(",", ":"), sort_keys=True)
+            for _ in range(2)
+        ]
+
+        assert payloads[0] == payloads[1]
+        names = [item["name"] for item in json.loads(payloads[0])]
+        assert len(names) > 1 and names == sorted(names)
+
+    def test_get_index_with_total_installs(self, seed_data):
+        plugin.update_total_installs({"plugin-2": 12})
+
+        actual = plugin.get_index({pv.PUBLIC}, include_total_installs=True)
+
+        installs = {item["name"]: item["total_installs"] for item in actual}
+        assert installs == {"plugin-1": None, "Plugin-2": 12}
+
+    def test_update_total_installs(self, seed_data, table):
+        plugin.update_total_installs({"plugin-1": 5, "PLUGIN-2": 7, "unknown": 3})
+
+        items = {
+            (item["name"], item["version"]): item.get("total_installs")
+            for item in table.scan()["Items"]
+        }
+        assert items[("plugin-1", "2.2")] == 5
+        assert items[("plugin-1", "2.1")] is None
+        assert items[("Plugin-2", "1.0.0")] == 7
+        assert len(items) == 14
+
+    def test_update_total_installs_with_latest_plugins(
+        self, seed_data, table, monkeypatch
+    ):
+        get_latest_plugins = Mock(spec=plugin.get_latest_plugins)
+        monkeypatch.setattr(plugin, "get_latest_plugins", get_latest_plugins)
+
+        plugin.update_total_installs(
+            {"plugin-1": 5, "PLUGIN-2": 7}, {"plugin-1": "2.2"}
+        )
+
+        get_latest_plugins.assert_not_called()
+        items = {
+            (item["name"], item["version"]): item.get("total_installs")
+            for item in table.scan()["Items"]
+        }
+        assert items[("plugin-1", "2.2")] == 5
+        assert items[("Plugin-2", "1.0.0")] is None
+
+    def test_get_latest_plugins_without_total_installs(self, seed_data):
+        plugin.update_total_installs({"plugin-1": 0})
+
+        actual = plugin.get_latest_plugins_without_total_installs()
+
+        assert "plugin-1" not in actual
+        assert actual["Plugin-2"] == "1.0.0"
+
+    @pytest.mark.parametrize(
+        "storage, has_map, has_blob",
+        [("map", True, False), ("blob", False, True), ("both", True, True)],
+    )
+    def test_put_plugin_data_storage(
+        self, table, monkeypatch: pytest.MonkeyPatch, storage, has_map, has_blob
+    ):
+        monkeypatch.setenv("PLUGIN_DATA_STORAGE", storage)
+        data = plugin_data("plugin-1", "1.0")
+        record, _ = generate_record_and_expected(data, "PUBLIC", is_latest=True)
+
+        plugin.put_plugin("plugin-1", "1.0", {**record, "data": data})
+
+        item = table.get_item(Key={"name": "plugin-1", "version": "1.0"})["Item"]
+        assert ("data" in item) == has_map
+        assert ("data_blob" in item) == has_blob
+        assert plugin.get_latest_plugin("plugin-1", {pv.PUBLIC}) == data
+        assert plugin.get_latest_plugin("plugin-1", {pv.PUBLIC}, {"summary"}) == {
+            "name": "plugin-1",
+            "summary": data["summary"],
+        }
+        assert plugin.get_index({pv.PUBLIC}) == [_to_index_entry(data, "public")]
+        assert plugin.get_plugin_names({pv.PUBLIC}) == {"plugin-1"}
+
+    def test_blob_storage_reads_map_records(
+        self, seed_data, monkeypatch: pytest.MonkeyPatch
+    ):
+        monkeypatch.setenv("PLUGIN_DATA_STORAGE", "blob")
+
+        actual = plugin.get_plugin_by_version("Plugin-2", "1.0.0", {pv.PUBLIC})
+
+        assert actual == plugin_data("Plugin-2", "1.0.0")
+        assert len(plugin.get_index({pv.PUBLIC})) == 2
+
     def test_get_latest_plugins(self, seed_data):
         actual = plugin.get_latest_plugins()
         expected = {
@@ -267,6 +370,17 @@ class TestPlugin:
         }
         assert actual == expected
 
+    @pytest.mark.parametrize(
+        "visibilities, expected",
+        [
+            (None, {"plugin-1", "Plugin-2", "plugin-3", "plugin-4", "plugin-5"}),
+            ({pv.PUBLIC, pv.HIDDEN}, {"plugin-1", "Plugin-2", "plugin-3", "plugin-4"}),
+            ({pv.BLOCKED}, {"plugin-5"}),
+        ],
+    )
+    def test_get_plugin_names(self, seed_data, visibilities, expected):
+        assert plugin.get_plugin_names(visibilities) == expected
+
     def test_get_plugin_name_by_repo(self, seed_data):
         expected = {
             "https://custom.com/org1/foo": "Plugin-2",
@@ -369,6 +483,26 @@ class TestPlugin:
     ):
         assert plugin.get_plugin_by_version(name, version, visibilities) == expected
 
+    @pytest.mark.parametrize(
+        "fields, expected",
+        [
+            ({"summary", "license"}, ["name", "summary", "license"]),
+            ({"name"}, ["name"]),
+            ({"unknown"}, ["name"]),
+        ],
+    )
+    def test_get_latest_plugin_with_fields(self, seed_data, fields, expected):
+        data = plugin_data("plugin-1", "2.2")
+        actual = plugin.get_latest_plugin("plugin-1", {pv.PUBLIC}, fields)
+        assert actual == {key: data[key] for key in expected}
+
+    def test_get_latest_plugin_with_fields_not_found(self, seed_data):
+        assert plugin.get_latest_plugin("plugin-6", set(), {"summary"}) == {}
+
+    def test_get_plugin_by_version_with_fields(self, seed_data):
+        actual = plugin.get_plugin_by_version("plugin-1", "2.1", set(), {"version"})
+        assert actual == {"name": "plugin-1", "version": "2.1"}
+
     @pytest.mark.parametrize(
         "name, expected",
         [
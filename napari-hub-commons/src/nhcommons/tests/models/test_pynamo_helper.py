@@ -0,0 +1,57 @@
+import threading
+from typing import List, Optional
+
+import pytest
+
+from nhcommons.models import pynamo_helper
+
+
+class _Scannable:
+    def __init__(self, items: List[int], fail_segment: Optional[int] = None):
+        self.items = items
+        self.fail_segment = fail_segment
+        self.calls = []
+        self.threads = set()
+
+    def scan(self, segment=None, total_segments=None, **kwargs):
+        self.calls.append((segment, total_segments, kwargs))
+        self.threads.add(threading.current_thread().name)
+        if segment is None:
+            yield from self.items
+            return
+        if segment == self.fail_segment:
+            raise ValueError("scan failed")
+        yield from self.items[segment::total_segments]
+
+
+class TestScan:
+    def test_scan_single_segment_by_default(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.delenv("DYNAMO_SCAN_SEGMENTS", raising=False)
+        scannable = _Scannable(list(range(10)))
+
+        actual = list(pynamo_helper.scan(scannable, attributes_to_get=["name"]))
+
+        assert actual == list(range(10))
+        assert scannable.calls == [(None, None, {"attributes_to_get": ["name"]})]
+
+    @pytest.mark.parametrize("segments, env", [(4, None), (None, "4")])
+    def test_scan_in_parallel_segments(
+        self, monkeypatch: pytest.MonkeyPatch, segments, env
+    ):
+        if env:
+            monkeypatch.setenv("DYNAMO_SCAN_SEGMENTS", env)
+        scannable = _Scannable(list(range(100)))
+
+        actual = pynamo_helper.scan(scannable, segments=segments, filter_condition=1)
+
+        assert sorted(actual) == list(range(100))
+        assert sorted(scannable.calls) == [
+            (segment, 4, {"filter_condition": 1}) for segment in range(4)
+        ]
+        assert all(name.startswith("dynamo-scan") for name in scannable.threads)
+
+    def test_scan_raises_segment_failure(self):
+        scannable = _Scannable(list(range(10)), fail_segment=1)
+
+        with pytest.raises(ValueError):
+            list(pynamo_helper.scan(scannable, segments=2))
@@ -1,7 +1,31 @@
+import asyncio
 from typing import Dict
 import pytest
+
+from nhcommons.utils import github_adapter
 from nhcommons.utils.github_adapter import get_repo_url
 
+REPO_URL = "https://github.com/foo/bar"
+FILES = {
+    ".napari/DESCRIPTION.md": "# bar",
+    ".napari-hub/config.yml": "labels:\n  ontology: EDAM-BIOIMAGING:alpha06\n",
+    ".napari/config.yml": "labels: {}",
+}
+
+
+class FakeGithubClientHelper:
+    def __init__(self, repo_url: str, branch: str = "HEAD"):
+        assert repo_url == REPO_URL
+
+    def get_license(self):
+        return "BSD-3-Clause"
+
+    def get_file(self, file: str = "", file_format: str = ""):
+        return FILES.get(file)
+
+    def get_first_valid_file(self, paths, file_format: str = ""):
+        return next((FILES[path] for path in paths if path in FILES), None)
+
 
 class TestGithubAdapter:
     @pytest.mark.parametrize(
@@ -24,3 +48,20 @@ class TestGithubAdapter:
     )
     def test_get_latest_plugins(self, project_urls: Dict[str, str], expected: str):
         assert expected == get_repo_url(project_urls)
+
+    @pytest.mark.parametrize("is_async", [False, True])
+    def test_get_github_metadata(self, monkeypatch, is_async: bool):
+        monkeypatch.setattr(
+            github_adapter, "GithubClientHelper", FakeGithubClientHelper
+        )
+
+        if is_async:
+            actual = asyncio.run(github_adapter.get_github_metadata_async(REPO_URL))
+        else:
+            actual = github_adapter.get_github_metadata(REPO_URL)
+
+        assert actual == {
+            "license": "BSD-3-Clause",
+            "description": "# bar",
+            "labels": {"ontology": "EDAM-BIOIMAGING:alpha06"},
+        }
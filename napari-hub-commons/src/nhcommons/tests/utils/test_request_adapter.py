@@ -0,0 +1,52 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from nhcommons.utils import request_adapter
+
+
+class TestCallWithHostLimit:
+    @pytest.fixture(autouse=True)
+    def setup(self, monkeypatch):
+        monkeypatch.setattr(request_adapter, "_HOST_CONCURRENCY", {"foo.com": 2})
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._max_in_flight = {}
+
+    def _call(self, host: str) -> str:
+        with self._lock:
+            self._in_flight[host] = self._in_flight.get(host, 0) + 1
+            self._max_in_flight[host] = max(
+                self._max_in_flight.get(host, 0), self._in_flight[host]
+            )
+        time.sleep(0.02)
+        with self._lock:
+            self._in_flight[host] -= 1
+        return host
+
+    def test_limits_calls_in_flight_per_host(self):
+        async def _run():
+            calls = [
+                request_adapter.call_with_host_limit(
+                    f"https://{host}/path", lambda host=host: self._call(host)
+                )
+                for host in ["foo.com", "bar.com"] * 6
+            ]
+            return await asyncio.gather(*calls)
+
+        actual = asyncio.run(_run())
+
+        assert actual == ["foo.com", "bar.com"] * 6
+        assert self._max_in_flight["foo.com"] == 2
+        assert self._max_in_flight["bar.com"] > 2
+
+    def test_raises_call_failure(self):
+        def _fail():
+            raise ValueError("not found")
+
+        with pytest.raises(ValueError):
+            asyncio.run(
+                request_adapter.call_with_host_limit("https://foo.com/path", _fail)
+            )
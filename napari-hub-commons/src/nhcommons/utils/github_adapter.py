@@ -1,15 +1,23 @@
+import asyncio
 import re
-from typing import Dict, Optional
+from functools import partial
+from typing import Dict, List, Optional
 
 import yaml
 
 from .adapter_helpers import GithubClientHelper, CitationHelper
+from .request_adapter import call_with_host_limit
 
 _URL_PATTERN = re.compile("^https://github\\.com/([^/]+)/([^/]+)")
 _DEFAULT_DESCRIPTION = (
     "The developer has not yet provided a napari-hub " "specific description."
 )
 _HUB_CONFIG_KEYS = {"labels"}
+_GITHUB_API_URL = "https://api.github.com"
+_GITHUB_RAW_URL = "https://raw.githubusercontent.com"
+_DESCRIPTION_PATHS = [".napari-hub/DESCRIPTION.md", ".napari/DESCRIPTION.md"]
+_CITATION_PATH = "CITATION.cff"
+_CONFIG_PATHS = [".napari-hub/config.yml", ".napari/config.yml"]
 
 
 def is_valid_repo_url(url: str) -> bool:
@@ -43,20 +51,61 @@ def get_github_metadata(repo_url: str, branch: str = "HEAD") -> Dict:
     :param branch: name of the branch to use if specified
     :return: github metadata dictionary
     """
-    github_metadata = {}
     github_helper = GithubClientHelper(repo_url, branch)
-    github_license = github_helper.get_license()
-    if github_license:
-        github_metadata["license"] = github_license
+    return _to_github_metadata(
+        github_helper.get_license(),
+        github_helper.get_first_valid_file(_DESCRIPTION_PATHS),
+        github_helper.get_file(_CITATION_PATH),
+        github_helper.get_first_valid_file(_CONFIG_PATHS),
+    )
+
 
-    description = github_helper.get_first_valid_file(
-        [".napari-hub/DESCRIPTION.md", ".napari/DESCRIPTION.md"]
+async def get_github_metadata_async(repo_url: str, branch: str = "HEAD") -> Dict:
+    """
+    Extract extra metadata from the github repo url, fetching the license and all the
+    candidate files at the same time.
+
+    :param repo_url: github repo url to download from
+    :param branch: name of the branch to use if specified
+    :return: github metadata dictionary
+    """
+    github_helper = GithubClientHelper(repo_url, branch)
+    paths = _DESCRIPTION_PATHS + [_CITATION_PATH] + _CONFIG_PATHS
+    github_license, *files = await asyncio.gather(
+        call_with_host_limit(_GITHUB_API_URL, github_helper.get_license),
+        *(
+            call_with_host_limit(_GITHUB_RAW_URL, partial(github_helper.get_file, path))
+            for path in paths
+        ),
+    )
+    file_by_path = dict(zip(paths, files))
+    return _to_github_metadata(
+        github_license,
+        _first_valid_file(file_by_path, _DESCRIPTION_PATHS),
+        file_by_path[_CITATION_PATH],
+        _first_valid_file(file_by_path, _CONFIG_PATHS),
     )
 
+
+def _first_valid_file(
+    file_by_path: Dict[str, Optional[str]], paths: List[str]
+) -> Optional[str]:
+    return next((file_by_path[path] for path in paths if file_by_path[path]), None)
+
+
+def _to_github_metadata(
+    github_license: Optional[str],
+    description: Optional[str],
+    citation_file: Optional[str],
+    yaml_file: Optional[str],
+) -> Dict:
+    github_metadata = {}
+    if github_license:
+        github_metadata["license"] = github_license
+
     if description and _DEFAULT_DESCRIPTION not in description:
         github_metadata["description"] = description
 
-    citation_file = github_helper.get_file("CITATION.cff")
     if citation_file is not None:
         citation_helper = CitationHelper(citation_file)
         citation = citation_helper.get_citations()
@@ -68,9 +117,6 @@ def get_github_metadata(repo_url: str, branch: str = "HEAD") -> Dict:
         if authors:
             github_metadata.update({"authors": authors})
 
-    yaml_file = github_helper.get_first_valid_file(
-        [".napari-hub/config.yml", ".napari/config.yml"]
-    )
     if yaml_file:
         try:
             config = yaml.safe_load(yaml_file)
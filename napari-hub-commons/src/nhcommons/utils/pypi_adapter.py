@@ -1,12 +1,13 @@
 import logging
 import re
+from functools import partial
 from typing import Any, Dict, List, Optional
 
 import requests
 from requests import HTTPError
 
 from .github_adapter import get_repo_url
-from .request_adapter import get_request
+from .request_adapter import call_with_host_limit, get_request
 
 _NAME_PATTERN = re.compile('class="package-snippet__name">(.+)</span>')
 _VERSION_PATTERN = re.compile('class="package-snippet__version">(.+)</span>')
@@ -51,6 +52,19 @@ def get_plugin_pypi_metadata(plugin: str, version: str) -> Dict[str, Any]:
         return {}
 
 
+async def get_plugin_pypi_metadata_async(plugin: str, version: str) -> Dict[str, Any]:
+    """
+    Get plugin metadata through pypi API, limited with the other requests to pypi.
+
+    :param plugin: name of the plugin
+    :param version: version of the plugin
+    :return: metadata dict for the plugin, empty if not found
+    """
+    return await call_with_host_limit(
+        _BASE_URL, partial(get_plugin_pypi_metadata, plugin, version)
+    )
+
+
 def _get_pypi_response(
     path: str, params: Optional[Dict[str, Any]] = None
 ) -> requests.Response:
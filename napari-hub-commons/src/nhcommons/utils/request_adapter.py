@@ -1,12 +1,30 @@
+import asyncio
 import logging
 import time
-from typing import Dict, Any
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, TypeVar
+from urllib.parse import urlparse
 
 import requests
 from requests import Response, HTTPError
 from requests.auth import AuthBase
 
 logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+# maximum number of requests in flight at the same time for each host
+_HOST_CONCURRENCY = {
+    "api.github.com": 10,
+    "raw.githubusercontent.com": 20,
+    "pypi.org": 20,
+}
+_DEFAULT_HOST_CONCURRENCY = 10
+_executor = ThreadPoolExecutor(
+    max_workers=sum(_HOST_CONCURRENCY.values()) + _DEFAULT_HOST_CONCURRENCY,
+    thread_name_prefix="request",
+)
+_semaphores_by_loop = weakref.WeakKeyDictionary()
 
 
 def get_request(url: str, params: Dict[str, Any] = None, auth=None) -> Response:
@@ -38,6 +56,28 @@ def post_request(
         logger.info(f"url={url} params={params} duration={duration}ms")
 
 
+async def call_with_host_limit(url: str, call: Callable[[], T]) -> T:
+    """
+    Runs the blocking call making requests to the host of the url in a thread, with
+    at most the concurrency limit of the host in flight, so requests to different
+    hosts do not wait on each other.
+    :param url: url of the host the call makes requests to
+    :param call: blocking call to run
+    :return: result of the call
+    """
+    loop = asyncio.get_running_loop()
+    async with _get_semaphore(loop, urlparse(url).hostname):
+        return await loop.run_in_executor(_executor, call)
+
+
+def _get_semaphore(loop: asyncio.AbstractEventLoop, host: str) -> asyncio.Semaphore:
+    semaphores = _semaphores_by_loop.setdefault(loop, {})
+    if host not in semaphores:
+        limit = _HOST_CONCURRENCY.get(host, _DEFAULT_HOST_CONCURRENCY)
+        semaphores[host] = asyncio.Semaphore(limit)
+    return semaphores[host]
+
+
 def _raise_for_status(method: str, url: str, response: Response) -> None:
     logger.error(f"calling {method} {url} status_code={response.status_code}")
     response.raise_for_status()